@@ -0,0 +1,48 @@
+"""
+Konfigurasi gunicorn (otomatis dibaca dari folder kerja, lihat Procfile).
+
+Dengan preload_app aplikasi Django dan model SLAPredictor dimuat sekali di
+master lalu di-fork ke worker, sehingga array random forest dipakai bersama
+(copy-on-write) dan tidak disalin per worker.
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+preload_app = os.environ.get('SLA_GUNICORN_PRELOAD', 'True') == 'True'
+warm_up = os.environ.get('SLA_PREDICTOR_WARMUP', 'True') == 'True'
+
+
+def _warm_up(log):
+    try:
+        from tickets.utils.model_utils import warm_up_predictor
+        warm_up_predictor()
+        log.info("SLAPredictor siap (warm-up selesai)")
+    except Exception as e:
+        # Model gagal dimuat tidak boleh menghentikan server; request prediksi akan mengembalikan error
+        log.warning(f"Warm-up SLAPredictor gagal: {e}")
+
+
+def when_ready(server):
+    """ Master (preload_app): muat model sebelum fork """
+    if preload_app and warm_up:
+        _warm_up(server.log)
+        # Objek yang sudah ada dipindah ke generasi permanen agar GC di worker tidak
+        # menyentuh (dan menyalin) halaman memori model
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    """ Worker: tanpa preload, model dimuat per worker sebelum menerima request """
+    if not preload_app and warm_up:
+        _warm_up(worker.log)
+
+
+def worker_exit(server, worker):
+    """ Worker berhenti (restart/deploy): flush PredictionLog yang masih di buffer """
+    try:
+        from tickets.utils.prediction_log import shutdown_prediction_log
+        shutdown_prediction_log()
+    except Exception as e:
+        worker.log.warning(f"Flush PredictionLog gagal: {e}")
@@ -101,6 +101,44 @@ DATABASES = {
 }
 
 
+# =========================================================
+# CACHE (response cache endpoint dashboard & cluster)
+# =========================================================
+
+# Pilihan backend: 'locmem' (per process), 'file' (dipakai bersama antar worker
+# di satu server) atau 'redis' (REDIS_URL, bisa instance Redis lokal).
+SLA_CACHE_BACKEND = os.environ.get('SLA_CACHE_BACKEND', 'locmem')
+SLA_CACHE_ENABLED = os.environ.get('SLA_CACHE_ENABLED', 'True') == 'True'
+SLA_CACHE_TTL = int(os.environ.get('SLA_CACHE_TTL', '300'))  # detik
+SLA_CACHE_MAX_ENTRIES = int(os.environ.get('SLA_CACHE_MAX_ENTRIES', '1000'))
+
+_SLA_CACHE_BACKENDS = {
+    # LocMemCache membuang entry yang paling lama tidak dipakai (LRU) saat penuh
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sla-analytics',
+        'OPTIONS': {'MAX_ENTRIES': SLA_CACHE_MAX_ENTRIES},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('SLA_CACHE_DIR', os.path.join(BASE_DIR, '.cache', 'responses')),
+        'OPTIONS': {'MAX_ENTRIES': SLA_CACHE_MAX_ENTRIES},
+    },
+    # Eviction LRU diatur di Redis: maxmemory-policy allkeys-lru
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CACHES = {
+    'default': {
+        **_SLA_CACHE_BACKENDS[SLA_CACHE_BACKEND],
+        'TIMEOUT': SLA_CACHE_TTL,
+    }
+}
+
+
 # =========================================================
 # AUTHENTICATION & PASSWORD
 # =========================================================
@@ -120,6 +158,11 @@ ACCOUNT_USERNAME_REQUIRED = False
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend' 
 
 REST_FRAMEWORK = {
+    # orjson jika terpasang (lihat tickets/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'tickets.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
@@ -157,4 +200,104 @@ CORS_ALLOW_ALL_ORIGINS = True
 # CORS_ALLOWED_ORIGINS = [
 #     "https://nama-project-react-kamu.vercel.app",
 #     "http://localhost:5173", # Jika pakai Vite local
-# ]
\ No newline at end of file
+# ]
+
+
+# =========================================================
+# SLA PREDICTOR
+# =========================================================
+
+# Folder artefak model (.pkl); default tickets/utils
+SLA_MODEL_DIR = os.environ.get('SLA_MODEL_DIR') or None
+
+# 'r' -> joblib.load(mmap_mode='r'): array model dibaca via memory map (file .pkl tidak dikompres)
+SLA_MODEL_MMAP_MODE = os.environ.get('SLA_MODEL_MMAP_MODE') or None
+
+# Engine predict_proba: 'sklearn' (default, model apa adanya) atau 'flat' (opsional:
+# random forest dipipihkan ke array NumPy, hasil identik, jauh lebih cepat untuk
+# 1 sampai ratusan baris; aktifkan dengan SLA_INFERENCE_ENGINE=flat). Batch di atas
+# SLA_FLAT_ENGINE_MAX_ROWS tetap memakai loop Cython sklearn.
+SLA_INFERENCE_ENGINE = os.environ.get('SLA_INFERENCE_ENGINE', 'sklearn')
+SLA_FLAT_ENGINE_MAX_ROWS = int(os.environ.get('SLA_FLAT_ENGINE_MAX_ROWS', '256'))
+
+# Jumlah fitur dengan kontribusi terbesar (dekomposisi jalur forest) di hasil prediksi; 0 = mati
+SLA_EXPLAIN_TOP_N = int(os.environ.get('SLA_EXPLAIN_TOP_N', '5'))
+
+# Muat ulang model otomatis jika mtime/size file .pkl berubah (os.stat, paling sering sekali per interval)
+SLA_MODEL_AUTO_RELOAD = os.environ.get('SLA_MODEL_AUTO_RELOAD', 'True') == 'True'
+SLA_MODEL_RELOAD_CHECK_INTERVAL = float(os.environ.get('SLA_MODEL_RELOAD_CHECK_INTERVAL', '5'))  # detik
+
+# Cache probabilitas per baris fitur final (LRU + TTL, per worker process)
+SLA_PREDICTION_CACHE_ENABLED = os.environ.get('SLA_PREDICTION_CACHE_ENABLED', 'True') == 'True'
+SLA_PREDICTION_CACHE_MAX_ENTRIES = int(os.environ.get('SLA_PREDICTION_CACHE_MAX_ENTRIES', '10000'))
+SLA_PREDICTION_CACHE_MAX_BYTES = int(os.environ.get('SLA_PREDICTION_CACHE_MAX_BYTES', str(8 * 1024 * 1024)))
+SLA_PREDICTION_CACHE_TTL = int(os.environ.get('SLA_PREDICTION_CACHE_TTL', '600'))  # detik
+
+# Checkpoint rescore_tickets (posisi terakhir + awal run terakhir untuk --since last)
+SLA_RESCORE_CHECKPOINT = os.environ.get(
+    'SLA_RESCORE_CHECKPOINT', os.path.join(BASE_DIR, '.cache', 'rescore_checkpoint.json')
+)
+
+# Batas jumlah tiket per request di /api/predict/batch/
+SLA_PREDICT_BATCH_MAX_SIZE = int(os.environ.get('SLA_PREDICT_BATCH_MAX_SIZE', '5000'))
+
+# PredictionLog ditulis write-behind (queue in-process + thread flusher bulk_create)
+SLA_PREDICTION_LOG_BUFFERED = os.environ.get('SLA_PREDICTION_LOG_BUFFERED', 'True') == 'True'
+SLA_PREDICTION_LOG_QUEUE_SIZE = int(os.environ.get('SLA_PREDICTION_LOG_QUEUE_SIZE', '10000'))
+SLA_PREDICTION_LOG_BATCH_SIZE = int(os.environ.get('SLA_PREDICTION_LOG_BATCH_SIZE', '200'))
+SLA_PREDICTION_LOG_FLUSH_INTERVAL = float(os.environ.get('SLA_PREDICTION_LOG_FLUSH_INTERVAL', '2.0'))  # detik
+# Queue penuh: drop (buang), block (tunggu SLA_PREDICTION_LOG_BLOCK_TIMEOUT detik),
+# sample (di atas 80% kapasitas hanya SLA_PREDICTION_LOG_SAMPLE_RATE yang disimpan)
+SLA_PREDICTION_LOG_OVERFLOW = os.environ.get('SLA_PREDICTION_LOG_OVERFLOW', 'drop')
+SLA_PREDICTION_LOG_BLOCK_TIMEOUT = float(os.environ.get('SLA_PREDICTION_LOG_BLOCK_TIMEOUT', '0.05'))
+SLA_PREDICTION_LOG_SAMPLE_RATE = float(os.environ.get('SLA_PREDICTION_LOG_SAMPLE_RATE', '0.1'))
+
+# Kalender hari kerja (weekend + libur nasional) untuk fitur Is Open Date Off & durasi jam kerja.
+# Rentang tahun dibangun saat pertama dipakai lalu di-cache ke disk; tahun di luar rentang
+# menambah rentang otomatis.
+SLA_CALENDAR_START_YEAR = int(os.environ.get('SLA_CALENDAR_START_YEAR', '2015'))
+SLA_CALENDAR_END_YEAR = int(os.environ.get('SLA_CALENDAR_END_YEAR', '0')) or None  # default: tahun ini + 2
+SLA_CALENDAR_CACHE_DIR = os.environ.get('SLA_CALENDAR_CACHE_DIR', os.path.join(BASE_DIR, '.cache', 'calendar'))
+SLA_HOLIDAY_COUNTRY = os.environ.get('SLA_HOLIDAY_COUNTRY', 'ID')
+SLA_BUSINESS_HOURS = (
+    int(os.environ.get('SLA_BUSINESS_HOUR_START', '8')),
+    int(os.environ.get('SLA_BUSINESS_HOUR_END', '17')),
+)
+
+# Jumlah baris per fetch cursor server-side / per blok output /api/tickets/export/
+SLA_EXPORT_CHUNK_SIZE = int(os.environ.get('SLA_EXPORT_CHUNK_SIZE', '2000'))
+
+# Endpoint statistik membaca tabel TicketRollup (jika sudah dibangun)
+SLA_USE_ROLLUPS = os.environ.get('SLA_USE_ROLLUPS', 'True') == 'True'
+
+
+# =========================================================
+# LOGGING
+# =========================================================
+
+# True -> log detail per prediksi (input, fitur, timing per tahap) di level DEBUG
+SLA_PREDICTOR_DEBUG = os.environ.get('SLA_PREDICTOR_DEBUG', 'False') == 'True'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        # Satu baris JSON per event, field dari extra={...} ikut ditulis
+        'structured': {'()': 'tickets.utils.structured_logging.StructuredFormatter'},
+    },
+    'handlers': {
+        'structured_console': {'class': 'logging.StreamHandler', 'formatter': 'structured'},
+    },
+    'loggers': {
+        'tickets': {
+            'handlers': ['structured_console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'tickets.predictor': {
+            'handlers': ['structured_console'],
+            'level': 'DEBUG' if SLA_PREDICTOR_DEBUG else 'WARNING',
+            'propagate': False,
+        },
+    },
+}
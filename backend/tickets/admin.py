@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import ClusterSummary, PredictionLog, Ticket, UserProfile
+from .models import ClusterSummary, PredictionLog, Ticket, TicketRollup, UserProfile
+from .utils.rollups import month_of, tickets_changed
 
 
 @admin.register(Ticket)
@@ -9,6 +10,16 @@ class TicketAdmin(admin.ModelAdmin):
     list_filter = ('priority', 'category', 'is_sla_violated')
     search_fields = ('number', 'item')
 
+    # Edit/tambah memperbarui rollup lewat signal post_save; penghapusan di sini
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        tickets_changed({month_of(obj.open_date)})
+
+    def delete_queryset(self, request, queryset):
+        months = set(queryset.dates('open_date', 'month'))
+        super().delete_queryset(request, queryset)
+        tickets_changed(months)
+
 @admin.register(PredictionLog)
 class PredictionLogAdmin(admin.ModelAdmin):
     list_display = ('created_at', 'user', 'input_data', 'prediction_result')
@@ -23,4 +34,9 @@ class ClusterSummaryAdmin(admin.ModelAdmin):
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'role', 'email_verified')
-    list_filter = ('role', 'email_verified')
\ No newline at end of file
+    list_filter = ('role', 'email_verified')
+
+@admin.register(TicketRollup)
+class TicketRollupAdmin(admin.ModelAdmin):
+    list_display = ('month', 'priority', 'category', 'item', 'is_sla_violated', 'ticket_count')
+    list_filter = ('month', 'priority', 'is_sla_violated')
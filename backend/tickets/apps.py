@@ -1,6 +1,24 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate, post_save, pre_save
 
 
 class TicketsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tickets'
+
+    def ready(self):
+        from .models import Ticket
+        from .utils.rollups import remember_ticket_month, ticket_saved
+        from .utils.search import ensure_search_index
+        from .utils.trends import register_sqlite_functions
+
+        # Trigger FTS SQLite hilang jika tabel Ticket dibuat ulang oleh migration
+        post_migrate.connect(ensure_search_index, sender=self)
+        # Agregat persentil (SLA_PERCENTILE) untuk endpoint tren di SQLite
+        connection_created.connect(register_sqlite_functions)
+        # save() Ticket (admin, ORM) memperbarui rollup bulan tsb. Sengaja tanpa post_delete:
+        # receiver delete mematikan fast delete untuk QuerySet.delete() massal
+        # (penghapusan lewat admin ditangani TicketAdmin)
+        pre_save.connect(remember_ticket_month, sender=Ticket, dispatch_uid='ticket_rollup_month')
+        post_save.connect(ticket_saved, sender=Ticket, dispatch_uid='ticket_rollup_refresh')
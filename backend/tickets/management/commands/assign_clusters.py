@@ -0,0 +1,73 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from tickets.models import Ticket
+from tickets.utils.cluster_assign import get_cluster_assigner
+from tickets.utils.response_cache import bump_data_version
+
+# Jumlah tiket per statement UPDATE (di bawah batas 999 parameter SQLite lama)
+UPDATE_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Assign ulang cluster_id semua tiket ke centroid K-Prototypes terdekat'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Jumlah tiket per chunk/transaksi')
+        parser.add_argument('--only-missing', action='store_true', help='Hanya tiket yang cluster_id-nya kosong')
+
+    def handle(self, *args, **options):
+        assigner = get_cluster_assigner()
+        if assigner is None:
+            raise CommandError("Belum ada hasil clustering (summary_per_cluster kosong).")
+
+        batch_size = max(1, options['batch_size'])
+        fields = ['number'] + assigner.ticket_fields
+        queryset = Ticket.objects.order_by('number')
+        if options['only_missing']:
+            queryset = queryset.filter(cluster_id__isnull=True)
+        self.stdout.write(
+            f"Assign {queryset.count()} tiket ke {assigner.num_clusters} cluster "
+            f"(gamma {assigner.gamma}, kolom: {', '.join(fields[1:])})..."
+        )
+
+        counts = defaultdict(int)
+        done = 0
+        last_number = None
+        start = time.perf_counter()
+        while True:
+            # Keyset pagination: satu query pendek per chunk, tidak ada cursor terbuka saat UPDATE
+            page = queryset.filter(number__gt=last_number) if last_number is not None else queryset
+            rows = list(page.values(*fields)[:batch_size])
+            if not rows:
+                break
+            last_number = rows[-1]['number']
+
+            by_cluster = defaultdict(list)
+            for row, cluster_id in zip(rows, assigner.assign_tickets(rows)):
+                by_cluster[cluster_id].append(row['number'])
+            # k kecil: satu UPDATE ... WHERE number IN (...) per cluster, bukan CASE per tiket
+            with transaction.atomic():
+                for cluster_id, numbers in by_cluster.items():
+                    for offset in range(0, len(numbers), UPDATE_BATCH_SIZE):
+                        Ticket.objects.filter(number__in=numbers[offset:offset + UPDATE_BATCH_SIZE]).update(
+                            cluster_id=cluster_id
+                        )
+                    counts[cluster_id] += len(numbers)
+
+            done += len(rows)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{done} tiket di-assign ({done / elapsed if elapsed else 0:.0f} tiket/detik)")
+
+        if done:
+            bump_data_version()
+        elapsed = time.perf_counter() - start
+        self.stdout.write("Ukuran per cluster: " + ", ".join(
+            f"{cluster_id}: {count}" for cluster_id, count in sorted(counts.items())
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Assign selesai! {done} tiket dalam {elapsed:.1f} detik "
+            f"({done / elapsed if elapsed else 0:.0f} tiket/detik)."
+        ))
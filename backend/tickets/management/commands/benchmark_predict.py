@@ -0,0 +1,146 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from tickets.utils.forest_engine import FlatForest
+from tickets.utils.model_utils import CATEGORICAL_INPUT_COLUMNS, SLAPredictor
+
+
+class Command(BaseCommand):
+    help = 'Benchmark prediksi per-baris (predict) vs batch vektor (predict_batch)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Jumlah tiket sintetis')
+        parser.add_argument('--repeat', type=int, default=3, help='Jumlah pengulangan, diambil waktu terbaik')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--model-dir', default=None, help='Folder artefak model (default: tickets/utils)')
+        parser.add_argument('--engine-rows', type=int, default=10000,
+                            help='Jumlah baris batch besar untuk benchmark engine predict_proba')
+
+    def handle(self, *args, **options):
+        predictor = SLAPredictor(model_dir=options['model_dir'])
+
+        records = self.build_records(predictor, options['rows'], options['seed'])
+        self.stdout.write(f"Benchmark {len(records)} tiket, {options['repeat']}x pengulangan...")
+
+        single_time, single_results = self.best_of(options['repeat'], lambda: [predictor.predict(r) for r in records])
+        batch_time, batch_results = self.best_of(options['repeat'], lambda: predictor.predict_batch(records))
+
+        mismatches = sum(
+            1 for a, b in zip(single_results, batch_results)
+            if a.get('status') != b.get('status') or abs(a.get('confidence', 0) - b.get('confidence', 0)) > 1e-9
+        )
+
+        for label, elapsed in [('predict (per baris)', single_time), ('predict_batch', batch_time)]:
+            self.stdout.write(
+                f"{label:<22} total {elapsed * 1000:10.1f} ms | "
+                f"{elapsed / len(records) * 1e6:9.1f} us/tiket | {len(records) / elapsed:10.0f} tiket/detik"
+            )
+        self.stdout.write(f"Speedup: {single_time / batch_time:.1f}x")
+
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"{mismatches} hasil batch berbeda dari jalur per baris!"))
+        else:
+            self.stdout.write(self.style.SUCCESS('Hasil batch identik dengan jalur per baris.'))
+
+        self.benchmark_encoders(predictor, records, options['repeat'])
+        self.benchmark_engines(predictor, options['engine_rows'], options['repeat'], options['seed'])
+
+    def benchmark_engines(self, predictor, rows, repeat, seed):
+        """ predict_proba sklearn vs FlatForest (tanpa fallback) pada matriks fitur acak """
+        try:
+            flat = FlatForest.from_sklearn(predictor.model)
+        except TypeError as e:
+            self.stdout.write(f"\nEngine flat dilewati: {e}")
+            return
+        rng = np.random.default_rng(seed)
+        X_all = rng.normal(size=(max(rows, 1), predictor.model.n_features_in_)) * 3
+        self.stdout.write(
+            f"\npredict_proba sklearn vs flat ({flat.n_estimators} tree, {flat.node_count} node, "
+            f"engine aktif: {predictor.engine_name}):"
+        )
+        for n in sorted({1, 100, rows}):
+            X = X_all[:n]
+            sklearn_time, expected = self.best_of(repeat, lambda: predictor.model.predict_proba(X))
+            flat_time, actual = self.best_of(repeat, lambda: flat.predict_proba(X))
+            self.stdout.write(
+                f"  {n:>6} baris | sklearn {sklearn_time * 1000:9.3f} ms | flat {flat_time * 1000:9.3f} ms | "
+                f"speedup {sklearn_time / flat_time:5.2f}x"
+                + ("" if np.array_equal(expected, actual) else " | HASIL BERBEDA!")
+            )
+
+    def benchmark_encoders(self, predictor, records, repeat):
+        """ Micro-benchmark encoding kategorikal: LabelEncoder vs lookup table """
+        self.stdout.write("\nEncoding kategorikal (per kolom):")
+        for notebook_col, react_col in CATEGORICAL_INPUT_COLUMNS:
+            if notebook_col not in predictor.encoders:
+                continue
+            le = predictor.encoders[notebook_col]
+            table, fallback = predictor.encoder_tables[notebook_col]
+            values = [str(r.get(react_col, 'nan')).lower().strip() for r in records]
+
+            def label_encoder_per_value():
+                unknown = le.transform(['unknown'])[0] if 'unknown' in le.classes_ else -1
+                return [le.transform([v])[0] if v in le.classes_ else unknown for v in values]
+
+            def label_encoder_vectorized():
+                arr = np.asarray(values)
+                known = np.isin(arr, le.classes_)
+                result = np.full(len(arr), -1, dtype=np.int64)
+                if known.any():
+                    result[known] = le.transform(arr[known])
+                if not known.all() and 'unknown' in le.classes_:
+                    result[~known] = le.transform(['unknown'])[0]
+                return result
+
+            timings = {}
+            outputs = {}
+            for label, fn in [
+                ('LabelEncoder per nilai', label_encoder_per_value),
+                ('lookup per nilai', lambda: [table.get(v, fallback) for v in values]),
+                ('LabelEncoder vektor', label_encoder_vectorized),
+                ('encode_column', lambda: predictor.encode_column(notebook_col, values)),
+            ]:
+                timings[label], outputs[label] = self.best_of(repeat, fn)
+
+            reference = np.asarray(outputs['LabelEncoder per nilai'], dtype=np.int64)
+            same = all(np.array_equal(reference, np.asarray(out, dtype=np.int64)) for out in outputs.values())
+            self.stdout.write(
+                f"  {notebook_col:<13} " + " | ".join(
+                    f"{label} {elapsed / len(values) * 1e6:.2f} us" for label, elapsed in timings.items()
+                ) + f" | speedup per nilai {timings['LabelEncoder per nilai'] / timings['lookup per nilai']:.0f}x"
+                + ("" if same else " | HASIL BERBEDA!")
+            )
+
+    @staticmethod
+    def best_of(repeat, fn):
+        best, result = float('inf'), None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+        return best, result
+
+    @staticmethod
+    def build_records(predictor, rows, seed):
+        """ Tiket sintetis dengan nilai kategorikal dari encoder (plus beberapa nilai tak dikenal) """
+        rng = random.Random(seed)
+        classes = {
+            col: list(predictor.encoders[col].classes_) + ['tidak dikenal']
+            for col in ['Priority', 'Category', 'Item'] if col in predictor.encoders
+        }
+        base = datetime(2025, 1, 1)
+        records = []
+        for _ in range(rows):
+            open_dt = base + timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+            due_dt = open_dt + timedelta(hours=rng.randint(1, 24 * 14))
+            records.append({
+                'priority': rng.choice(classes.get('Priority', ['3 - medium'])),
+                'category': rng.choice(classes.get('Category', ['application'])),
+                'item': rng.choice(classes.get('Item', ['application 10'])),
+                'open_date': open_dt.isoformat(timespec='minutes'),
+                'due_date': due_dt.isoformat(timespec='minutes'),
+            })
+        return records
@@ -0,0 +1,102 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+from tickets.utils.synthetic import clear_synthetic_tickets, seed_tickets
+from tickets.views import (TicketViewSet, get_monthly_trend, get_stats,
+                           get_unique_values, get_violation_by_category)
+
+# (nama, view, query params) sesuai kombinasi filter yang dipakai dashboard
+ENDPOINT_CASES = [
+    ('tickets: default', TicketViewSet.as_view({'get': 'list'}), {}),
+    ('tickets: priority', TicketViewSet.as_view({'get': 'list'}), {'priority': '2 - High'}),
+    ('tickets: category', TicketViewSet.as_view({'get': 'list'}), {'category': 'application'}),
+    ('tickets: violated', TicketViewSet.as_view({'get': 'list'}), {'is_sla_violated': 'true'}),
+    ('tickets: prio+violated asc', TicketViewSet.as_view({'get': 'list'}),
+     {'priority': '1 - Critical', 'is_sla_violated': 'true', 'sort': 'open_date'}),
+    ('stats', get_stats, {}),
+    ('stats: priority', get_stats, {'priority': '2 - High'}),
+    ('stats: violated', get_stats, {'is_sla_violated': 'true'}),
+    ('stats: group_by month', get_stats, {'group_by': 'month'}),
+    ('violation-by-category', get_violation_by_category, {}),
+    ('monthly-trend', get_monthly_trend, {}),
+    ('unique-values', get_unique_values, {}),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark query endpoint dashboard: timing + EXPLAIN plan (SQLite/PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=0, help='Seed N tiket sintetis dulu (default: pakai data yang ada)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeat', type=int, default=5, help='Jumlah eksekusi per endpoint')
+        parser.add_argument('--keep', action='store_true', help='Jangan hapus tiket sintetis setelah benchmark')
+        parser.add_argument('--no-explain', action='store_true', help='Hanya timing, tanpa EXPLAIN')
+        parser.add_argument('--analyze', action='store_true', help='PostgreSQL: EXPLAIN (ANALYZE, BUFFERS)')
+        parser.add_argument('--use-rollups', action='store_true', help='Endpoint statistik membaca TicketRollup')
+
+    def handle(self, *args, **options):
+        seeded = 0
+        if options['rows'] > 0:
+            start = time.perf_counter()
+            seeded = seed_tickets(options['rows'], seed=options['seed'])
+            self.stdout.write(f"{seeded} tiket sintetis dibuat dalam {time.perf_counter() - start:.1f} detik.")
+            # Statistik planner diperbarui agar plan mencerminkan data baru
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        try:
+            self.stdout.write(f"Database: {connection.vendor}, {options['repeat']}x per endpoint\n")
+            user = get_user_model()(username='benchmark')
+            with override_settings(SLA_CACHE_ENABLED=False, SLA_USE_ROLLUPS=options['use_rollups']):
+                for name, view, params in ENDPOINT_CASES:
+                    self.run_case(name, view, params, user, options)
+        finally:
+            if seeded and not options['keep']:
+                self.stdout.write(f"{clear_synthetic_tickets()} tiket sintetis dihapus.")
+
+    def run_case(self, name, view, params, user, options):
+        factory = APIRequestFactory()
+        timings = []
+        for _ in range(max(1, options['repeat'])):
+            request = factory.get('/', params)
+            force_authenticate(request, user=user)
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = view(request)
+                response.render()
+                timings.append(time.perf_counter() - start)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{name:<28} best {min(timings) * 1000:8.1f} ms | median {statistics.median(timings) * 1000:8.1f} ms | "
+            f"{len(captured)} query | HTTP {response.status_code}"
+        ))
+        if options['no_explain']:
+            return
+        for query in captured.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            self.stdout.write(f"  SQL ({float(query['time']) * 1000:.1f} ms): {sql[:200]}{'...' if len(sql) > 200 else ''}")
+            for line in self.explain(sql, options['analyze']):
+                self.stdout.write(f"    {line}")
+        self.stdout.write('')
+
+    @staticmethod
+    def explain(sql, analyze=False):
+        if connection.vendor == 'sqlite':
+            prefix = 'EXPLAIN QUERY PLAN '
+        elif connection.vendor == 'postgresql':
+            prefix = 'EXPLAIN (ANALYZE, BUFFERS) ' if analyze else 'EXPLAIN '
+        else:
+            prefix = 'EXPLAIN '
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql)
+            rows = cursor.fetchall()
+        # SQLite: (id, parent, notused, detail); PostgreSQL/MySQL: baris teks plan
+        return [str(row[-1]) if connection.vendor == 'sqlite' else ' | '.join(map(str, row)) for row in rows]
@@ -0,0 +1,354 @@
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from io import StringIO
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from tickets.models import PredictionLog, Ticket
+from tickets.utils.cluster_artifacts import cluster_artifact_loader
+from tickets.utils.model_utils import WARMUP_RECORD, get_predictor
+from tickets.utils.prediction_log import reset_prediction_log
+from tickets.utils.synthetic import (SYNTHETIC_LOG_IP, SYNTHETIC_PREFIX, clear_synthetic_prediction_logs,
+                                     clear_synthetic_tickets, seed_prediction_logs, write_cluster_artifact,
+                                     write_ticket_csv)
+from tickets.views import (TicketViewSet, get_clusters, get_heatmap, get_monthly_trend, get_stats, get_trend,
+                           get_unique_values, get_violation_by_category, predict_sla, predict_sla_batch)
+
+# (nama, view, method, query params / body); nama menjadi key hasil JSON dan pembanding baseline
+ENDPOINT_CASES = [
+    ('stats', get_stats, 'get', {}),
+    ('stats: group_by month', get_stats, 'get', {'group_by': 'month'}),
+    ('monthly-trend', get_monthly_trend, 'get', {}),
+    ('violation-by-category', get_violation_by_category, 'get', {}),
+    ('unique-values', get_unique_values, 'get', {}),
+    ('trend: week', get_trend, 'get', {'bucket': 'week'}),
+    ('heatmap', get_heatmap, 'get', {}),
+    ('clusters', get_clusters, 'get', {}),
+    ('clusters: stratified 20000', get_clusters, 'get', {'sampling': 'stratified', 'limit': '20000'}),
+    ('tickets: default', TicketViewSet.as_view({'get': 'list'}), 'get', {}),
+    ('tickets: priority+violated', TicketViewSet.as_view({'get': 'list'}), 'get',
+     {'priority': '1 - Critical', 'is_sla_violated': 'true'}),
+    ('predict', predict_sla, 'post', WARMUP_RECORD),
+    ('predict: batch 100', predict_sla_batch, 'post', {
+        'tickets': [dict(WARMUP_RECORD, item=f"application {i % 50 + 1}") for i in range(100)],
+    }),
+]
+PREDICT_CASES = ('predict', 'predict: batch 100')
+# User yang dipakai request benchmark (PredictionLog dari endpoint predict butuh user tersimpan)
+BENCHMARK_USERNAME = 'sla-benchmark'
+
+
+def parse_scale(value):
+    """ '10k' -> 10000, '1M' -> 1000000, '2500' -> 2500 """
+    text = str(value).strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    try:
+        scale = int(float(text[:-1] if multiplier > 1 else text) * multiplier)
+    except ValueError:
+        raise CommandError(f"Skala tidak valid: {value} (contoh: 10k, 100k, 1M)")
+    if scale <= 0:
+        raise CommandError(f"Skala harus > 0: {value}")
+    return scale
+
+
+class QueryCounter:
+    """ execute_wrapper: hitung query tanpa menyimpan SQL (aman untuk import jutaan baris) """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def summarize(timings):
+    ms = np.asarray(timings) * 1000
+    return {
+        'first_ms': round(float(ms[0]), 3),
+        'best_ms': round(float(ms.min()), 3),
+        'median_ms': round(float(statistics.median(ms)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'runs': len(ms),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark suite: data sintetis (Ticket, PredictionLog, artefak cluster) per skala, '
+        'timing import_tickets + endpoint API in-process, jumlah query, hasil JSON + perbandingan baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', nargs='+', default=['10k'], help='Jumlah tiket per skala, mis. 10k 100k 1M')
+        parser.add_argument('--repeat', type=int, default=5, help='Jumlah eksekusi per endpoint')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--logs-ratio', type=float, default=0.1,
+                            help='Jumlah PredictionLog sintetis per tiket (default 0.1)')
+        parser.add_argument('--clusters', type=int, default=4, help='Jumlah cluster artefak sintetis')
+        parser.add_argument('--batch-size', type=int, default=5000, help='--batch-size untuk import_tickets')
+        parser.add_argument('--output', default=None, help='File hasil JSON (default: benchmark-<waktu>.json)')
+        parser.add_argument('--baseline', default=None, help='File JSON hasil sebelumnya untuk dibandingkan')
+        parser.add_argument('--tolerance', type=float, default=1.25,
+                            help='Regresi jika median > baseline x tolerance (default 1.25)')
+        parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                            help='Selisih median di bawah ini dianggap noise (default 5 ms)')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit error jika ada regresi')
+        parser.add_argument('--skip-predict', action='store_true', help='Lewati endpoint prediksi (tanpa file model)')
+        parser.add_argument('--keep', action='store_true', help='Jangan hapus data sintetis setelah skala terakhir')
+        parser.add_argument(
+            '--allow-live-db', action='store_true',
+            help='Izinkan berjalan di database yang berisi tiket/PredictionLog non-sintetis '
+                 '(default: ditolak; pakai database terpisah lewat DATABASE_URL)',
+        )
+
+    def handle(self, *args, **options):
+        scales = [parse_scale(value) for value in options['scales']]
+        baseline = self.load_baseline(options['baseline'])
+        self.check_database(options['allow_live_db'])
+        # Keduanya selalu dijalankan (bukan `or`: log sintetis tetap dihapus walau tidak ada tiket sintetis)
+        tickets = clear_synthetic_tickets()
+        logs = clear_synthetic_prediction_logs()
+        if tickets or logs:
+            self.stdout.write(f"Data sintetis dari run sebelumnya dihapus ({tickets} tiket, {logs} PredictionLog).")
+
+        results = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'git_revision': git_revision(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'cpu_count': os.cpu_count(),
+                'repeat': options['repeat'],
+                'seed': options['seed'],
+                'existing_tickets': Ticket.objects.count(),
+                'existing_prediction_logs': PredictionLog.objects.count(),
+            },
+            'scales': {},
+        }
+
+        tmp_dir = tempfile.mkdtemp(prefix='sla-benchmark-')
+        original_artifact_path = cluster_artifact_loader.json_path
+        try:
+            for index, scale in enumerate(scales):
+                keep = options['keep'] and index == len(scales) - 1
+                results['scales'][str(scale)] = self.run_scale(scale, tmp_dir, keep, options)
+        finally:
+            cluster_artifact_loader.json_path = original_artifact_path
+            cluster_artifact_loader.clear()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        output = options['output'] or f"benchmark-{timezone.now():%Y%m%d-%H%M%S}.json"
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Hasil ditulis ke {output}"))
+
+        if baseline is not None:
+            regressions = self.compare(results, baseline, options['tolerance'], options['min_delta_ms'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f"{regressions} regresi dibanding baseline {options['baseline']}")
+
+    def check_database(self, allow_live_db):
+        """
+        Benchmark menulis dan menghapus jutaan baris serta memicu rebuild rollup:
+        database berisi data asli ditolak kecuali --allow-live-db.
+        """
+        live_tickets = Ticket.objects.exclude(number__startswith=SYNTHETIC_PREFIX).count()
+        live_logs = PredictionLog.objects.exclude(ip_address=SYNTHETIC_LOG_IP).count()
+        if not live_tickets and not live_logs:
+            return
+        database = connection.settings_dict['NAME']
+        if not allow_live_db:
+            raise CommandError(
+                f"Database {database} berisi {live_tickets} tiket dan {live_logs} PredictionLog non-sintetis. "
+                f"Jalankan benchmark di database terpisah (DATABASE_URL=...) atau tambahkan --allow-live-db."
+            )
+        self.stdout.write(self.style.WARNING(
+            f"--allow-live-db: benchmark berjalan di {database} bersama {live_tickets} tiket "
+            f"dan {live_logs} PredictionLog asli."
+        ))
+
+    @staticmethod
+    def load_baseline(path):
+        if not path:
+            return None
+        try:
+            with open(path, encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Baseline {path} tidak bisa dibaca: {e}")
+
+    def run_scale(self, scale, tmp_dir, keep, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n=== Skala {scale} tiket ==="))
+        result = {'setup': {}, 'endpoints': {}}
+        # Data sintetis dihapus juga jika import/seeding/endpoint gagal (--keep hanya untuk run yang selesai)
+        completed = False
+        try:
+            self.benchmark_scale(scale, tmp_dir, options, result)
+            completed = True
+        finally:
+            if not (keep and completed):
+                self.cleanup()
+        return result
+
+    def benchmark_scale(self, scale, tmp_dir, options, result):
+        """ Artefak cluster, import, seeding PredictionLog dan endpoint satu skala; hasil diisi ke result """
+        seed = options['seed']
+
+        # 1. Artefak cluster dulu: import_tickets meng-assign cluster_id ke artefak ini
+        start = time.perf_counter()
+        artifact_path = write_cluster_artifact(
+            os.path.join(tmp_dir, f"cluster_results_{scale}.json"), scale, k=options['clusters'], seed=seed,
+        )
+        cluster_artifact_loader.json_path = artifact_path
+        cluster_artifact_loader.clear()
+        result['setup']['cluster_artifact_s'] = round(time.perf_counter() - start, 3)
+
+        # 2. import_tickets end-to-end dari CSV sintetis
+        csv_path = os.path.join(tmp_dir, f"tickets_{scale}.csv")
+        start = time.perf_counter()
+        write_ticket_csv(csv_path, scale, seed=seed)
+        result['setup']['csv_s'] = round(time.perf_counter() - start, 3)
+        result['import_tickets'] = self.run_import(csv_path, scale, options['batch_size'])
+        os.remove(csv_path)
+
+        # 3. PredictionLog sintetis
+        logs = int(scale * options['logs_ratio'])
+        start = time.perf_counter()
+        seed_prediction_logs(logs, seed=seed)
+        result['setup']['prediction_logs'] = logs
+        result['setup']['prediction_logs_s'] = round(time.perf_counter() - start, 3)
+        with connection.cursor() as cursor:
+            # Statistik planner diperbarui agar plan mencerminkan data baru
+            cursor.execute('ANALYZE')
+
+        # 4. Endpoint (response cache mati agar setiap eksekusi benar-benar menghitung)
+        user, _ = get_user_model().objects.get_or_create(username=BENCHMARK_USERNAME)
+        with override_settings(SLA_CACHE_ENABLED=False):
+            for name, view, method, payload in ENDPOINT_CASES:
+                if name in PREDICT_CASES and not self.predictor_available(options):
+                    continue
+                result['endpoints'][name] = self.run_case(view, method, payload, user, options['repeat'])
+                self.report(name, result['endpoints'][name])
+
+    def run_import(self, csv_path, scale, batch_size):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            call_command('import_tickets', file=csv_path, batch_size=batch_size, stdout=StringIO())
+        elapsed = time.perf_counter() - start
+        result = {
+            'rows': scale,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(scale / elapsed) if elapsed else None,
+            'queries': counter.count,
+        }
+        self.stdout.write(
+            f"{'import_tickets':<28} {elapsed:8.2f} s | {result['rows_per_second']} baris/detik | "
+            f"{counter.count} query"
+        )
+        return result
+
+    def predictor_available(self, options):
+        if options['skip_predict']:
+            return False
+        if not hasattr(self, '_predictor_error'):
+            try:
+                get_predictor()
+                self._predictor_error = None
+            except Exception as e:
+                self._predictor_error = str(e)
+                self.stdout.write(self.style.WARNING(f"Endpoint prediksi dilewati: {e}"))
+        return self._predictor_error is None
+
+    @staticmethod
+    def run_case(view, method, payload, user, repeat):
+        factory = APIRequestFactory()
+        timings = []
+        for _ in range(max(1, repeat)):
+            if method == 'post':
+                request = factory.post('/', payload, format='json', REMOTE_ADDR=SYNTHETIC_LOG_IP)
+            else:
+                request = factory.get('/', payload)
+            force_authenticate(request, user=user)
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                response = view(request)
+                response.render()
+                timings.append(time.perf_counter() - start)
+        return {
+            **summarize(timings),
+            'queries': counter.count,
+            'status': response.status_code,
+            'bytes': len(response.content),
+        }
+
+    def report(self, name, case):
+        self.stdout.write(
+            f"{name:<28} first {case['first_ms']:8.1f} ms | median {case['median_ms']:8.1f} ms | "
+            f"p95 {case['p95_ms']:8.1f} ms | {case['queries']} query | HTTP {case['status']} | {case['bytes']} B"
+        )
+
+    def cleanup(self):
+        # PredictionLog dari endpoint predict ditulis write-behind: flush dulu sebelum dihapus
+        reset_prediction_log()
+        # Rollup bulan yang disentuh tiket sintetis dihitung ulang oleh clear_synthetic_tickets
+        tickets = clear_synthetic_tickets()
+        logs = clear_synthetic_prediction_logs()
+        get_user_model().objects.filter(username=BENCHMARK_USERNAME).delete()
+        self.stdout.write(f"{tickets} tiket dan {logs} PredictionLog sintetis dihapus.")
+
+    def compare(self, results, baseline, tolerance, min_delta_ms):
+        """ Bandingkan median & jumlah query per (skala, endpoint) dengan baseline; kembalikan jumlah regresi """
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== Perbandingan dengan baseline ==="))
+        regressions = 0
+        for scale, current in results['scales'].items():
+            previous = baseline.get('scales', {}).get(scale)
+            if previous is None:
+                self.stdout.write(f"Skala {scale}: tidak ada di baseline.")
+                continue
+            cases = [(name, case, previous.get('endpoints', {}).get(name)) for name, case in current['endpoints'].items()]
+            cases.append(('import_tickets', current['import_tickets'], previous.get('import_tickets')))
+            for name, case, old in cases:
+                if old is None:
+                    continue
+                key = 'seconds' if name == 'import_tickets' else 'median_ms'
+                scale_ms = 1000 if key == 'seconds' else 1
+                new_ms, old_ms = case[key] * scale_ms, old[key] * scale_ms
+                ratio = new_ms / old_ms if old_ms else float('inf')
+                slower = ratio > tolerance and new_ms - old_ms > min_delta_ms
+                more_queries = case['queries'] > old.get('queries', case['queries'])
+                line = (
+                    f"[{scale}] {name:<28} {old_ms:9.1f} -> {new_ms:9.1f} ms ({ratio:5.2f}x) | "
+                    f"query {old.get('queries')} -> {case['queries']}"
+                )
+                if slower or more_queries:
+                    regressions += 1
+                    self.stdout.write(self.style.ERROR(line + "  REGRESI"))
+                else:
+                    self.stdout.write(line)
+        self.stdout.write(f"{regressions} regresi (toleransi {tolerance}x, noise {min_delta_ms} ms).")
+        return regressions
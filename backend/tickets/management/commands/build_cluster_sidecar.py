@@ -0,0 +1,28 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from tickets.utils.cluster_artifacts import CLUSTER_RESULTS_PATH, write_cluster_sidecar
+from tickets.utils.response_cache import bump_data_version
+
+
+class Command(BaseCommand):
+    help = 'Simpan koordinat cluster_results.json ke sidecar biner .npz'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=CLUSTER_RESULTS_PATH, help='Path cluster_results.json')
+        parser.add_argument(
+            '--strip-json', action='store_true',
+            help='Tulis ulang JSON tanpa array koordinat (hanya summary) agar cepat di-load',
+        )
+
+    def handle(self, *args, **options):
+        json_path = options['path']
+        if not os.path.exists(json_path):
+            raise CommandError(f"File tidak ditemukan: {json_path}")
+
+        npz_path, arrays = write_cluster_sidecar(json_path, strip_json=options['strip_json'])
+        bump_data_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Sidecar ditulis: {npz_path} ({len(arrays['cluster_labels'])} titik, "
+            f"{os.path.getsize(npz_path) / 1024:.0f} KB)."
+        ))
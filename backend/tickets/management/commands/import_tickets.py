@@ -1,75 +1,229 @@
 import csv
 import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from itertools import islice
 
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
 from django.utils import timezone
 from tickets.models import Ticket
+from tickets.utils.business_calendar import is_off
+from tickets.utils.cluster_assign import get_cluster_assigner
+from tickets.utils.rollups import month_of, months_of_tickets, tickets_changed
+
+DEFAULT_CSV_PATH = os.path.join('tickets', 'management', 'commands', 'processed_tickets.csv')
+CSV_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+PRIORITY_MAPPING = {
+    'Low': '4 - Low',
+    'Medium': '3 - Medium',
+    '2 - High': '2 - High',
+    'Critical': '1 - Critical',
+}
+
+# Kolom yang ditimpa saat tiket dengan 'number' yang sama sudah ada (created_at dan
+# skor risiko dari rescore_tickets dipertahankan; updated_at ikut diperbarui sehingga
+# tiket yang di-import ulang dipilih rescore_tickets --since)
+UPSERT_FIELDS = [
+    field.name for field in Ticket._meta.concrete_fields
+    if field.name not in ('number', 'created_at') and not field.name.startswith('risk_')
+]
+# Tanpa hasil clustering cluster_id lama dipertahankan (tidak ditimpa NULL)
+UPSERT_FIELDS_WITHOUT_CLUSTER = [field for field in UPSERT_FIELDS if field != 'cluster_id']
+
+
+def parse_row(row, tz, recompute_off_days=False):
+    """
+    Ubah satu baris CSV menjadi kwargs Ticket.
+    Raise ValueError jika baris tidak valid (tanggal/angka/prioritas).
+    recompute_off_days: kolom Is Open/Due Date Off tidak dibaca dari CSV
+    (diisi parse_chunk dari kalender hari kerja).
+    """
+    open_date_naive = datetime.strptime(row['Open Date'], CSV_DATE_FORMAT)
+    due_date_naive = datetime.strptime(row['Due Date'], CSV_DATE_FORMAT)
+    closed_date_naive = None
+    if row['Closed Date']:
+        closed_date_naive = datetime.strptime(row['Closed Date'], CSV_DATE_FORMAT)
+    raw_priority = row['Priority']
+    mapped_priority = PRIORITY_MAPPING.get(raw_priority)
+    if not mapped_priority:
+        raise ValueError(f"Prioritas '{raw_priority}' tidak dikenal.")
+    return dict(
+        number=row['Number'],
+        priority=mapped_priority,
+        category=row['Category'],
+        open_date=timezone.make_aware(open_date_naive, tz),
+        closed_date=timezone.make_aware(closed_date_naive, tz) if closed_date_naive else None,
+        due_date=timezone.make_aware(due_date_naive, tz),
+        time_left_incl_on_hold=float(row['Time Left Incl. On Hold']),
+        item=row['Item'],
+        is_sla_violated=bool(int(row['Is SLA Violated'])),
+        is_open_date_off=0 if recompute_off_days else int(row['Is Open Date Off'] == 'Hari Libur'),
+        is_due_date_off=0 if recompute_off_days else int(row['Is Due Date Off'] == 'Hari Libur'),
+        days_to_due=int(row['Days to Due']),
+        open_month=int(row['Open Month']),
+        application_creation_day_of_week=row['Application Creation Day of Week'],
+        application_creation_hour=int(row['Application Creation Hour']),
+        application_sla_deadline_day_of_week=row['Application SLA Deadline Day of Week'],
+        application_sla_deadline_hour=int(row['Application SLA Deadline Hour']),
+        resolution_duration=float(row['Resolution Duration']),
+        total_tickets_resolved_wc=float(row['Total Tickets Resolved (Wc)']),
+        sla_threshold=float(row['SLA Threshold']),
+        average_resolution_time_ac=float(row['Average Resolution Time (Ac)']),
+        sla_to_average_resolution_ratio_rc=float(row['SLA to Average Resolution Ratio (Rc)']),
+        application_sla_compliance_rate=float(row['Application SLA Compliance Rate']),
+    )
+
+
+def parse_chunk(rows, tz, recompute_off_days=False):
+    """
+    Parse satu chunk baris CSV. Fungsi top-level agar bisa dijalankan di
+    worker process. Mengembalikan (list kwargs Ticket, list pesan warning).
+    """
+    parsed, warnings = [], []
+    for row in rows:
+        try:
+            parsed.append(parse_row(row, tz, recompute_off_days))
+        except (KeyError, TypeError, ValueError) as e:
+            warnings.append(f"Error parsing row {row.get('Number', 'unknown')}: {e}")
+    if recompute_off_days and parsed:
+        # Satu lookup vektor per chunk ke kalender (weekend + libur nasional tahun tsb)
+        open_off = is_off([ticket['open_date'] for ticket in parsed])
+        due_off = is_off([ticket['due_date'] for ticket in parsed])
+        for ticket, open_value, due_value in zip(parsed, open_off.tolist(), due_off.tolist()):
+            ticket['is_open_date_off'] = open_value
+            ticket['is_due_date_off'] = due_value
+    return parsed, warnings
 
 
 class Command(BaseCommand):
-    help = 'Import tickets from CSV'
+    help = 'Import tickets from CSV (streaming per chunk, upsert berdasarkan number)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=DEFAULT_CSV_PATH, help='Path file CSV')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Jumlah baris per chunk/transaksi')
+        parser.add_argument('--workers', type=int, default=1, help='Jumlah process untuk parsing CSV')
+        parser.add_argument('--dry-run', action='store_true', help='Hanya parse & validasi, tanpa menulis ke database')
+        parser.add_argument(
+            '--recompute-off-days', action='store_true',
+            help='Hitung Is Open/Due Date Off dari kalender hari kerja, bukan dari kolom CSV',
+        )
+
     def handle(self, *args, **options):
-        csv_path = os.path.join('tickets', 'management', 'commands', 'processed_tickets.csv')
-        
+        csv_path = options['file']
+        batch_size = max(1, options['batch_size'])
+        workers = max(1, options['workers'])
+        dry_run = options['dry_run']
+
         if not os.path.exists(csv_path):
             self.stdout.write(self.style.ERROR(f"File tidak ditemukan: {csv_path}"))
             return
-        self.stdout.write(f"File ditemukan: {csv_path}")  
-        priority_mapping = {
-            'Low': '4 - Low',
-            'Medium': '3 - Medium',
-            '2 - High': '2 - High',  
-            'Critical': '1 - Critical',
-        }
-        with open(csv_path, 'r', encoding='utf-8') as file:
+        self.stdout.write(f"File ditemukan: {csv_path}")
+        if dry_run:
+            self.stdout.write(self.style.WARNING("Mode dry-run: tidak ada data yang ditulis."))
+
+        tz = timezone.get_current_timezone()
+        self.affected_months = set()
+        # Cluster terdekat diisi saat menulis chunk (None jika belum ada hasil clustering)
+        self.cluster_assigner = None if dry_run else get_cluster_assigner()
+        if not dry_run and self.cluster_assigner is None:
+            self.stdout.write(self.style.WARNING(
+                "Belum ada hasil clustering: cluster_id tiket baru dibiarkan kosong, tiket lama tidak diubah."
+            ))
+        imported_count = 0
+        read_count = 0
+        start = time.perf_counter()
+
+        with open(csv_path, 'r', encoding='utf-8', newline='') as file:
             reader = csv.DictReader(file)
-            imported_count = 0   
-            
-            self.stdout.write("Menghapus data tiket lama...")
-            Ticket.objects.all().delete()
-            self.stdout.write("Data lama dihapus.")
-
-            for row in reader:
-                try:
-                    open_date_naive = datetime.strptime(row['Open Date'], '%Y-%m-%d %H:%M:%S') 
-                    due_date_naive = datetime.strptime(row['Due Date'], '%Y-%m-%d %H:%M:%S')
-                    closed_date_naive = None
-                    if row['Closed Date']:
-                        closed_date_naive = datetime.strptime(row['Closed Date'], '%Y-%m-%d %H:%M:%S')                                                            
-                    raw_priority = row['Priority']                                     
-                    mapped_priority = priority_mapping.get(raw_priority)                    
-                    if not mapped_priority:
-                         self.stdout.write(self.style.WARNING(f"Skipping row {row.get('Number')}: Prioritas '{raw_priority}' tidak dikenal."))
-                         continue                    
-                    Ticket.objects.create(
-                        number=row['Number'],                                     
-                        priority=mapped_priority,                          
-                        category=row['Category'],
-                        open_date=timezone.make_aware(open_date_naive),
-                        closed_date=timezone.make_aware(closed_date_naive) if closed_date_naive else None,
-                        due_date=timezone.make_aware(due_date_naive),
-                        time_left_incl_on_hold=float(row['Time Left Incl. On Hold']),
-                        item=row['Item'],          
-                        is_sla_violated=bool(int(row['Is SLA Violated'])),
-                        is_open_date_off=True if row['Is Open Date Off'] == 'Hari Libur' else False,
-                        is_due_date_off=True if row['Is Due Date Off'] == 'Hari Libur' else False,
-                        days_to_due=int(row['Days to Due']),
-                        open_month=int(row['Open Month']),
-                        application_creation_day_of_week=row['Application Creation Day of Week'],
-                        application_creation_hour=int(row['Application Creation Hour']),
-                        application_sla_deadline_day_of_week=row['Application SLA Deadline Day of Week'],
-                        application_sla_deadline_hour=int(row['Application SLA Deadline Hour']),
-                        resolution_duration=float(row['Resolution Duration']),
-                        total_tickets_resolved_wc=float(row['Total Tickets Resolved (Wc)']),
-                        sla_threshold=float(row['SLA Threshold']),
-                        average_resolution_time_ac=float(row['Average Resolution Time (Ac)']),
-                        sla_to_average_resolution_ratio_rc=float(row['SLA to Average Resolution Ratio (Rc)']),
-                        application_sla_compliance_rate=float(row['Application SLA Compliance Rate']),
-                    )
-                    imported_count += 1
-                except ValueError as e:
-                    self.stdout.write(self.style.WARNING(f"Error parsing row {row.get('Number', 'unknown')}: {e}"))
-                    continue
-            
-            self.stdout.write(self.style.SUCCESS(f'Import selesai! {imported_count} rows imported.'))
\ No newline at end of file
+            chunks = iter(lambda: list(islice(reader, batch_size)), [])
+
+            parsed_chunks = self.parse_chunks(chunks, tz, workers, options['recompute_off_days'])
+            for rows_in_chunk, (tickets, warnings) in parsed_chunks:
+                for warning in warnings:
+                    self.stdout.write(self.style.WARNING(warning))
+                read_count += rows_in_chunk
+                if not dry_run:
+                    self.write_chunk(tickets)
+                imported_count += len(tickets)
+
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{read_count} baris dibaca, {imported_count} valid "
+                    f"({read_count / elapsed if elapsed else 0:.0f} baris/detik)"
+                )
+
+        if not dry_run and self.affected_months:
+            # Rollup bulan yang tersentuh (atau rebuild penuh jika belum segar) + versi data:
+            # cache response dashboard menjadi tidak valid setelah data berubah
+            rollup_count = tickets_changed(self.affected_months, rebuild_if_stale=True)
+            self.stdout.write(f"Rollup diperbarui ({rollup_count} baris).")
+
+        elapsed = time.perf_counter() - start
+        action = 'divalidasi' if dry_run else 'imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'Import selesai! {imported_count} rows {action} dalam {elapsed:.1f} detik '
+            f'({read_count / elapsed if elapsed else 0:.0f} baris/detik).'
+        ))
+
+    @staticmethod
+    def parse_chunks(chunks, tz, workers, recompute_off_days=False):
+        """
+        Generator (jumlah baris, hasil parse_chunk) sesuai urutan file.
+        Dengan workers > 1 parsing dilakukan paralel, tetapi jumlah chunk yang
+        sedang diproses dibatasi agar memori tetap konstan.
+        """
+        if workers == 1:
+            for rows in chunks:
+                yield len(rows), parse_chunk(rows, tz, recompute_off_days)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for rows in chunks:
+                pending.append((len(rows), executor.submit(parse_chunk, rows, tz, recompute_off_days)))
+                if len(pending) >= workers * 2:
+                    size, future = pending.popleft()
+                    yield size, future.result()
+            while pending:
+                size, future = pending.popleft()
+                yield size, future.result()
+
+    def write_chunk(self, tickets):
+        """ Upsert satu chunk tiket dalam satu transaksi """
+        # Number duplikat dalam satu chunk: baris terakhir yang dipakai
+        by_number = {ticket['number']: ticket for ticket in tickets}
+        if not by_number:
+            return
+        if self.cluster_assigner is not None:
+            tickets = list(by_number.values())
+            for ticket, cluster_id in zip(tickets, self.cluster_assigner.assign_tickets(tickets)):
+                ticket['cluster_id'] = cluster_id
+        # auto_now hanya diisi bulk_create; jalur bulk_update butuh nilai eksplisit
+        updated_at = timezone.now()
+        objs = [Ticket(**ticket, updated_at=updated_at) for ticket in by_number.values()]
+
+        # Bulan lama (tiket yang ditimpa) dan bulan baru perlu dihitung ulang di rollup
+        self.affected_months |= months_of_tickets(list(by_number))
+        self.affected_months |= {month_of(obj.open_date) for obj in objs}
+
+        update_fields = UPSERT_FIELDS if self.cluster_assigner is not None else UPSERT_FIELDS_WITHOUT_CLUSTER
+        with transaction.atomic():
+            if connection.features.supports_update_conflicts_with_target:
+                Ticket.objects.bulk_create(
+                    objs,
+                    update_conflicts=True,
+                    unique_fields=['number'],
+                    update_fields=update_fields,
+                )
+            else:
+                existing = set(
+                    Ticket.objects.filter(number__in=by_number.keys()).values_list('number', flat=True)
+                )
+                Ticket.objects.bulk_create([obj for obj in objs if obj.number not in existing])
+                Ticket.objects.bulk_update(
+                    [obj for obj in objs if obj.number in existing], update_fields, batch_size=500
+                )
@@ -0,0 +1,31 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from tickets.utils.response_cache import bump_data_version
+from tickets.utils.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = 'Bangun ulang tabel TicketRollup dari tabel Ticket'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month', action='append', default=[],
+            help='Hanya bulan tertentu (format YYYY-MM), boleh diulang. Default: semua bulan',
+        )
+
+    def handle(self, *args, **options):
+        months = None
+        if options['month']:
+            try:
+                months = [datetime.strptime(m, '%Y-%m').date() for m in options['month']]
+            except ValueError as e:
+                raise CommandError(f"Format bulan harus YYYY-MM: {e}")
+
+        start = time.perf_counter()
+        count = refresh_rollups(months)
+        bump_data_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rollup selesai: {count} baris dalam {time.perf_counter() - start:.2f} detik."
+        ))
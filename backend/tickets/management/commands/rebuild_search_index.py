@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from tickets.utils.search import install_search_index, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Pasang ulang & bangun ulang index pencarian tiket (FTS5 SQLite / pg_trgm PostgreSQL)'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if not install_search_index(connection):
+            self.stdout.write(self.style.WARNING(
+                f"Index pencarian tidak tersedia untuk {connection.vendor}; ?search= memakai LIKE."
+            ))
+            return
+        backend = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Index pencarian ({backend}) dibangun ulang dalam {time.perf_counter() - start:.2f} detik."
+        ))
@@ -0,0 +1,68 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from tickets.utils.cluster_artifacts import CLUSTER_RESULTS_PATH, MAX_SCATTER_LIMIT
+from tickets.utils.reclustering import ReclusterPipeline
+from tickets.utils.response_cache import bump_data_version
+
+logger = logging.getLogger('tickets.clustering')
+
+
+class Command(BaseCommand):
+    help = 'Jalankan ulang clustering K-Prototypes dari tabel Ticket dan perbarui artefak, ClusterSummary & cluster_id'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, nargs='+', default=[3],
+                            help='Jumlah cluster; lebih dari satu nilai = tuning dengan silhouette')
+        parser.add_argument('--gamma', type=float, nargs='+', default=None,
+                            help='Bobot kategorikal; default heuristik kmodes (0.5 * std numerik)')
+        parser.add_argument('--n-init', type=int, default=10, help='Jumlah inisialisasi K-Prototypes')
+        parser.add_argument('--workers', type=int, default=1, help='Process paralel untuk n_init (-1 = semua core)')
+        parser.add_argument('--fit-sample', type=int, default=None,
+                            help='Latih K-Prototypes pada sampel acak sebesar ini; semua tiket tetap di-assign')
+        parser.add_argument('--tuning-sample', type=int, default=20000, help='Ukuran sampel untuk tuning k/gamma')
+        parser.add_argument('--silhouette-sample', type=int, default=5000,
+                            help='Ukuran sampel stratified untuk silhouette')
+        parser.add_argument('--coords-sample', type=int, default=MAX_SCATTER_LIMIT,
+                            help='Jumlah titik PCA/MCA/UMAP yang disimpan untuk scatter plot')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Jumlah baris per fetch dari database')
+        parser.add_argument('--seed', type=int, default=42, help='random_state')
+        parser.add_argument('--path', default=CLUSTER_RESULTS_PATH, help='Lokasi cluster_results.json')
+
+    def handle(self, *args, **options):
+        if min(options['k']) < 2:
+            raise CommandError("--k minimal 2.")
+        try:
+            pipeline = ReclusterPipeline(
+                k_values=options['k'],
+                gammas=options['gamma'] or [None],
+                n_init=max(1, options['n_init']),
+                workers=options['workers'],
+                fit_sample=options['fit_sample'],
+                tuning_sample=max(1, options['tuning_sample']),
+                silhouette_sample=max(2, options['silhouette_sample']),
+                coords_sample=max(1, options['coords_sample']),
+                batch_size=max(1, options['batch_size']),
+                random_state=options['seed'],
+                log=self.stdout.write,
+            )
+            pipeline.run()
+        except (ImportError, ValueError) as e:
+            raise CommandError(str(e))
+
+        path = pipeline.write(options['path'])
+        # Summary & cluster_id tiket berubah: cache response lama tidak berlaku
+        bump_data_version()
+
+        timings = pipeline.timer.fields()
+        logger.info('recluster_tickets', extra=timings)
+        self.stdout.write("Waktu per tahap: " + ", ".join(
+            f"{stage[:-3]} {ms / 1000:.2f} s" for stage, ms in timings.items()
+        ))
+        self.stdout.write("Ukuran per cluster: " + ", ".join(
+            f"{cluster_id}: {item['size']}" for cluster_id, item in pipeline.summary.items()
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-clustering selesai! {len(pipeline.numbers)} tiket, {pipeline.assigner.num_clusters} cluster, "
+            f"silhouette {pipeline.silhouette}, artefak: {path}"
+        ))
@@ -0,0 +1,293 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from tickets.models import Ticket
+from tickets.utils.model_utils import SLAPredictor
+from tickets.utils.response_cache import bump_data_version
+
+# Kolom Ticket yang dibutuhkan untuk featurization (sama dengan input form prediksi)
+SOURCE_FIELDS = ['number', 'priority', 'category', 'item', 'open_date', 'due_date']
+# Jumlah tiket per statement UPDATE (di bawah batas 999 parameter SQLite lama)
+UPDATE_BATCH_SIZE = 500
+
+# Predictor per worker process (diwarisi saat fork, dimuat ulang jika spawn)
+_worker_predictor = None
+
+
+def _init_worker(model_dir, engine):
+    global _worker_predictor
+    if _worker_predictor is None:
+        import django
+        django.setup()
+        _worker_predictor = SLAPredictor(model_dir=model_dir, engine=engine)
+
+
+def score_chunk(rows, tz, predictor=None):
+    """
+    Skor satu chunk tiket (tuple SOURCE_FIELDS). Fungsi top-level agar bisa
+    dijalankan di worker process. Fitur dihitung dengan preprocess_batch
+    (logika sama dengan preprocess_input) dari waktu lokal TIME_ZONE, seperti
+    input form. Mengembalikan (number, probabilitas, keputusan) untuk baris
+    yang valid, jumlah baris gagal, dan durasi per tahap.
+    """
+    predictor = predictor or _worker_predictor
+    started = time.perf_counter()
+    records = [
+        {
+            'priority': priority,
+            'category': category,
+            'item': item,
+            'open_date': timezone.localtime(open_date, tz).isoformat(),
+            'due_date': timezone.localtime(due_date, tz).isoformat(),
+        }
+        for _, priority, category, item, open_date, due_date in rows
+    ]
+    X, valid_idx, errors = predictor.preprocess_batch(records)
+    preprocessed = time.perf_counter()
+
+    probas, _ = predictor.violation_probas(X, use_cache=False) if len(valid_idx) else ([], 0)
+    decisions = predictor.decisions(probas, [rows[i][1] for i in valid_idx])
+    scored = [
+        (rows[i][0], float(proba), bool(decision))
+        for i, proba, decision in zip(valid_idx.tolist(), probas, decisions.tolist())
+    ]
+    timings = {'preprocess': preprocessed - started, 'predict': time.perf_counter() - preprocessed}
+    return scored, len(errors), timings
+
+
+class Command(BaseCommand):
+    help = 'Hitung skor risiko model (probabilitas, keputusan, versi model) untuk tiket yang tersimpan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Jumlah tiket per chunk/transaksi')
+        parser.add_argument('--workers', type=int, default=1, help='Jumlah process untuk featurization + scoring')
+        parser.add_argument(
+            '--since',
+            help="Hanya tiket baru / berubah (updated_at >= tanggal ini, ISO 8601), atau 'last' = "
+                 "sejak awal run terakhir yang selesai",
+        )
+        parser.add_argument(
+            '--only-stale', action='store_true',
+            help='Hanya tiket yang belum diskor atau diskor dengan versi model lain',
+        )
+        parser.add_argument('--resume', action='store_true', help='Lanjutkan dari checkpoint run yang terputus')
+        parser.add_argument('--checkpoint', default=None, help='File checkpoint (default: SLA_RESCORE_CHECKPOINT)')
+        parser.add_argument('--model-dir', default=None, help='Folder artefak model (default: SLA_MODEL_DIR)')
+        parser.add_argument('--engine', default=None, help="Engine predict_proba: 'flat' atau 'sklearn'")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        workers = max(1, options['workers'])
+        checkpoint_path = options['checkpoint'] or settings.SLA_RESCORE_CHECKPOINT
+        model_dir = options['model_dir'] or getattr(settings, 'SLA_MODEL_DIR', None)
+
+        predictor = SLAPredictor(model_dir=model_dir, engine=options['engine'])
+        checkpoint = self.load_checkpoint(checkpoint_path)
+        if options['resume']:
+            if not checkpoint or checkpoint.get('finished_at'):
+                raise CommandError("Tidak ada run yang terputus untuk dilanjutkan.")
+            # Filter --since run yang terputus dipakai apa adanya (nilai 'last' sudah diselesaikan saat itu)
+            since = datetime.fromisoformat(checkpoint['since']) if checkpoint.get('since') else None
+            if options['since'] and self.parse_since(options['since'], checkpoint) != since:
+                raise CommandError("--since berbeda dengan run yang terputus; jalankan tanpa --resume.")
+        else:
+            since = self.parse_since(options['since'], checkpoint)
+
+        run = {
+            'model_version': predictor.model_version,
+            'since': since.isoformat() if since else None,
+            'only_stale': options['only_stale'],
+        }
+        last_number, scored_count = None, 0
+        if options['resume']:
+            if any(checkpoint.get(key) != value for key, value in run.items()):
+                raise CommandError(
+                    "Checkpoint berasal dari run dengan versi model / filter berbeda; jalankan tanpa --resume."
+                )
+            last_number, scored_count = checkpoint.get('last_number'), checkpoint.get('scored', 0)
+            run['started_at'] = checkpoint['started_at']
+            self.stdout.write(f"Melanjutkan setelah tiket {last_number} ({scored_count} sudah diskor).")
+        else:
+            run['started_at'] = timezone.now().isoformat()
+        # Dibawa di setiap checkpoint: --since last tetap bisa dipakai setelah run yang terputus
+        run['last_finished_started_at'] = self.last_finished_start(checkpoint)
+
+        queryset = Ticket.objects.order_by('number')
+        if since:
+            queryset = queryset.filter(updated_at__gte=since)
+        if options['only_stale']:
+            queryset = queryset.filter(
+                Q(risk_model_version__isnull=True) | ~Q(risk_model_version=predictor.model_version)
+            )
+        total = queryset.filter(number__gt=last_number).count() if last_number else queryset.count()
+        self.stdout.write(
+            f"Rescore {total} tiket dengan model {predictor.model_version} "
+            f"(engine {predictor.engine_name}, {workers} worker)..."
+        )
+
+        tz = timezone.get_current_timezone()
+        chunks = self.iter_chunks(queryset, last_number, batch_size)
+        timings = {'preprocess': 0.0, 'predict': 0.0, 'write': 0.0}
+        done = failed = 0
+        start = time.perf_counter()
+
+        for rows, (scored, errors, chunk_timings) in self.score_chunks(chunks, tz, workers, predictor, model_dir,
+                                                                        options['engine']):
+            write_start = time.perf_counter()
+            self.write_chunk(scored, predictor.model_version)
+            timings['write'] += time.perf_counter() - write_start
+            for stage, elapsed in chunk_timings.items():
+                timings[stage] += elapsed
+
+            done += len(rows)
+            failed += errors
+            scored_count += len(scored)
+            # Checkpoint hanya maju setelah chunk berurutan tersimpan
+            self.save_checkpoint(checkpoint_path, {**run, 'last_number': rows[-1][0], 'scored': scored_count})
+
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{done}/{total} tiket diproses, {scored_count} diskor "
+                f"({done / elapsed if elapsed else 0:.0f} tiket/detik)"
+            )
+
+        self.save_checkpoint(checkpoint_path, {
+            **run, 'last_number': None, 'scored': scored_count, 'finished_at': timezone.now().isoformat(),
+            'last_finished_started_at': run['started_at'],
+        })
+        if done:
+            # risk_* ikut tampil di /api/tickets/: cache response lama tidak berlaku
+            bump_data_version()
+
+        elapsed = time.perf_counter() - start
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{failed} tiket gagal di-featurize dan tidak diskor."))
+        self.stdout.write(
+            "Waktu per tahap (dijumlahkan antar worker): " + ", ".join(
+                f"{stage} {seconds:.2f} s" for stage, seconds in timings.items()
+            )
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Rescore selesai! {done} tiket dalam {elapsed:.1f} detik "
+            f"({done / elapsed if elapsed else 0:.0f} tiket/detik)."
+        ))
+
+    @staticmethod
+    def last_finished_start(checkpoint):
+        """ started_at run terakhir yang selesai, juga saat checkpoint berisi run yang terputus """
+        if not checkpoint:
+            return None
+        if checkpoint.get('finished_at'):
+            return checkpoint['started_at']
+        return checkpoint.get('last_finished_started_at')
+
+    @classmethod
+    def parse_since(cls, value, checkpoint):
+        if not value:
+            return None
+        if value == 'last':
+            started_at = cls.last_finished_start(checkpoint)
+            if not started_at:
+                raise CommandError("--since last butuh run sebelumnya yang sudah selesai.")
+            # Awal run sebelumnya: tiket yang berubah selama run tsb ikut diskor ulang
+            return datetime.fromisoformat(started_at)
+        try:
+            since = datetime.fromisoformat(value)
+        except ValueError as e:
+            raise CommandError(f"Format --since harus ISO 8601 atau 'last': {e}")
+        return timezone.make_aware(since) if timezone.is_naive(since) else since
+
+    @staticmethod
+    def iter_chunks(queryset, last_number, batch_size):
+        """
+        Keyset pagination berdasarkan number: satu query pendek per chunk
+        (tidak ada cursor yang terbuka selama bulk_update), dan bisa dimulai
+        dari checkpoint.
+        """
+        while True:
+            page = queryset.filter(number__gt=last_number) if last_number is not None else queryset
+            rows = list(page.values_list(*SOURCE_FIELDS)[:batch_size])
+            if not rows:
+                return
+            yield rows
+            last_number = rows[-1][0]
+
+    @staticmethod
+    def score_chunks(chunks, tz, workers, predictor, model_dir, engine):
+        """
+        Generator (rows, hasil score_chunk) sesuai urutan number. Dengan
+        workers > 1 scoring dilakukan paralel, jumlah chunk yang sedang
+        diproses dibatasi agar memori tetap konstan.
+        """
+        if workers == 1:
+            for rows in chunks:
+                yield rows, score_chunk(rows, tz, predictor)
+            return
+
+        global _worker_predictor
+        # Dengan fork, worker memakai predictor yang sudah dimuat ini
+        _worker_predictor = predictor
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model_dir, engine)) as executor:
+                pending = deque()
+                for rows in chunks:
+                    pending.append((rows, executor.submit(score_chunk, rows, tz)))
+                    if len(pending) >= workers * 2:
+                        rows, future = pending.popleft()
+                        yield rows, future.result()
+                while pending:
+                    rows, future = pending.popleft()
+                    yield rows, future.result()
+        finally:
+            _worker_predictor = None
+
+    @staticmethod
+    def write_chunk(scored, model_version):
+        """
+        Simpan skor satu chunk dalam satu transaksi. Hanya probabilitas yang
+        berbeda per tiket (bulk_update -> CASE WHEN); keputusan, versi model dan
+        waktu skor sama untuk banyak tiket sehingga cukup UPDATE ... WHERE
+        number IN (...) per kelompok keputusan, jauh lebih murah dibanding
+        ekspresi CASE per kolom yang dibangun ORM.
+        """
+        if not scored:
+            return
+        scored_at = timezone.now()
+        objs = [Ticket(number=number, risk_probability=proba) for number, proba, _ in scored]
+        with transaction.atomic():
+            Ticket.objects.bulk_update(objs, ['risk_probability'], batch_size=UPDATE_BATCH_SIZE)
+            for decision in (True, False):
+                numbers = [number for number, _, predicted in scored if predicted is decision]
+                for start in range(0, len(numbers), UPDATE_BATCH_SIZE):
+                    Ticket.objects.filter(number__in=numbers[start:start + UPDATE_BATCH_SIZE]).update(
+                        risk_predicted=decision, risk_model_version=model_version, risk_scored_at=scored_at,
+                    )
+
+    @staticmethod
+    def load_checkpoint(path):
+        try:
+            with open(path, encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            raise CommandError(f"Checkpoint {path} rusak: {e}")
+
+    @staticmethod
+    def save_checkpoint(path, state):
+        """ Tulis ke file sementara lalu rename, agar checkpoint tidak pernah setengah jadi """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(state, file)
+        os.replace(tmp_path, path)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-17 20:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0004_clustersummary_alter_ticket_category_predictionlog_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('priority', models.CharField(max_length=20)),
+                ('category', models.CharField(max_length=50)),
+                ('item', models.CharField(max_length=100)),
+                ('is_sla_violated', models.BooleanField()),
+                ('ticket_count', models.PositiveIntegerField(default=0)),
+                ('resolution_duration_sum', models.FloatField(default=0)),
+                ('resolution_duration_avg', models.FloatField(default=0)),
+                ('compliance_rate_sum', models.FloatField(default=0)),
+                ('compliance_rate_avg', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Ticket Rollups',
+                'ordering': ['month'],
+                'constraints': [models.UniqueConstraint(fields=('month', 'priority', 'category', 'item', 'is_sla_violated'), name='unique_ticket_rollup_key')],
+            },
+        ),
+    ]
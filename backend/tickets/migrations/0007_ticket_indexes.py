@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-17 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0006_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['open_date', 'number'], name='ticket_open_date_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['priority', 'open_date', 'is_sla_violated', 'resolution_duration', 'application_sla_compliance_rate', 'number'], name='ticket_priority_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['category', 'open_date'], name='ticket_category_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['is_sla_violated', 'open_date'], name='ticket_violated_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['category', 'is_sla_violated', 'number'], name='ticket_category_violated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['item'], name='ticket_item_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from tickets.utils.search import install_search_index
+    install_search_index(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    from tickets.utils.search import uninstall_search_index
+    uninstall_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_ticket_indexes'),
+    ]
+
+    operations = [
+        # SQLite: FTS5 trigram + trigger; PostgreSQL: pg_trgm + index GiST (lihat tickets/utils/search.py)
+        migrations.RunPython(install, uninstall),
+    ]
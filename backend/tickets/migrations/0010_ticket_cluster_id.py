@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0009_ticket_risk_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='cluster_id',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
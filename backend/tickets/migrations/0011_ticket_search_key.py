@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def reinstall(apps, schema_editor):
+    from tickets.utils.search import install_search_index, uninstall_legacy_search_index
+    uninstall_legacy_search_index(schema_editor.connection)
+    install_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0010_ticket_cluster_id'),
+    ]
+
+    operations = [
+        # FTS5 berkunci tabel pemetaan INTEGER PRIMARY KEY (rowid implisit tickets_ticket
+        # bisa berubah saat VACUUM) dan mencakup number; pg_trgm pada UPPER(number/item)
+        migrations.RunPython(reinstall, migrations.RunPython.noop),
+    ]
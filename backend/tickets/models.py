@@ -1,6 +1,7 @@
 from django.contrib.auth.models import User as AuthUser
 from django.contrib.postgres.fields import ArrayField
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils import timezone
 
 
@@ -102,12 +103,100 @@ class Ticket(models.Model):
     sla_to_average_resolution_ratio_rc = models.FloatField()
     application_sla_compliance_rate = models.FloatField()  # Rate 0-1
 
+    # Skor risiko dari model (diisi oleh rescore_tickets; null = belum pernah diskor)
+    risk_probability = models.FloatField(null=True, blank=True)  # Probabilitas kelas Melanggar 0-1
+    risk_predicted = models.BooleanField(null=True, blank=True)  # Keputusan final (threshold + aturan bisnis)
+    risk_model_version = models.CharField(max_length=32, null=True, blank=True)
+    risk_scored_at = models.DateTimeField(null=True, blank=True)
+
+    # Cluster K-Prototypes terdekat (import_tickets / assign_clusters; null = belum ada cluster)
+    cluster_id = models.PositiveSmallIntegerField(null=True, blank=True)
+
     # Django tracking
     created_at = models.DateTimeField(default=timezone.now)
+    # Diperbarui setiap save / upsert import_tickets (bukan oleh rescore_tickets); dipakai --since
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-open_date']  # Default order terbaru
         verbose_name_plural = 'Tickets'
+        # Disusun mengikuti filter get_filtered_queryset / TicketViewSet.get_queryset
+        # (priority, category, is_sla_violated) + sort open_date dan TruncMonth.
+        # Kolom covering ditaruh sebagai key (bukan include=) agar SQLite juga
+        # bisa index-only scan.
+        indexes = [
+            # Sort default -open_date, range per bulan, tie-breaker number
+            models.Index(fields=['open_date', 'number'], name='ticket_open_date_number_idx'),
+            # Filter priority + sort open_date (list), covering untuk KPI get_stats
+            models.Index(
+                fields=[
+                    'priority', 'open_date', 'is_sla_violated',
+                    'resolution_duration', 'application_sla_compliance_rate', 'number',
+                ],
+                name='ticket_priority_open_idx',
+            ),
+            # Filter category di list tiket
+            models.Index(fields=['category', 'open_date'], name='ticket_category_open_idx'),
+            # Filter is_sla_violated + sort / tren bulanan
+            models.Index(fields=['is_sla_violated', 'open_date'], name='ticket_violated_open_idx'),
+            # Group by category (violation-by-category, covering) & distinct category
+            models.Index(fields=['category', 'is_sla_violated', 'number'], name='ticket_category_violated_idx'),
+            # Distinct item (unique-values)
+            models.Index(fields=['item'], name='ticket_item_idx'),
+            # Prefix item case-insensitive (?search= term pendek)
+            models.Index(Lower('item'), name='ticket_item_lower_idx'),
+            # rescore_tickets --since (tiket baru / di-import ulang)
+            models.Index(fields=['updated_at'], name='ticket_updated_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.number} - {self.item} ({self.priority})"
+
+class TicketRollup(models.Model):
+    """
+    Agregat tiket per (bulan, priority, category, item, is_sla_violated).
+    Dibaca oleh endpoint statistik dashboard agar tidak perlu scan seluruh
+    tabel Ticket; diperbarui oleh import_tickets, rebuild_rollups dan
+    rollups.tickets_changed (admin, seeder sintetis). Hanya dipakai selama
+    segar (lihat rollups.rollups_fresh).
+    """
+    month = models.DateField()  # Tanggal 1 dari bulan open_date
+    priority = models.CharField(max_length=20)
+    category = models.CharField(max_length=50)
+    item = models.CharField(max_length=100)
+    is_sla_violated = models.BooleanField()
+
+    ticket_count = models.PositiveIntegerField(default=0)
+    resolution_duration_sum = models.FloatField(default=0)
+    resolution_duration_avg = models.FloatField(default=0)
+    compliance_rate_sum = models.FloatField(default=0)
+    compliance_rate_avg = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['month']
+        verbose_name_plural = 'Ticket Rollups'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['month', 'priority', 'category', 'item', 'is_sla_violated'],
+                name='unique_ticket_rollup_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.priority} {self.category} {self.item} ({self.ticket_count})"
+
+
+class DataVersion(models.Model):
+    """
+    Counter versi data, dinaikkan setiap kali data sumber berubah
+    (import_tickets, regenerasi cluster). Menjadi bagian dari key cache
+    response sehingga cache lama otomatis tidak terpakai lagi. Baris
+    'ticket_rows' / 'ticket_rollups' menandai kesegaran TicketRollup.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.number} - {self.item} ({self.priority})"
\ No newline at end of file
+        return f"{self.name} v{self.version}"
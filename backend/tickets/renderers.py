@@ -0,0 +1,28 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# orjson opsional: jika tidak terpasang, renderer jatuh ke JSONRenderer DRF biasa
+try:
+    import orjson
+except ImportError:
+    orjson = None
+else:
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer yang memakai orjson (beberapa kali lebih cepat dari json
+    stdlib) untuk response compact. Request dengan indent (mis. dari
+    browsable API) tetap lewat JSONRenderer DRF. Tipe yang tidak dikenal
+    orjson (lazy string, Decimal, numpy scalar, ...) ditangani encoder DRF;
+    key dict non-string (mis. {cluster_id: ...}) diubah ke string seperti json.
+    """
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=self._encoder.default, option=ORJSON_OPTIONS)
@@ -1,5 +1,6 @@
 from datetime import datetime
 
+from django.db import models
 from django.utils import timezone
 from rest_framework import serializers
 
@@ -27,3 +28,90 @@ class TicketSerializer(serializers.ModelSerializer):
 
     def get_compliance_rate_percent(self, obj):
         return f"{obj.application_sla_compliance_rate * 100:.1f}%"
+
+
+DISPLAY_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def display_datetime(value, tz=None):
+    """ Sama dengan DateTimeField(format=DISPLAY_DATETIME_FORMAT): waktu lokal TIME_ZONE """
+    if value is None:
+        return None
+    return timezone.localtime(value, tz).strftime(DISPLAY_DATETIME_FORMAT)
+
+
+def iso_datetime(value, tz=None):
+    """ Sama dengan DateTimeField DRF default (ISO 8601, UTC ditulis 'Z') """
+    if value is None:
+        return None
+    value = timezone.localtime(value, tz).isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+class LeanTicketSerializer:
+    """
+    Jalur cepat untuk list tiket: memformat dict hasil .values() langsung,
+    tanpa membuat instance model maupun object field DRF per baris.
+    Output identik dengan TicketSerializer untuk field yang sama.
+    fields=None -> semua field TicketSerializer (urutan sama).
+    """
+    # Field turunan: (kolom database yang dibutuhkan, fungsi format dari row)
+    COMPUTED_FIELDS = {
+        'sla_violated_text': (
+            ('is_sla_violated',), lambda row: 'Ya' if row['is_sla_violated'] else 'Tidak',
+        ),
+        'resolution_duration_formatted': (
+            ('resolution_duration',), lambda row: f"{row['resolution_duration']:.2f} hari",
+        ),
+        'compliance_rate_percent': (
+            ('application_sla_compliance_rate',),
+            lambda row: f"{row['application_sla_compliance_rate'] * 100:.1f}%",
+        ),
+    }
+    DISPLAY_DATETIME_FIELDS = ('open_date', 'closed_date', 'due_date')
+
+    _all_fields = None
+
+    def __init__(self, fields=None):
+        if fields:
+            unknown = [field for field in fields if field not in self.all_fields()]
+            if unknown:
+                raise serializers.ValidationError(
+                    {'fields': f"Field tidak dikenal: {', '.join(unknown)}"}
+                )
+        self.fields = list(dict.fromkeys(fields)) if fields else self.all_fields()
+
+    @classmethod
+    def all_fields(cls):
+        if cls._all_fields is None:
+            cls._all_fields = list(TicketSerializer().fields)
+        return cls._all_fields
+
+    @property
+    def db_fields(self):
+        """ Kolom yang perlu diambil dari database untuk field yang diminta """
+        columns = []
+        for field in self.fields:
+            columns.extend(self.COMPUTED_FIELDS[field][0] if field in self.COMPUTED_FIELDS else (field,))
+        return list(dict.fromkeys(columns))
+
+    def _formatter(self, field, tz):
+        if field in self.COMPUTED_FIELDS:
+            return self.COMPUTED_FIELDS[field][1]
+        if field in self.DISPLAY_DATETIME_FIELDS:
+            return lambda row: display_datetime(row[field], tz)
+        model_field = Ticket._meta.get_field(field)
+        if isinstance(model_field, models.DateTimeField):
+            return lambda row: iso_datetime(row[field], tz)
+        if model_field.choices:
+            # Seperti ChoiceField DRF: nilai dikembalikan sebagai key choices aslinya
+            choices = {str(key): key for key, _ in model_field.flatchoices}
+            return lambda row: choices.get(str(row[field]), row[field])
+        return lambda row: row[field]
+
+    def to_representation(self, rows):
+        # Timezone aktif diambil sekali per panggilan, bukan per nilai datetime
+        # (get_current_timezone membaca thread-local asgiref, relatif mahal)
+        tz = timezone.get_current_timezone()
+        formatters = [(field, self._formatter(field, tz)) for field in self.fields]
+        return [{field: fmt(row) for field, fmt in formatters} for row in rows]
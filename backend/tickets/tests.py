@@ -1,3 +1,1372 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest import mock, skipUnless
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+import joblib
+import numpy as np
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection
+from django.db.models import Count, DateField, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from numpy.testing import assert_allclose, assert_array_equal
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import LabelEncoder, MinMaxScaler
+
+from tickets.management.commands import benchmark_suite
+from tickets.management.commands.benchmark_suite import parse_scale
+from tickets.management.commands.import_tickets import PRIORITY_MAPPING
+from tickets.management.commands.rescore_tickets import Command as RescoreCommand
+from tickets.models import PredictionLog, Ticket, TicketRollup
+from tickets.renderers import FastJSONRenderer
+from tickets.serializers import LeanTicketSerializer, TicketSerializer
+from tickets.utils import business_calendar, model_utils, prediction_cache, prediction_log, reclustering
+from tickets.utils.business_calendar import MAX_EXTENSION_YEARS, BusinessCalendar
+from tickets.utils.cluster_artifacts import cluster_artifact_loader
+from tickets.utils.cluster_assign import ClusterAssigner
+from tickets.utils.forest_engine import FlatForest, build_inference_engine
+from tickets.utils.model_utils import SLAPredictor
+from tickets.utils.prediction_log import PredictionLogBuffer
+from tickets.utils.reclustering import ReclusterPipeline, mixed_silhouette
+from tickets.utils.response_cache import bump_data_version
+from tickets.utils.rollups import (ROLLUP_DIMENSIONS, TICKET_ROWS_VERSION, refresh_rollups, rollups_enabled,
+                                   rollups_fresh, tickets_changed)
+from tickets.utils.search import number_prefix_filter, search_filter
+from tickets.utils.synthetic import (SYNTHETIC_LOG_IP, SYNTHETIC_PREFIX, clear_synthetic_tickets, generate_tickets,
+                                     seed_prediction_logs, seed_tickets, write_cluster_artifact, write_ticket_csv)
+from tickets.utils.trends import WEEKDAY_NAMES, PercentileCont, _SQLitePercentile, heatmap_cells
+
+AuthUser = get_user_model()
+
+MODEL_FEATURE_NAMES = [
+    'Priority', 'Category', 'Item', 'Sub Category', 'Is Open Date Off', 'Is Due Date Off', 'Days to Due',
+    'Open Month', 'Application Creation Day of Week', 'Application Creation Hour',
+    'Application SLA Deadline Day of Week', 'Application SLA Deadline Hour',
+]
+
+
+class FlatForestParityTests(SimpleTestCase):
+    """ FlatForest harus identik (bit per bit) dengan predict_proba sklearn """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.default_rng(0)
+        cls.X = rng.normal(size=(600, 8))
+        cls.y = (cls.X[:, 0] + cls.X[:, 1] * cls.X[:, 2] > 0).astype(int)
+        cls.X_test = rng.normal(size=(1500, 8))
+
+    def assert_parity(self, model, X):
+        engine = FlatForest.from_sklearn(model)
+        assert_array_equal(engine.predict_proba(X), model.predict_proba(X))
+        assert_array_equal(engine.predict(X), model.predict(X))
+        # Satu baris = jalur SLAPredictor.predict
+        assert_array_equal(engine.predict_proba(X[:1]), model.predict_proba(X[:1]))
+
+    def test_random_forest_binary(self):
+        model = RandomForestClassifier(n_estimators=25, random_state=0).fit(self.X, self.y)
+        self.assert_parity(model, self.X_test)
+
+    def test_extra_trees_multiclass(self):
+        y = np.digitize(self.X[:, 0] + self.X[:, 3], [-1.0, 0.0, 1.0])
+        model = ExtraTreesClassifier(n_estimators=15, random_state=0).fit(self.X, y)
+        self.assert_parity(model, self.X_test)
+
+    def test_best_first_tree_layout(self):
+        # max_leaf_nodes memakai builder best-first: node tidak dalam urutan preorder
+        model = RandomForestClassifier(n_estimators=10, max_leaf_nodes=40, random_state=0).fit(self.X, self.y)
+        self.assert_parity(model, self.X_test)
+
+    def test_missing_values(self):
+        X = self.X.copy()
+        X[::7, 1] = np.nan
+        model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, self.y)
+        X_test = self.X_test.copy()
+        X_test[::3, 1] = np.nan
+        X_test[::5, 0] = np.nan
+        self.assert_parity(model, X_test)
+
+    def test_values_on_thresholds(self):
+        model = RandomForestClassifier(n_estimators=10, random_state=0).fit(self.X, self.y)
+        thresholds = model.estimators_[0].tree_.threshold
+        thresholds = thresholds[model.estimators_[0].tree_.feature >= 0]
+        # Nilai tepat di threshold dan tetangga float32/float64-nya
+        values = np.concatenate([
+            thresholds,
+            np.nextafter(thresholds, np.inf),
+            np.nextafter(thresholds, -np.inf),
+            np.nextafter(thresholds.astype(np.float32), np.float32(np.inf)).astype(np.float64),
+        ])
+        X = np.tile(values[:, None], (1, self.X.shape[1]))
+        self.assert_parity(model, X)
+
+    def test_fallback_above_max_batch_rows(self):
+        model = RandomForestClassifier(n_estimators=5, random_state=0).fit(self.X, self.y)
+        engine = build_inference_engine(model, 'flat', max_batch_rows=100)
+        assert_array_equal(engine.predict_proba(self.X_test), model.predict_proba(self.X_test))
+        assert_array_equal(engine.predict_proba(self.X_test[:100]), model.predict_proba(self.X_test[:100]))
+
+    def test_apply_matches_leaf_values(self):
+        model = RandomForestClassifier(n_estimators=5, random_state=0).fit(self.X, self.y)
+        engine = FlatForest.from_sklearn(model)
+        leaves = engine.apply(self.X_test[:50])
+        self.assertEqual(leaves.shape, (50, 5))
+        for tree_index, estimator in enumerate(model.estimators_):
+            assert_array_equal(
+                engine.value[leaves[:, tree_index]],
+                estimator.tree_.value[estimator.apply(self.X_test[:50].astype(np.float32)), 0],
+            )
+
+    def test_unsupported_model(self):
+        model = LogisticRegression().fit(self.X, self.y)
+        with self.assertRaises(TypeError):
+            build_inference_engine(model, 'flat')
+        self.assertIs(build_inference_engine(model, 'sklearn'), model)
+        with self.assertRaises(ValueError):
+            build_inference_engine(model, 'onnx')
+
+    def test_wrong_feature_count(self):
+        model = RandomForestClassifier(n_estimators=3, random_state=0).fit(self.X, self.y)
+        with self.assertRaises(ValueError):
+            FlatForest.from_sklearn(model).predict_proba(self.X_test[:, :4])
+
+
+class FlatForestContributionTests(SimpleTestCase):
+    """ Dekomposisi jalur: bias + jumlah kontribusi = probabilitas forest """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.default_rng(1)
+        cls.X = rng.normal(size=(600, 6))
+        cls.y = (cls.X[:, 0] - cls.X[:, 2] > 0).astype(int)
+        cls.X_test = rng.normal(size=(700, 6))
+
+    def assert_decomposition(self, model, X, class_index=1):
+        engine = FlatForest.from_sklearn(model)
+        bias, contrib = engine.contributions(X, class_index)
+        self.assertEqual(contrib.shape, (len(X), X.shape[1]))
+        assert_allclose(bias + contrib.sum(axis=1), model.predict_proba(X)[:, class_index], atol=1e-9)
+        return contrib
+
+    def test_sums_to_probability(self):
+        model = RandomForestClassifier(n_estimators=20, random_state=0).fit(self.X, self.y)
+        self.assert_decomposition(model, self.X_test)
+        self.assert_decomposition(model, self.X_test[:1])
+
+    def test_unused_feature_has_no_contribution(self):
+        X = self.X.copy()
+        X[:, 5] = 0.0
+        model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, self.y)
+        contrib = self.assert_decomposition(model, self.X_test)
+        assert_array_equal(contrib[:, 5], 0.0)
+
+    def test_multiclass_and_missing_values(self):
+        X = self.X.copy()
+        X[::5, 1] = np.nan
+        y = np.digitize(self.X[:, 0] + self.X[:, 3], [-1.0, 1.0])
+        model = ExtraTreesClassifier(n_estimators=10, random_state=0).fit(X, y)
+        X_test = self.X_test.copy()
+        X_test[::4, 1] = np.nan
+        for class_index in range(3):
+            self.assert_decomposition(model, X_test, class_index)
+
+    def test_matches_explicit_path_walk(self):
+        model = RandomForestClassifier(n_estimators=5, max_depth=4, random_state=0).fit(self.X, self.y)
+        x = self.X_test[:1].astype(np.float32)
+        expected = np.zeros(self.X.shape[1])
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            proba = tree.value[:, 0, 1] / tree.value[:, 0, :].sum(axis=1)
+            node = 0
+            while tree.children_left[node] != -1:
+                child = tree.children_left[node] if x[0, tree.feature[node]] <= tree.threshold[node] \
+                    else tree.children_right[node]
+                expected[tree.feature[node]] += proba[child] - proba[node]
+                node = child
+        _, contrib = FlatForest.from_sklearn(model).contributions(x)
+        assert_allclose(contrib[0], expected / len(model.estimators_))
+
+
+class BenchmarkDataTests(SimpleTestCase):
+    """ Data sintetis benchmark_suite harus deterministik per seed """
+
+    def test_generators_are_deterministic(self):
+        first = list(generate_tickets(50, seed=7))
+        self.assertEqual(first, list(generate_tickets(50, seed=7)))
+        self.assertNotEqual(first, list(generate_tickets(50, seed=8)))
+        self.assertEqual(len({ticket['number'] for ticket in first}), 50)
+
+    def test_parse_scale(self):
+        self.assertEqual(parse_scale('10k'), 10000)
+        self.assertEqual(parse_scale('1M'), 1000000)
+        self.assertEqual(parse_scale('2500'), 2500)
+        for value in ('0', 'abc', '-5k'):
+            with self.assertRaises(CommandError):
+                parse_scale(value)
+
+
+class BenchmarkSuiteTests(TestCase):
+    """ benchmark_suite: tolak database berisi data asli, selalu bersihkan data sintetis """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+
+    def run_suite(self, **options):
+        call_command(
+            'benchmark_suite', scales=['30'], repeat=1, skip_predict=True, stdout=io.StringIO(),
+            output=os.path.join(self.tmpdir, 'result.json'), **options,
+        )
+
+    def synthetic_counts(self):
+        return (Ticket.objects.filter(number__startswith=SYNTHETIC_PREFIX).count(),
+                PredictionLog.objects.filter(ip_address=SYNTHETIC_LOG_IP).count())
+
+    def test_refuses_live_database(self):
+        seed_tickets(3, prefix='INC-')
+        with self.assertRaisesMessage(CommandError, '--allow-live-db'):
+            self.run_suite()
+        self.assertEqual(self.synthetic_counts(), (0, 0))
+
+    def test_cleanup_when_seeding_fails(self):
+        with mock.patch.object(benchmark_suite, 'seed_prediction_logs', side_effect=RuntimeError('boom')):
+            with self.assertRaisesMessage(RuntimeError, 'boom'):
+                self.run_suite(keep=True)
+        self.assertEqual(self.synthetic_counts(), (0, 0))
+
+    def test_stale_synthetic_logs_cleared_and_live_rows_kept(self):
+        seed_tickets(3, prefix='INC-')
+        # Log sintetis tanpa tiket sintetis dari run sebelumnya tetap dihapus di awal
+        seed_prediction_logs(5)
+        self.run_suite(keep=True, allow_live_db=True)
+        self.assertEqual(self.synthetic_counts(), (30, 3))
+        self.assertEqual(Ticket.objects.filter(number__startswith='INC-').count(), 3)
+        with open(os.path.join(self.tmpdir, 'result.json'), encoding='utf-8') as file:
+            self.assertEqual(json.load(file)['scales']['30']['import_tickets']['rows'], 30)
+
+
+def write_model_artifacts(model_dir, seed=0):
+    """ Artefak model kecil (forest, encoder, scaler, fitur, threshold) di model_dir untuk SLAPredictor """
+    rng = np.random.default_rng(seed)
+    vocab = {
+        'Priority': ['1 - critical', '2 - high', '3 - medium', '4 - low'],
+        'Category': ['application', 'network', 'unknown'],
+        'Item': [f'application {i}' for i in range(20)] + ['unknown'],
+        'Sub Category': ['nan', 'unknown'],
+    }
+    encoders = {col: LabelEncoder().fit(values) for col, values in vocab.items()}
+    n = 400
+    X = pd.DataFrame({name: rng.integers(0, 24, n).astype(float) for name in MODEL_FEATURE_NAMES})
+    for col, values in vocab.items():
+        X[col] = rng.integers(0, len(values), n)
+    X['Days to Due'] = rng.integers(-5, 40, n)
+    scaler = MinMaxScaler().fit(X[['Days to Due']])
+    X[['Days to Due']] = scaler.transform(X[['Days to Due']])
+    y = ((X['Item'] % 3 == 0) | (X['Days to Due'] < 0.2)).astype(int)
+    model = RandomForestClassifier(n_estimators=15, max_depth=6, random_state=seed).fit(X.to_numpy(), y)
+    for name, value in [
+        ('rf_sla_model.pkl', model), ('label_encoders.pkl', encoders), ('minmax_scaler.pkl', scaler),
+        ('feature_names.pkl', MODEL_FEATURE_NAMES), ('best_threshold.pkl', 0.4),
+    ]:
+        joblib.dump(value, os.path.join(model_dir, name))
+    return model_dir
+
+
+class PredictBatchParityTests(SimpleTestCase):
+    """ predict_batch harus memberi hasil yang sama dengan predict() per baris """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.model_dir = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.model_dir)
+        cls.predictor = SLAPredictor(model_dir=write_model_artifacts(cls.model_dir))
+
+    def test_batch_matches_single(self):
+        base = {'priority': '3 - Medium', 'category': 'application', 'item': 'application 3'}
+        records = [
+            {**base, 'open_date': '2025-01-06T09:00', 'due_date': '2025-01-08T17:00'},
+            {**base, 'open_date': '2025-01-04 23:30:15.25', 'due_date': '2025-01-20'},
+            {**base, 'open_date': '2025-03-01T10:00+07:00', 'due_date': '2025-03-02T01:00Z'},
+            {**base, 'open_date': '20250106T0900+0700', 'due_date': '2025-01-09T09:00-05:30'},
+            {**base, 'priority': '1 - Critical', 'item': 'unseen item', 'open_date': '2025-06-01T08:00',
+             'due_date': '2025-05-30T08:00'},
+            # Tidak valid: timezone campur, format salah, tanggal tidak ada, tipe salah, field hilang
+            {**base, 'open_date': '2025-01-06T09:00+07:00', 'due_date': '2025-01-08T17:00'},
+            {**base, 'open_date': '2025-01-06T09:00', 'due_date': '2025-01-08T17:00Z'},
+            {**base, 'open_date': '06/01/2025', 'due_date': '2025-01-08T17:00'},
+            {**base, 'open_date': '2025-02-30T09:00', 'due_date': '2025-03-08T17:00'},
+            {**base, 'open_date': 20250106, 'due_date': '2025-01-08T17:00'},
+            {**base, 'due_date': '2025-01-08T17:00'},
+        ]
+        batch = self.predictor.predict_batch(records)
+        self.assertEqual(len(batch), len(records))
+        with self.assertLogs('tickets.predictor', 'WARNING'):
+            singles = [self.predictor.predict(record) for record in records]
+        for i, (record, single) in enumerate(zip(records, singles)):
+            with self.subTest(row=i, record=record):
+                self.assertEqual(batch[i]['status'], single['status'])
+                if single['status'] == 'sukses':
+                    self.assertEqual(batch[i], single)
+        for i in (5, 6):
+            self.assertEqual(batch[i]['message'], singles[i]['message'])
+        # Senin 09:00 -> Rabu 17:00 dengan jam kerja 08-17: 8 + 9 + 9 jam
+        self.assertEqual(batch[0]['business_hours_to_due'], 26.0)
+
+    def test_sklearn_engine_by_default_flat_opt_in(self):
+        self.assertEqual(self.predictor.engine_name, 'sklearn')
+        self.assertIs(self.predictor.engine, self.predictor.model)
+        with override_settings(SLA_INFERENCE_ENGINE='flat'):
+            flat = SLAPredictor(model_dir=self.model_dir)
+        self.assertEqual(flat.engine_name, 'flat')
+        self.assertIsInstance(flat.engine, FlatForest)
+        records = [
+            {'priority': priority, 'category': 'application', 'item': f'application {i}',
+             'open_date': f'2025-0{i % 9 + 1}-06T09:00', 'due_date': f'2025-0{i % 9 + 1}-20T17:00'}
+            for i, priority in enumerate(PRIORITY_MAPPING.values())
+        ]
+        self.assertEqual(flat.predict_batch(records), self.predictor.predict_batch(records))
+
+    @override_settings(SLA_PREDICTION_CACHE_ENABLED=True)
+    def test_batch_bypasses_prediction_cache(self):
+        record = {'priority': '3 - Medium', 'category': 'application', 'item': 'application 2',
+                  'open_date': '2025-02-03T10:15', 'due_date': '2025-02-05T12:00'}
+        with mock.patch.object(prediction_cache, '_cache', None):
+            self.predictor.predict_batch([record] * 3)
+            cache = prediction_cache.get_prediction_cache()
+            self.assertEqual((cache.stats()['entries'], cache.stats()['misses']), (0, 0))
+            first, second = self.predictor.predict(record), self.predictor.predict(record)
+            self.assertEqual(first, second)
+            self.assertEqual((cache.stats()['misses'], cache.stats()['hits']), (1, 1))
+            self.assertEqual(self.predictor.predict_batch([record])[0], first)
+
+    def test_model_file_check_is_throttled(self):
+        signature = mock.Mock(side_effect=lambda model_dir: self.predictor.signature)
+        with mock.patch.object(model_utils, '_predictor', self.predictor), \
+                mock.patch.object(model_utils, 'model_files_signature', signature):
+            with override_settings(SLA_MODEL_AUTO_RELOAD=True, SLA_MODEL_RELOAD_CHECK_INTERVAL=60):
+                self.predictor.files_checked_at = time.monotonic()
+                for _ in range(20):
+                    self.assertIs(model_utils.get_predictor(), self.predictor)
+                self.assertEqual(signature.call_count, 0)
+            with override_settings(SLA_MODEL_AUTO_RELOAD=True, SLA_MODEL_RELOAD_CHECK_INTERVAL=0):
+                for _ in range(3):
+                    self.assertIs(model_utils.get_predictor(), self.predictor)
+                self.assertEqual(signature.call_count, 3)
+
+
+
+def weekend_calendar(start_year, end_year, country='ID', workday_hours=(8, 17)):
+    """ BusinessCalendar weekend saja (tanpa library holidays) """
+    days = np.arange(np.datetime64(f'{start_year}-01-01', 'D'), np.datetime64(f'{end_year + 1}-01-01', 'D'))
+    return BusinessCalendar(start_year, end_year, (days.astype(np.int64) + 3) % 7 >= 5, country, workday_hours)
+
+
+class BusinessCalendarTests(SimpleTestCase):
+    """ Durasi jam kerja vektor dan batas perluasan rentang tahun kalender """
+
+    def test_business_hours_between(self):
+        calendar = weekend_calendar(2025, 2025)
+        start = np.array(['2025-01-06T09:00', '2025-01-10T16:00', '2025-01-08T17:00', '2025-01-07T10:00', 'NaT',
+                          '2025-01-11T10:00'], dtype='datetime64[ns]')
+        end = np.array(['2025-01-08T17:00', '2025-01-13T09:00', '2025-01-06T09:00', '2025-01-07T12:30',
+                        '2025-01-07T12:00', '2025-01-12T18:00'], dtype='datetime64[ns]')
+        hours = calendar.business_hours_between(start, end)
+        assert_allclose(hours[[0, 1, 2, 3, 5]], [26.0, 2.0, -26.0, 2.5, 0.0])
+        self.assertTrue(np.isnan(hours[4]))
+        # Di luar rentang kalender: weekend saja lewat busday_count, hasil sama
+        outside = weekend_calendar(2030, 2030).business_hours_between(start, end)
+        assert_allclose(outside[[0, 1, 2, 3, 5]], [26.0, 2.0, -26.0, 2.5, 0.0])
+
+    def test_extreme_years_are_clamped(self):
+        built = []
+
+        def fake_build(start_year, end_year, country, workday_hours):
+            built.append((start_year, end_year))
+            return weekend_calendar(start_year, end_year, country, workday_hours)
+
+        with mock.patch.object(business_calendar, '_calendar', None), \
+                mock.patch.object(business_calendar, 'load_or_build_calendar', side_effect=fake_build), \
+                override_settings(SLA_CALENDAR_START_YEAR=2015, SLA_CALENDAR_END_YEAR=2027):
+            # Batas datetime64[ns] (1677-2262); di luar rentang kalender -> weekend saja
+            values = ['1700-01-01T10:00', '2250-12-28T10:00', '2024-06-01T10:00']
+            self.assertEqual(business_calendar.is_off(values).tolist(), [0, 1, 1])
+            self.assertEqual(built, [(2015 - MAX_EXTENSION_YEARS, 2027 + MAX_EXTENSION_YEARS)])
+            # Tahun ekstrem berikutnya tidak membangun ulang kalender
+            business_calendar.is_off(['1800-01-01'])
+            self.assertEqual(len(built), 1)
+
+
+class ImportTicketsTests(TestCase):
+    """ import_tickets: upsert per chunk harus idempoten dan menimpa field yang berubah """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.csv_path = write_ticket_csv(os.path.join(self.tmp_dir, 'tickets.csv'), 120, seed=3)
+        # Tanpa artefak cluster: cluster_id tidak diisi
+        patcher = mock.patch.object(cluster_artifact_loader, 'json_path', os.path.join(self.tmp_dir, 'none.json'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cluster_artifact_loader.clear()
+        self.addCleanup(cluster_artifact_loader.clear)
+
+    def run_import(self, path):
+        call_command('import_tickets', file=path, batch_size=50, stdout=io.StringIO())
+
+    def changed_csv(self):
+        """ Salinan CSV dengan Priority sebagian baris diganti; mengembalikan (path, {number: prioritas baru}) """
+        with open(self.csv_path, encoding='utf-8', newline='') as file:
+            rows = list(csv.DictReader(file))
+        changed = {}
+        for row in rows[::7]:
+            row['Priority'] = 'Critical' if row['Priority'] != 'Critical' else 'Low'
+            changed[row['Number']] = PRIORITY_MAPPING[row['Priority']]
+        path = os.path.join(self.tmp_dir, 'changed.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        return path, changed
+
+    def assert_reimport(self):
+        self.run_import(self.csv_path)
+        self.assertEqual(Ticket.objects.count(), 120)
+        scored_at = timezone.now()
+        Ticket.objects.update(risk_probability=0.5, risk_model_version='v1', risk_scored_at=scored_at, cluster_id=3)
+        created = dict(Ticket.objects.values_list('number', 'created_at'))
+
+        self.run_import(self.csv_path)
+        self.assertEqual(Ticket.objects.count(), 120)
+
+        path, changed = self.changed_csv()
+        before_reimport = timezone.now()
+        self.run_import(path)
+        self.assertEqual(Ticket.objects.count(), 120)
+        # updated_at maju untuk tiket yang di-upsert (dipakai rescore_tickets --since)
+        self.assertEqual(Ticket.objects.filter(updated_at__gte=before_reimport).count(), 120)
+        stored = dict(Ticket.objects.filter(number__in=changed).values_list('number', 'priority'))
+        self.assertEqual(stored, changed)
+        # created_at dan skor risiko yang sudah ada tidak ikut ditimpa
+        self.assertEqual(dict(Ticket.objects.values_list('number', 'created_at')), created)
+        self.assertEqual(Ticket.objects.filter(risk_model_version='v1', risk_scored_at=scored_at).count(), 120)
+        # Tanpa artefak cluster, cluster_id yang sudah ada tidak ditimpa NULL
+        self.assertEqual(Ticket.objects.filter(cluster_id=3).count(), 120)
+
+    def test_reimport_with_update_conflicts(self):
+        self.assertTrue(connection.features.supports_update_conflicts_with_target)
+        self.assert_reimport()
+
+    def test_reimport_without_update_conflicts(self):
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            self.assert_reimport()
+
+    def test_invalid_rows_are_skipped(self):
+        with open(self.csv_path, encoding='utf-8', newline='') as file:
+            rows = list(csv.DictReader(file))
+        rows[0]['Priority'] = 'Urgent'
+        rows[1]['Open Date'] = '06/01/2025'
+        path = os.path.join(self.tmp_dir, 'invalid.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        self.run_import(path)
+        self.assertEqual(Ticket.objects.count(), 118)
+
+
+@override_settings(SLA_CACHE_ENABLED=False, SLA_USE_ROLLUPS=False)
+class StatsEndpointTests(TestCase):
+    """ /stats/ dengan dan tanpa ?group_by harus sama dengan agregat langsung dari tabel Ticket """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_tickets(300, seed=5, items=6)
+        cls.user = AuthUser.objects.create_user('stats-test', password='x')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_stats(self, **params):
+        return self.client.get('/api/stats/', params)
+
+    @staticmethod
+    def expected_block(tickets):
+        total = len(tickets)
+        violations = sum(ticket.is_sla_violated for ticket in tickets)
+        return {
+            'total_tickets': total,
+            'violation_count': violations,
+            'compliance_count': total - violations,
+            'compliance_rate': round((total - violations) / total * 100, 1),
+            'low_priority_count': sum(ticket.priority == '4 - Low' for ticket in tickets),
+            'medium_priority_count': sum(ticket.priority == '3 - Medium' for ticket in tickets),
+            'high_priority_count': sum(ticket.priority == '2 - High' for ticket in tickets),
+            'critical_priority_count': sum(ticket.priority == '1 - Critical' for ticket in tickets),
+            'avg_resolution_duration': round(sum(ticket.resolution_duration for ticket in tickets) / total, 2),
+            'avg_compliance_rate': round(
+                sum(ticket.application_sla_compliance_rate for ticket in tickets) / total * 100, 1
+            ),
+        }
+
+    def assert_block(self, block, tickets):
+        """ Count harus sama persis; rata-rata boleh beda satu digit pembulatan (urutan penjumlahan float) """
+        expected = self.expected_block(tickets)
+        self.assertEqual(set(block) - {'group', 'group_by', 'groups'}, set(expected))
+        for key, value in expected.items():
+            if key == 'avg_resolution_duration':
+                self.assertAlmostEqual(block[key], value, delta=0.0101, msg=key)
+            elif key == 'avg_compliance_rate':
+                self.assertAlmostEqual(block[key], value, delta=0.101, msg=key)
+            else:
+                self.assertEqual(block[key], value, msg=key)
+
+    def assert_stats_match(self, queryset=None, **params):
+        tickets = list(Ticket.objects.all() if queryset is None else queryset)
+        data = self.get_stats(**params).data
+        self.assert_block(data, tickets)
+        return data, tickets
+
+    def test_overall(self):
+        self.assert_stats_match()
+        self.assert_stats_match(Ticket.objects.filter(priority='2 - High'), priority='2 - High')
+        self.assert_stats_match(Ticket.objects.filter(is_sla_violated=True), is_sla_violated='true')
+
+    def test_group_by(self):
+        keys = {
+            'category': lambda ticket: ticket.category,
+            'item': lambda ticket: ticket.item,
+            'month': lambda ticket: timezone.localtime(ticket.open_date).strftime('%Y-%m'),
+        }
+        for group_by, key in keys.items():
+            with self.subTest(group_by=group_by):
+                data, tickets = self.assert_stats_match(group_by=group_by)
+                self.assertEqual(data['group_by'], group_by)
+                grouped = {}
+                for ticket in tickets:
+                    grouped.setdefault(key(ticket), []).append(ticket)
+                self.assertEqual({group['group'] for group in data['groups']}, set(grouped))
+                for group in data['groups']:
+                    self.assert_block(group, grouped[group['group']])
+                order = [group['group'] for group in data['groups']]
+                if group_by == 'month':
+                    self.assertEqual(order, sorted(order))
+                else:
+                    totals = [group['total_tickets'] for group in data['groups']]
+                    self.assertEqual(totals, sorted(totals, reverse=True))
+
+    def test_group_by_with_filter(self):
+        data, _ = self.assert_stats_match(
+            Ticket.objects.filter(priority='3 - Medium'), priority='3 - Medium', group_by='category'
+        )
+        self.assertEqual(sum(group['medium_priority_count'] for group in data['groups']), data['total_tickets'])
+
+    def test_invalid_group_by(self):
+        for value in ('priority', 'CATEGORY', 'month;drop'):
+            with self.subTest(group_by=value):
+                response = self.get_stats(group_by=value)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('group_by', response.data['error'])
+
+
+class RollupTests(TestCase):
+    """ TicketRollup harus sama dengan agregat langsung dari Ticket, dan hanya dipakai selama segar """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_tickets(250, seed=9, items=5)
+        cls.user = AuthUser.objects.create_superuser('rollup-admin', password='x')
+
+    def rollup_rows(self):
+        return {
+            tuple(row[key] for key in ROLLUP_DIMENSIONS): (row['ticket_count'], round(row['duration'], 6))
+            for row in TicketRollup.objects.values(*ROLLUP_DIMENSIONS, 'ticket_count', duration=F('resolution_duration_sum'))
+        }
+
+    def ticket_rows(self):
+        grouped = (
+            Ticket.objects.annotate(month=TruncMonth('open_date', output_field=DateField()))
+            .order_by().values(*ROLLUP_DIMENSIONS)
+            .annotate(ticket_count=Count('number'), duration=Sum('resolution_duration'))
+        )
+        return {
+            tuple(row[key] for key in ROLLUP_DIMENSIONS): (row['ticket_count'], round(row['duration'], 6))
+            for row in grouped
+        }
+
+    def assert_rollups_match(self):
+        self.assertEqual(self.rollup_rows(), self.ticket_rows())
+        self.assertTrue(rollups_fresh())
+
+    def test_stats_from_rollups_equal_ticket_table(self):
+        refresh_rollups()
+        self.assert_rollups_match()
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for params in ({}, {'group_by': 'category'}, {'group_by': 'month'}, {'priority': '2 - High'}):
+            with self.subTest(params=params):
+                with override_settings(SLA_CACHE_ENABLED=False, SLA_USE_ROLLUPS=True):
+                    from_rollups = client.get('/api/stats/', params).data
+                with override_settings(SLA_CACHE_ENABLED=False, SLA_USE_ROLLUPS=False):
+                    from_tickets = client.get('/api/stats/', params).data
+                self.assertEqual(from_rollups.pop('groups', None) is None, from_tickets.pop('groups', None) is None)
+                for key, value in from_tickets.items():
+                    if isinstance(value, float):
+                        self.assertAlmostEqual(from_rollups[key], value, delta=0.101, msg=key)
+                    else:
+                        self.assertEqual(from_rollups[key], value, msg=key)
+
+    def test_ticket_save_refreshes_rollups(self):
+        refresh_rollups()
+        ticket = Ticket.objects.order_by('open_date').first()
+        ticket.priority = '1 - Critical'
+        ticket.open_date += timedelta(days=45)
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.save()
+        self.assert_rollups_match()
+
+    def test_admin_delete_refreshes_rollups(self):
+        refresh_rollups()
+        client = Client()
+        client.force_login(self.user)
+        numbers = list(Ticket.objects.order_by('number').values_list('number', flat=True)[:10])
+        response = client.post('/admin/tickets/ticket/', {
+            'action': 'delete_selected', '_selected_action': numbers, 'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Ticket.objects.filter(number__in=numbers).count(), 0)
+        self.assert_rollups_match()
+
+    def test_stale_rollups_are_not_used(self):
+        # Belum pernah dibangun penuh: seeder hanya refresh parsial, statistik dari Ticket
+        self.assertFalse(rollups_fresh())
+        refresh_rollups()
+        self.assertTrue(rollups_enabled())
+        # Penulisan baris Ticket tanpa memperbarui rollup
+        Ticket.objects.filter(priority='4 - Low').update(priority='2 - High')
+        bump_data_version(TICKET_ROWS_VERSION)
+        self.assertFalse(rollups_enabled())
+        # Proses batch membangun ulang penuh rollup yang tidak segar
+        tickets_changed(set(), rebuild_if_stale=True)
+        self.assert_rollups_match()
+        self.assertTrue(rollups_enabled())
+
+    def test_seeder_keeps_rollups_fresh(self):
+        refresh_rollups()
+        seed_tickets(40, seed=10, prefix='SYN2-', items=5)
+        self.assert_rollups_match()
+        clear_synthetic_tickets(prefix='SYN2-')
+        self.assert_rollups_match()
+
+
+@override_settings(SLA_CACHE_ENABLED=True)
+class TrendAggregateTests(TestCase):
+    """ Heatmap dan persentil tren dibandingkan dengan perhitungan Python dari tiket yang sama """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_tickets(200, seed=9, items=4)
+        # Nama hari tersimpan tidak dipakai heatmap (bisa beda bahasa/format)
+        Ticket.objects.update(application_creation_day_of_week='Senin')
+
+    def expected_cells(self, hour_of):
+        counts = {}
+        for ticket in Ticket.objects.all():
+            key = (timezone.localtime(ticket.open_date).isoweekday(), hour_of(ticket))
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def test_heatmap_weekday_from_open_date(self):
+        cells = heatmap_cells(Ticket.objects.all())
+        self.assertEqual(
+            {(cell['weekday'], cell['hour']): cell['total_tickets'] for cell in cells},
+            self.expected_cells(lambda ticket: ticket.application_creation_hour),
+        )
+        self.assertTrue(all(cell['weekday_name'] == WEEKDAY_NAMES[cell['weekday'] - 1] for cell in cells))
+
+    def test_heatmap_with_tz(self):
+        tz = ZoneInfo('Asia/Jakarta')
+        with timezone.override(tz):
+            expected = self.expected_cells(lambda ticket: timezone.localtime(ticket.open_date).hour)
+        cells = heatmap_cells(Ticket.objects.all(), tz)
+        self.assertEqual({(cell['weekday'], cell['hour']): cell['total_tickets'] for cell in cells}, expected)
+
+    def test_percentile_cont_matches_python_aggregate(self):
+        rows = (
+            Ticket.objects.order_by().values('priority')
+            .annotate(p50=PercentileCont('resolution_duration', 0.5), p90=PercentileCont('resolution_duration', 0.9))
+        )
+        self.assertEqual(len(rows), 4)
+        for row in rows:
+            values = list(Ticket.objects.filter(priority=row['priority']).values_list('resolution_duration', flat=True))
+            for key, fraction in (('p50', 0.5), ('p90', 0.9)):
+                aggregate = _SQLitePercentile()
+                for value in values + [None]:
+                    aggregate.step(value, fraction)
+                self.assertAlmostEqual(row[key], aggregate.finalize())
+                # Definisi percentile_cont: interpolasi linear pada posisi fraction * (n - 1)
+                ordered = sorted(values)
+                position = fraction * (len(ordered) - 1)
+                lower = int(position)
+                upper = min(lower + 1, len(ordered) - 1)
+                self.assertAlmostEqual(
+                    row[key], ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+                )
+        self.assertIsNone(_SQLitePercentile().finalize())
+
+
+class ClusterAssignerTests(SimpleTestCase):
+    """ Assignment dari summary (artefak tanpa blok prototypes) memakai kolom numerik yang distandarkan """
+
+    def summary_data(self, gamma):
+        return {
+            'best_gamma': gamma,
+            'numerical_columns_summary': ['Time Left Incl. On Hold', 'Open Month'],
+            'categorical_columns_summary': ['Priority'],
+            'summary_per_cluster': {
+                '0': {'mean_numerical': {'Time Left Incl. On Hold': 0.0, 'Open Month': 6.0},
+                      'mode_categorical': {'Priority': '4 - Low'}},
+                '1': {'mean_numerical': {'Time Left Incl. On Hold': 1000.0, 'Open Month': 6.0},
+                      'mode_categorical': {'Priority': '1 - Critical'}},
+            },
+        }
+
+    def test_gamma_matters_without_prototypes(self):
+        # Satuan mentah: selisih 600 vs 400 jam mengalahkan gamma apapun; setelah distandarkan
+        # (z = +-1 untuk centroid, 0.2 untuk tiket) mismatch prioritas ikut menentukan
+        ticket = {'time_left_incl_on_hold': 600.0, 'open_month': 2, 'priority': '4 - Low'}
+        self.assertEqual(ClusterAssigner.from_cluster_data(self.summary_data(2.0)).assign_tickets([ticket]), [0])
+        self.assertEqual(ClusterAssigner.from_cluster_data(self.summary_data(0.0)).assign_tickets([ticket]), [1])
+
+    def test_summary_scaling(self):
+        assigner = ClusterAssigner.from_cluster_data(self.summary_data(1.0))
+        # Open Month sama di semua centroid: tidak distandarkan
+        assert_allclose(assigner.center, [500.0, 0.0])
+        assert_allclose(assigner.scale, [500.0, 1.0])
+        assert_allclose(assigner.centroids, [[-1.0, 6.0], [1.0, 6.0]])
+        numeric, _ = assigner.encode({'Time Left Incl. On Hold': [750.0], 'Open Month': [None]}, 1)
+        assert_allclose(numeric[0, 0], 0.5)
+        self.assertTrue(np.isnan(numeric[0, 1]))
+
+
+class MixedSilhouetteTests(SimpleTestCase):
+    """ mixed_silhouette per blok == silhouette_score(metric='precomputed') pada matriks jarak penuh """
+
+    def data(self, missing=0.0):
+        rng = np.random.RandomState(3)
+        numeric = rng.normal(size=(40, 3))
+        numeric[:20] += 2.0
+        numeric[rng.rand(*numeric.shape) < missing] = np.nan
+        codes = rng.randint(0, 3, size=(40, 2))
+        labels = np.repeat([0, 1], 20)
+        labels[-1] = 2  # cluster berukuran 1 -> silhouette 0, seperti sklearn
+        return numeric, codes, labels
+
+    @staticmethod
+    def precomputed(numeric, codes, gamma):
+        # Jarak K-Prototypes pasangan demi pasangan; kolom NaN di salah satu titik dilewati
+        n = len(numeric)
+        distances = np.zeros((n, n))
+        for i in range(n):
+            for j in range(n):
+                if i != j:
+                    squared = np.square(numeric[i] - numeric[j])
+                    distances[i, j] = np.nansum(squared) + gamma * (codes[i] != codes[j]).sum()
+        return distances
+
+    def assert_matches_sklearn(self, numeric, codes, labels, gamma):
+        from sklearn.metrics import silhouette_score
+        expected = silhouette_score(self.precomputed(numeric, codes, gamma), labels, metric='precomputed')
+        for block_size in (7, 1024):
+            self.assertAlmostEqual(mixed_silhouette(numeric, codes, labels, gamma, block_size=block_size), expected)
+
+    def test_matches_sklearn(self):
+        self.assert_matches_sklearn(*self.data(), gamma=0.5)
+        self.assert_matches_sklearn(*self.data(), gamma=0.0)
+
+    def test_nan_skipped_like_cluster_assigner(self):
+        self.assert_matches_sklearn(*self.data(missing=0.2), gamma=0.5)
+
+    def test_single_cluster(self):
+        numeric, codes, labels = self.data()
+        self.assertIsNone(mixed_silhouette(numeric, codes, np.zeros(len(labels), dtype=np.int64), 0.5))
+
+
+class ReclusterPipelineTests(TestCase):
+    """ Label hasil re-clustering == ClusterAssigner dari prototype yang ditulis (training == serving) """
+
+    @mock.patch.object(reclustering, 'umap', None)
+    @mock.patch.object(reclustering, 'prince', None)
+    def test_labels_match_serving_assigner(self):
+        seed_tickets(150, seed=5)
+        pipeline = ReclusterPipeline(k_values=(3,), n_init=2, log=lambda message: None).run()
+        serving = ClusterAssigner.from_cluster_data({
+            'best_gamma': pipeline.assigner.gamma, 'prototypes': pipeline.prototypes,
+        })
+        rows = list(Ticket.objects.filter(number__in=pipeline.numbers).values('number', *serving.ticket_fields))
+        labels = dict(zip(pipeline.numbers, pipeline.labels.tolist()))
+        self.assertEqual(serving.assign_tickets(rows), [labels[row['number']] for row in rows])
+
+
+class ClusterResponseCacheTests(TestCase):
+    """ Cache response /clusters harus ikut berganti saat file artefak diganti di luar management command """
+
+    def setUp(self):
+        cache.clear()
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.json_path = os.path.join(tmp_dir, 'cluster_results.json')
+        patcher = mock.patch.object(cluster_artifact_loader, 'json_path', self.json_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(cluster_artifact_loader.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(AuthUser.objects.create_user('cluster-test', password='x'))
+
+    def write_artifact(self, k, mtime):
+        write_cluster_artifact(self.json_path, 300, k=k, seed=k)
+        # mtime eksplisit: dua tulisan dalam satu tick jam filesystem tetap terbedakan
+        for path in (self.json_path, os.path.splitext(self.json_path)[0] + '.npz'):
+            os.utime(path, (mtime, mtime))
+
+    def test_regenerated_artifact_invalidates_cache(self):
+        self.write_artifact(3, 1_700_000_000)
+        first = self.client.get('/api/clusters/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/clusters/')['X-Cache'], 'HIT')
+        self.assertEqual(len(first.data['pca_scatter']['datasets']), 3)
+        self.assertNotIn('build_ms', first.data['pca_scatter']['meta'])
+
+        self.write_artifact(5, 1_700_000_100)
+        second = self.client.get('/api/clusters/')
+        self.assertEqual(second['X-Cache'], 'MISS')
+        self.assertEqual(len(second.data['pca_scatter']['datasets']), 5)
+
+
+    def test_scatter_meta_timing_per_request(self):
+        self.write_artifact(3, 1_700_000_000)
+        params = {'sampling': 'stratified', 'limit': '50'}
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            cold = self.client.get('/api/clusters/', params)
+        # Nilai per request tidak ikut tersimpan di cache
+        stored = cache_set.call_args.args[1]
+        self.assertEqual(stored['scatter_meta'], {'sampling': 'stratified', 'limit': 50})
+        warm = self.client.get('/api/clusters/', params)
+        self.assertEqual((cold['X-Cache'], warm['X-Cache']), ('MISS', 'HIT'))
+        for response, cached in ((cold, False), (warm, True)):
+            meta = response.data['scatter_meta']
+            self.assertEqual((meta['sampling'], meta['limit'], meta['cached']), ('stratified', 50, cached))
+            self.assertIsInstance(meta['elapsed_ms'], float)
+
+    @override_settings(SLA_CACHE_ENABLED=False)
+    def test_scatter_meta_without_cache(self):
+        self.write_artifact(3, 1_700_000_000)
+        meta = self.client.get('/api/clusters/').data['scatter_meta']
+        self.assertFalse(meta['cached'])
+        self.assertIn('elapsed_ms', meta)
+
+
+class TicketCursorPaginationTests(TestCase):
+    """ Keyset pagination /tickets/?pagination=cursor: maju-mundur konsisten, cursor rusak, open_date kembar """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_tickets(60, seed=12, items=5)
+        # 15 tiket dengan open_date identik: urutan ditentukan number
+        tie_date = timezone.make_aware(datetime(2024, 6, 1, 9, 0))
+        Ticket.objects.filter(number__in=list(Ticket.objects.order_by('number').values_list('number', flat=True)[
+            20:35])).update(open_date=tie_date)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(AuthUser.objects.create_user('cursor-test', password='x'))
+
+    def walk(self, url, direction='next'):
+        """ Ikuti link next/previous sampai habis; mengembalikan list halaman (list number) dan response terakhir """
+        pages, response = [], None
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([row['number'] for row in response.data['results']])
+            url = response.data[direction]
+        return pages, response
+
+    def test_round_trip_matches_ordering(self):
+        for sort, ordering in (('-open_date', ('-open_date', '-number')), ('open_date', ('open_date', 'number'))):
+            with self.subTest(sort=sort):
+                expected = list(Ticket.objects.order_by(*ordering).values_list('number', flat=True))
+                pages, last = self.walk(f'/api/tickets/?pagination=cursor&page_size=7&sort={sort}')
+                self.assertEqual(last.data['ordering'], sort)
+                self.assertEqual([number for page in pages for number in page], expected)
+                self.assertTrue(all(len(page) == 7 for page in pages[:-1]))
+
+                # Mundur dari halaman terakhir menghasilkan halaman yang sama dalam urutan terbalik
+                back_pages, first = self.walk(last.data['previous'], direction='previous')
+                self.assertEqual(back_pages, pages[-2::-1])
+                self.assertIsNone(first.data['previous'])
+
+    def test_ties_on_open_date_are_not_skipped(self):
+        tied = list(
+            Ticket.objects.filter(open_date=timezone.make_aware(datetime(2024, 6, 1, 9, 0)))
+            .order_by('number').values_list('number', flat=True)
+        )
+        self.assertEqual(len(tied), 15)
+        pages, _ = self.walk('/api/tickets/?pagination=cursor&page_size=4&sort=open_date')
+        numbers = [number for page in pages for number in page]
+        self.assertEqual(len(numbers), len(set(numbers)))
+        start = numbers.index(tied[0])
+        self.assertEqual(numbers[start:start + len(tied)], tied)
+
+    def test_invalid_cursor_returns_404(self):
+        for cursor in ('bukan-cursor', 'e30=', 'eyJkIjoia2VtYXJpbiIsIm4iOiJYIn0='):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f'/api/tickets/?cursor={cursor}')
+                self.assertEqual(response.status_code, 404)
+
+    def test_exact_count_follows_filters(self):
+        response = self.client.get('/api/tickets/?pagination=cursor&count=exact&priority=1 - Critical')
+        self.assertEqual(response.data['count'], Ticket.objects.filter(priority='1 - Critical').count())
+
+
+class TicketSearchTests(TestCase):
+    """ ?search= (FTS5 trigram di SQLite): substring number/item, digabung dengan filter lain tanpa batas hasil """
+
+    @classmethod
+    def setUpTestData(cls):
+        # 4 item untuk 700 tiket: 'application' cocok dengan > 500 tiket
+        seed_tickets(700, seed=3, items=4)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(AuthUser.objects.create_user('search-test', password='x'))
+
+    def search_numbers(self, **params):
+        response = self.client.get('/api/tickets/', {'page_size': 100, **params})
+        self.assertEqual(response.status_code, 200)
+        numbers = [row['number'] for row in response.data['results']]
+        url = response.data['next']
+        while url:
+            response = self.client.get(url)
+            numbers += [row['number'] for row in response.data['results']]
+            url = response.data['next']
+        return numbers
+
+    def expected(self, term, **filters):
+        return set(
+            Ticket.objects.filter(Q(number__icontains=term) | Q(item__icontains=term), **filters)
+            .values_list('number', flat=True)
+        )
+
+    def test_filters_apply_to_all_matches(self):
+        cases = [
+            ({}, {}),
+            ({'priority': '1 - Critical'}, {'priority': '1 - Critical'}),
+            ({'category': Ticket.objects.values_list('category', flat=True)[0]},
+             {'category': Ticket.objects.values_list('category', flat=True)[0]}),
+            ({'is_sla_violated': 'true', 'priority': '4 - Low'}, {'is_sla_violated': True, 'priority': '4 - Low'}),
+        ]
+        for params, filters in cases:
+            with self.subTest(params=params):
+                expected = self.expected('application', **filters)
+                response = self.client.get('/api/tickets/', {'search': 'application', **params})
+                self.assertEqual(response.data['count'], len(expected))
+                self.assertGreater(len(expected), 0)
+        self.assertGreater(len(self.expected('application')), 500)
+
+    def test_more_than_500_matches_are_all_returned(self):
+        numbers = self.search_numbers(search='Applic')
+        self.assertEqual(len(numbers), 700)
+        self.assertEqual(set(numbers), self.expected('applic'))
+
+    def test_number_substring_and_rank(self):
+        # Substring di tengah number (bukan hanya prefix), case-insensitive
+        self.assertEqual(set(self.search_numbers(search='00000012')), self.expected('00000012'))
+        self.assertEqual(set(self.search_numbers(search='syn-00000003')), self.expected('syn-00000003'))
+        # Number persis di urutan pertama, lalu prefix number
+        numbers = self.search_numbers(search='SYN-000000001')
+        self.assertEqual(numbers[0], 'SYN-000000001')
+        self.assertTrue(all(number.startswith('SYN-000000001') for number in numbers[:11]))
+
+    def test_short_term(self):
+        # Term < 3 karakter: prefix number (range PK) atau prefix item (range LOWER(item)), case-insensitive
+        Ticket.objects.filter(number='SYN-000000042').update(item='Zebra portal')
+        for term in ('ap', 'AP', 'Ap'):
+            with self.subTest(term=term):
+                self.assertEqual(len(self.search_numbers(search=term)), 699)
+        self.assertEqual(len(self.search_numbers(search='sy')), 700)
+        self.assertEqual(self.search_numbers(search='zE'), ['SYN-000000042'])
+        # Bukan prefix -> tidak cocok (substring butuh >= 3 karakter)
+        self.assertEqual(self.search_numbers(search='99'), [])
+
+    def test_short_term_uses_indexes(self):
+        # Kedua cabang OR berupa range index, bukan SCAN seluruh tabel
+        plan = Ticket.objects.filter(search_filter('ap')).explain()
+        self.assertIn('(number>? AND number<?)', plan)
+        self.assertIn('USING INDEX ticket_item_lower_idx', plan)
+        self.assertNotIn('SCAN tickets_ticket', plan)
+        self.assertIn('(number>? AND number<?)', Ticket.objects.filter(number_prefix_filter('sy')).explain())
+
+    def test_index_follows_ticket_writes(self):
+        ticket = Ticket.objects.get(number='SYN-000000042')
+        ticket.item = 'zebra portal'
+        ticket.save()
+        self.assertEqual(self.search_numbers(search='ebra por'), ['SYN-000000042'])
+
+        # Upsert/insert lewat bulk_create juga masuk index
+        clone = Ticket.objects.get(number='SYN-000000043')
+        clone.number, clone.item = 'NEW-1', 'zebra gateway'
+        Ticket.objects.bulk_create([clone])
+        self.assertEqual(sorted(self.search_numbers(search='zebra')), ['NEW-1', 'SYN-000000042'])
+
+        Ticket.objects.filter(number='SYN-000000042').delete()
+        self.assertEqual(self.search_numbers(search='zebra'), ['NEW-1'])
+        self.assertEqual(self.search_numbers(search='SYN-000000042'), [])
+
+        # Tabel pemetaan FTS tetap satu baris per tiket, berkunci integer sendiri
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*), COUNT(DISTINCT number) FROM tickets_ticket_search')
+            self.assertEqual(cursor.fetchone(), (Ticket.objects.count(), Ticket.objects.count()))
+
+
+class LeanSerializerParityTests(TestCase):
+    """ LeanTicketSerializer (dict .values()) harus identik dengan TicketSerializer DRF, termasuk nilai NULL """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_tickets(40, seed=21, items=5)
+        Ticket.objects.filter(number__in=['SYN-000000001', 'SYN-000000002']).update(
+            risk_probability=0.731, risk_predicted=True, risk_model_version='abc123',
+            risk_scored_at=timezone.make_aware(datetime(2024, 3, 4, 5, 6, 7, 890123)), cluster_id=2,
+        )
+
+    def test_output_matches_drf_serializer(self):
+        queryset = Ticket.objects.order_by('number')
+        self.assertTrue(queryset.filter(closed_date__isnull=True).exists())
+        expected = [dict(row) for row in TicketSerializer(queryset, many=True).data]
+        for fields in (None, ['number', 'open_date', 'risk_scored_at', 'compliance_rate_percent', 'priority']):
+            with self.subTest(fields=fields):
+                serializer = LeanTicketSerializer(fields)
+                actual = serializer.to_representation(queryset.values(*serializer.db_fields))
+                self.assertEqual(actual, [{field: row[field] for field in serializer.fields} for row in expected])
+                self.assertEqual(list(actual[0]), serializer.fields)
+
+    def test_fast_renderer_matches_drf_renderer(self):
+        data = {
+            'results': LeanTicketSerializer().to_representation(Ticket.objects.order_by('number')[:5].values()),
+            'by_cluster': {1: np.int64(3), 2: np.float64(0.5)},
+        }
+        fast = FastJSONRenderer().render(data)
+        self.assertEqual(json.loads(fast), json.loads(JSONRenderer().render(data)))
+        self.assertEqual(json.loads(fast)['by_cluster'], {'1': 3, '2': 0.5})
+
+
+class TicketExportTests(TestCase):
+    """ /api/tickets/export/: jumlah baris = queryset terfilter (termasuk ?search= dengan > 500 kecocokan) """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_tickets(650, seed=4, items=3)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(AuthUser.objects.create_user('export-test', password='x'))
+
+    def export_rows(self, **params):
+        response = self.client.get('/api/tickets/export/', params)
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content)
+        if params.get('compression') == 'gzip':
+            self.assertEqual(response['Content-Type'], 'application/gzip')
+            self.assertTrue(response['Content-Disposition'].endswith('.gz"'))
+            body = gzip.decompress(body)
+        text = body.decode('utf-8')
+        if params.get('output') == 'ndjson':
+            return [json.loads(line) for line in text.splitlines()]
+        return list(csv.DictReader(io.StringIO(text)))
+
+    def test_row_count_matches_filtered_queryset(self):
+        filters = [
+            ({}, Ticket.objects.all()),
+            ({'search': 'application'}, Ticket.objects.filter(item__icontains='application')),
+            ({'search': 'application', 'priority': '4 - Low', 'is_sla_violated': 'false'},
+             Ticket.objects.filter(item__icontains='application', priority='4 - Low', is_sla_violated=False)),
+        ]
+        for output in ('csv', 'ndjson'):
+            for compression in ('none', 'gzip'):
+                for params, queryset in filters:
+                    with self.subTest(output=output, compression=compression, params=params):
+                        rows = self.export_rows(output=output, compression=compression, **params)
+                        self.assertEqual(len(rows), queryset.count())
+                        self.assertEqual({row['number'] for row in rows}, set(queryset.values_list('number', flat=True)))
+        self.assertGreater(Ticket.objects.filter(item__icontains='application').count(), 500)
+
+    def test_fields_and_sort(self):
+        rows = self.export_rows(output='ndjson', fields='number,open_date,sla_violated_text', sort='open_date')
+        self.assertEqual(list(rows[0]), ['number', 'open_date', 'sla_violated_text'])
+        expected = list(Ticket.objects.order_by('open_date').values_list('number', flat=True))
+        self.assertEqual([row['number'] for row in rows], expected)
+
+    def test_invalid_output(self):
+        self.assertEqual(self.client.get('/api/tickets/export/', {'output': 'xlsx'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/tickets/export/', {'compression': 'zip'}).status_code, 400)
+
+
+class PredictionLogBufferTests(TransactionTestCase):
+    """ Write-behind PredictionLog: flush per batch, overflow, drain saat shutdown, retry koneksi, reset setelah fork """
+
+    def make_entries(self, n):
+        return [PredictionLog(input_data={'i': i}, prediction_result={'ok': True}) for i in range(n)]
+
+    def wait_for(self, condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.02)
+        return condition()
+
+    def test_flush_when_batch_is_full(self):
+        buffer = PredictionLogBuffer(batch_size=5, flush_interval=30)
+        self.addCleanup(buffer.shutdown)
+        self.assertEqual(buffer.add_many(self.make_entries(5)), 5)
+        self.assertTrue(self.wait_for(lambda: buffer.stats()['flushed'] == 5))
+        self.assertEqual(PredictionLog.objects.count(), 5)
+        self.assertEqual(buffer.stats()['queued'], 5)
+
+    def test_flush_after_interval(self):
+        buffer = PredictionLogBuffer(batch_size=100, flush_interval=0.1)
+        self.addCleanup(buffer.shutdown)
+        buffer.add_many(self.make_entries(3))
+        self.assertTrue(self.wait_for(lambda: PredictionLog.objects.count() == 3))
+
+    def test_overflow_policies(self):
+        drop = PredictionLogBuffer(max_size=3, overflow='drop')
+        block = PredictionLogBuffer(max_size=3, overflow='block', block_timeout=0.01)
+        sample = PredictionLogBuffer(max_size=10, overflow='sample', sample_rate=0.0, sample_threshold=0.5)
+        for buffer in (drop, block, sample):
+            # Tanpa thread flusher queue tidak berkurang
+            mock.patch.object(buffer, '_ensure_started').start()
+        self.addCleanup(mock.patch.stopall)
+
+        self.assertEqual(drop.add_many(self.make_entries(5)), 3)
+        self.assertEqual(block.add_many(self.make_entries(5)), 3)
+        self.assertEqual(sample.add_many(self.make_entries(8)), 5)
+        self.assertEqual((drop.stats()['dropped'], block.stats()['dropped']), (2, 2))
+        self.assertEqual(sample.stats()['sampled_out'], 3)
+        with self.assertRaises(ValueError):
+            PredictionLogBuffer(overflow='queue')
+
+    def test_shutdown_drains_queue(self):
+        buffer = PredictionLogBuffer(batch_size=1000, flush_interval=60)
+        buffer.add_many(self.make_entries(25))
+        buffer.shutdown(timeout=5)
+        self.assertEqual(PredictionLog.objects.count(), 25)
+        stats = buffer.stats()
+        self.assertFalse(stats['running'])
+        self.assertEqual((stats['flushed'], stats['queue_size']), (25, 0))
+        # Setelah shutdown entry baru ditulis langsung
+        self.assertTrue(buffer.add(self.make_entries(1)[0]))
+        self.assertEqual(PredictionLog.objects.count(), 26)
+
+    def test_write_retries_once_on_operational_error(self):
+        buffer = PredictionLogBuffer()
+        bulk_create = PredictionLog.objects.bulk_create
+        failures = [OperationalError('server closed the connection')]
+
+        def flaky_bulk_create(*args, **kwargs):
+            if failures:
+                raise failures.pop()
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(PredictionLog.objects, 'bulk_create', side_effect=flaky_bulk_create) as patched, \
+                self.assertLogs('tickets.utils.prediction_log', 'INFO'):
+            buffer._write(self.make_entries(4))
+        self.assertEqual(patched.call_count, 2)
+        self.assertEqual(PredictionLog.objects.count(), 4)
+        stats = buffer.stats()
+        self.assertEqual((stats['retried'], stats['flushed'], stats['failed']), (1, 4, 0))
+
+        with mock.patch.object(PredictionLog.objects, 'bulk_create', side_effect=OperationalError('down')) as patched, \
+                self.assertLogs('tickets.utils.prediction_log', 'WARNING'):
+            buffer._write(self.make_entries(2))
+        self.assertEqual(patched.call_count, 2)
+        self.assertEqual(buffer.stats()['failed'], 2)
+
+    def test_counters_reset_after_fork(self):
+        buffer = PredictionLogBuffer(max_size=1, overflow='drop')
+        mock.patch.object(buffer, '_ensure_started').start()
+        self.addCleanup(mock.patch.stopall)
+        buffer.add_many(self.make_entries(3))
+        self.assertEqual(buffer.stats()['dropped'], 2)
+        mock.patch.stopall()
+
+        # Process anak (pid berbeda): queue, thread dan counter mulai dari nol
+        buffer._pid = -1
+        buffer._ensure_started()
+        self.addCleanup(buffer.shutdown)
+        self.assertEqual(buffer._pid, os.getpid())
+        stats = buffer.stats()
+        self.assertEqual((stats['queued'], stats['dropped'], stats['queue_size']), (0, 0, 0))
+
+    @skipUnless(hasattr(os, 'fork'), 'butuh os.fork')
+    def test_fork_while_lock_held(self):
+        # Lock buffer dan lock modul dipegang thread lain saat fork: process anak tidak boleh deadlock
+        buffer = PredictionLogBuffer(batch_size=100, flush_interval=30)
+        held, release = threading.Event(), threading.Event()
+
+        def hold_locks():
+            with buffer._lock, prediction_log._buffer_lock:
+                held.set()
+                release.wait()
+
+        holder = threading.Thread(target=hold_locks)
+        holder.start()
+        self.addCleanup(holder.join)
+        self.addCleanup(release.set)
+        self.assertTrue(held.wait(5))
+
+        pid = os.fork()
+        if pid == 0:
+            # Process anak: kerja dijalankan di thread dengan batas waktu, exit code = hasil
+            code = [3]
+
+            def child():
+                stats = buffer.stats()
+                added = buffer.add(PredictionLog(input_data={}, prediction_result={}))
+                with prediction_log._buffer_lock:
+                    pass
+                code[0] = 0 if added and stats['queued'] == 0 and buffer.stats()['queued'] == 1 else 1
+
+            worker = threading.Thread(target=child, daemon=True)
+            worker.start()
+            worker.join(5)
+            os._exit(2 if worker.is_alive() else code[0])
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+
+
+class RescoreTicketsTests(TestCase):
+    """ rescore_tickets: skor semua tiket, --since last (updated_at), --resume setelah run terputus """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_tickets(30, seed=7, items=4)
+
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.model_dir = write_model_artifacts(tmp_dir)
+        self.checkpoint = os.path.join(tmp_dir, 'checkpoint.json')
+        self.version = SLAPredictor(model_dir=self.model_dir).model_version
+
+    def rescore(self, **options):
+        return call_command(
+            'rescore_tickets', model_dir=self.model_dir, checkpoint=self.checkpoint, batch_size=10,
+            stdout=io.StringIO(), **options,
+        )
+
+    def read_checkpoint(self):
+        with open(self.checkpoint, encoding='utf-8') as file:
+            return json.load(file)
+
+    def scored_numbers(self):
+        return set(Ticket.objects.filter(risk_model_version=self.version).values_list('number', flat=True))
+
+    def touch(self, numbers):
+        """ Ubah tiket lewat save() (seperti admin / import ulang): updated_at maju """
+        for ticket in Ticket.objects.filter(number__in=numbers):
+            ticket.item = 'application 1'
+            ticket.save()
+
+    def interrupt_after_first_chunk(self, **options):
+        """ Jalankan rescore yang berhenti (exception) saat menulis chunk kedua """
+        write_chunk = RescoreCommand.write_chunk
+        calls = []
+
+        def interrupted(scored, model_version):
+            calls.append(len(scored))
+            if len(calls) > 1:
+                raise RuntimeError('worker mati')
+            write_chunk(scored, model_version)
+
+        with mock.patch.object(RescoreCommand, 'write_chunk', side_effect=interrupted), \
+                self.assertRaises(RuntimeError):
+            self.rescore(**options)
+
+    def test_scores_all_tickets_with_public_api(self):
+        self.rescore()
+        self.assertEqual(self.scored_numbers(), set(Ticket.objects.values_list('number', flat=True)))
+        predictor = SLAPredictor(model_dir=self.model_dir)
+        ticket = Ticket.objects.order_by('number').first()
+        record = {
+            'priority': ticket.priority, 'category': ticket.category, 'item': ticket.item,
+            'open_date': timezone.localtime(ticket.open_date).isoformat(),
+            'due_date': timezone.localtime(ticket.due_date).isoformat(),
+        }
+        X, _, _ = predictor.preprocess_batch([record])
+        probas, _ = predictor.violation_probas(X, use_cache=False)
+        self.assertAlmostEqual(ticket.risk_probability, float(probas[0]))
+        checkpoint = self.read_checkpoint()
+        self.assertIsNotNone(checkpoint['finished_at'])
+        self.assertEqual(checkpoint['last_finished_started_at'], checkpoint['started_at'])
+
+    def test_since_last_picks_updated_tickets(self):
+        self.rescore()
+        Ticket.objects.update(risk_model_version='old')
+        changed = ['SYN-000000003', 'SYN-000000017']
+        self.touch(changed)
+        self.rescore(since='last')
+        self.assertEqual(self.scored_numbers(), set(changed))
+
+    def test_resume_after_interrupted_run(self):
+        self.rescore()
+        first_run = self.read_checkpoint()
+        Ticket.objects.update(risk_model_version='old')
+        changed = list(Ticket.objects.order_by('number').values_list('number', flat=True)[:25])
+        self.touch(changed)
+
+        self.interrupt_after_first_chunk(since='last')
+        checkpoint = self.read_checkpoint()
+        self.assertNotIn('finished_at', checkpoint)
+        self.assertEqual(checkpoint['since'], first_run['started_at'])
+        self.assertEqual(checkpoint['last_finished_started_at'], first_run['started_at'])
+        self.assertEqual(len(self.scored_numbers()), 10)
+
+        # --since last tetap merujuk run terakhir yang selesai, sama dengan filter run yang terputus
+        self.rescore(since='last', resume=True)
+        self.assertEqual(self.scored_numbers(), set(changed))
+        self.assertEqual(self.read_checkpoint()['scored'], 25)
+        with self.assertRaises(CommandError):
+            self.rescore(resume=True)
+
+    def test_resume_rejects_different_filter(self):
+        self.rescore()
+        Ticket.objects.update(risk_model_version='old')
+        self.touch(list(Ticket.objects.order_by('number').values_list('number', flat=True)[:15]))
+        self.interrupt_after_first_chunk(since='last')
+        with self.assertRaises(CommandError):
+            self.rescore(since='2020-01-01', resume=True)
+        with self.assertRaises(CommandError):
+            self.rescore(resume=True, only_stale=True)
+        # Tanpa --since: filter run yang terputus dipakai
+        self.rescore(resume=True)
+        self.assertEqual(len(self.scored_numbers()), 15)
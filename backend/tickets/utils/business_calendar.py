@@ -0,0 +1,297 @@
+import logging
+import os
+import threading
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# holidays opsional (sama seperti model_utils): tanpa library hanya weekend yang libur
+try:
+    import holidays
+except ImportError:
+    logger.warning("'holidays' library not installed. Hari libur nasional tidak dihitung (weekend saja).")
+    holidays = None
+
+DEFAULT_COUNTRY = 'ID'
+DEFAULT_WORKDAY_HOURS = (8, 17)  # jam kerja lokal [mulai, selesai)
+CACHE_FORMAT_VERSION = 1
+# Perluasan otomatis maksimal sekian tahun di luar default_year_range(): tanggal
+# ekstrem (tahun 1, 9999) tidak membuat bitmap raksasa yang menetap di memori,
+# tahun di luar batas dihitung weekend saja
+MAX_EXTENSION_YEARS = 10
+
+NS_PER_HOUR = 3600 * 10 ** 9
+
+
+def _settings(name, default):
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        # Dipakai di luar Django (mis. notebook / worker process tanpa settings)
+        return default
+
+
+def to_local_naive(values):
+    """
+    Array datetime64[ns] waktu lokal (wall clock) dari Series / DatetimeIndex /
+    array datetime64 / list datetime/date / string ISO. Nilai aware dikonversi
+    ke TIME_ZONE aktif Django, nilai naive dianggap sudah waktu lokal.
+    Gagal parse -> NaT.
+    """
+    if isinstance(values, np.ndarray) and np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]')
+    if isinstance(values, (datetime, date, str, np.datetime64)):
+        values = [values]
+    if isinstance(values, (pd.Series, pd.Index)) and pd.api.types.is_datetime64_any_dtype(values.dtype):
+        index = pd.DatetimeIndex(values)
+    else:
+        values = list(values)
+        try:
+            index = pd.DatetimeIndex(pd.to_datetime(pd.Series(values, dtype=object), errors='coerce'))
+        except (TypeError, ValueError):
+            # Campuran naive/aware atau offset berbeda: konversi per elemen
+            index = pd.DatetimeIndex([_local_naive_scalar(value) for value in values])
+    if index.tz is not None:
+        index = index.tz_convert(_local_timezone_name()).tz_localize(None)
+    return index.to_numpy(dtype='datetime64[ns]')
+
+
+def _local_naive_scalar(value):
+    value = pd.to_datetime(value, errors='coerce')
+    if value is pd.NaT or value.tzinfo is None:
+        return value
+    return value.tz_convert(_local_timezone_name()).tz_localize(None)
+
+
+def _local_timezone_name():
+    try:
+        from django.utils import timezone
+        return str(timezone.get_current_timezone())
+    except Exception:
+        return 'UTC'
+
+
+class BusinessCalendar:
+    """
+    Kalender hari kerja untuk rentang tahun [start_year, end_year]:
+    satu byte per hari (1 = weekend/libur nasional) + prefix sum jumlah hari
+    kerja, sehingga is_off dan durasi jam kerja dihitung vektor dengan
+    indexing array (tanpa loop per tanggal maupun lookup holidays).
+    Tanggal di luar rentang dihitung weekend saja; pakai get_business_calendar()
+    agar rentang diperluas otomatis.
+    """
+
+    def __init__(self, start_year, end_year, off_days, country=DEFAULT_COUNTRY, workday_hours=DEFAULT_WORKDAY_HOURS):
+        self.start_year = start_year
+        self.end_year = end_year
+        self.country = country
+        self.origin = np.datetime64(f'{start_year}-01-01', 'D')
+        self.end = np.datetime64(f'{end_year + 1}-01-01', 'D')
+        self.off_days = np.asarray(off_days, dtype=bool)
+        # working_before[i] = jumlah hari kerja sebelum hari ke-i sejak origin
+        self.working_before = np.concatenate(([0], np.cumsum(~self.off_days, dtype=np.int64)))
+        self.workday_start, self.workday_end = workday_hours
+
+    @classmethod
+    def build(cls, start_year, end_year, country=DEFAULT_COUNTRY, workday_hours=DEFAULT_WORKDAY_HOURS):
+        """ Hitung kalender dari library holidays (weekend Sabtu/Minggu + libur nasional) """
+        days = np.arange(np.datetime64(f'{start_year}-01-01', 'D'), np.datetime64(f'{end_year + 1}-01-01', 'D'))
+        # 1970-01-01 adalah Kamis: (hari + 3) % 7 -> Senin=0 ... Minggu=6
+        off_days = (days.astype(np.int64) + 3) % 7 >= 5
+        if holidays is not None:
+            holiday_dates = holidays.country_holidays(country, years=range(start_year, end_year + 1))
+            if holiday_dates:
+                holiday_days = np.array(sorted(holiday_dates), dtype='datetime64[D]')
+                off_days[(holiday_days - days[0]).astype(np.int64)] = True
+        return cls(start_year, end_year, off_days, country, workday_hours)
+
+    def covers(self, start_year, end_year):
+        return self.start_year <= start_year and end_year <= self.end_year
+
+    def _day_index(self, days):
+        """ (index hari sejak origin, mask dalam rentang) untuk array datetime64[D] """
+        index = (days - self.origin).astype(np.int64)
+        in_range = (days >= self.origin) & (days < self.end)
+        return np.where(in_range, index, 0), in_range
+
+    def is_off_days(self, days):
+        """ Versi array: days = datetime64[D] (tanpa NaT) -> array bool """
+        index, in_range = self._day_index(days)
+        weekend = (days.astype(np.int64) + 3) % 7 >= 5
+        return np.where(in_range, self.off_days[index], weekend)
+
+    def is_off(self, values):
+        """ Array int 0/1 (1 = weekend/libur) untuk kumpulan tanggal; NaT -> 0 """
+        local = to_local_naive(values)
+        valid = ~np.isnat(local)
+        result = np.zeros(len(local), dtype=np.int64)
+        result[valid] = self.is_off_days(local[valid].astype('datetime64[D]'))
+        return result
+
+    def is_off_date(self, value):
+        """ Versi skalar untuk satu datetime/date: tanggal seperti yang tertulis (tanpa konversi timezone) """
+        day = np.datetime64(value.date() if isinstance(value, datetime) else value, 'D')
+        return int(self.is_off_days(np.array([day]))[0])
+
+    def _working_window_ns(self, days, start, end):
+        """ Nanodetik jam kerja di hari `days` yang beririsan dengan [start, end) """
+        day_start = days.astype('datetime64[ns]')
+        window_start = np.maximum(day_start + np.timedelta64(self.workday_start * NS_PER_HOUR, 'ns'), start)
+        window_end = np.minimum(day_start + np.timedelta64(self.workday_end * NS_PER_HOUR, 'ns'), end)
+        overlap = np.maximum((window_end - window_start).astype(np.int64), 0)
+        return np.where(self.is_off_days(days), 0, overlap)
+
+    def business_hours_between(self, start, end):
+        """
+        Durasi jam kerja (float jam) antara dua array timestamp, elemen per
+        elemen: hanya jam workday_start-workday_end di hari kerja yang dihitung.
+        end < start menghasilkan nilai negatif; NaT -> NaN.
+        """
+        start, end = to_local_naive(start), to_local_naive(end)
+        result = np.full(len(start), np.nan)
+        valid = ~(np.isnat(start) | np.isnat(end))
+        if not valid.any():
+            return result
+        sign = np.where(end[valid] < start[valid], -1.0, 1.0)
+        lo = np.minimum(start[valid], end[valid])
+        hi = np.maximum(start[valid], end[valid])
+        day_lo, day_hi = lo.astype('datetime64[D]'), hi.astype('datetime64[D]')
+        one_day = np.timedelta64(1, 'D')
+
+        same_day = day_lo == day_hi
+        # Hari pertama & terakhir sebagian, hari di antaranya penuh
+        first = self._working_window_ns(day_lo, lo, np.where(same_day, hi, (day_lo + one_day).astype('datetime64[ns]')))
+        last = np.where(same_day, 0, self._working_window_ns(day_hi, day_hi.astype('datetime64[ns]'), hi))
+        full_days = self._working_days_between(day_lo + one_day, day_hi)
+        total_ns = first + last + full_days * (self.workday_end - self.workday_start) * NS_PER_HOUR
+        result[valid] = sign * total_ns / NS_PER_HOUR
+        return result
+
+    def _working_days_between(self, first_day, stop_day):
+        """ Jumlah hari kerja di [first_day, stop_day) per elemen """
+        count = np.maximum((stop_day - first_day).astype(np.int64), 0)
+        inside = (first_day >= self.origin) & (stop_day <= self.end)
+        lo_index = np.clip((first_day - self.origin).astype(np.int64), 0, len(self.off_days))
+        hi_index = np.clip((stop_day - self.origin).astype(np.int64), 0, len(self.off_days))
+        from_prefix = np.maximum(self.working_before[hi_index] - self.working_before[lo_index], 0)
+        if inside.all():
+            return from_prefix
+        # Di luar rentang (jarang): hitung weekend saja dengan busday_count
+        outside = ~inside & (count > 0)
+        fallback = np.zeros(len(count), dtype=np.int64)
+        fallback[outside] = np.busday_count(first_day[outside], stop_day[outside])
+        return np.where(inside, from_prefix, fallback)
+
+    def save(self, path):
+        """ Simpan bitmap (packbits) ke .npz secara atomic """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp_path,
+            bitmap=np.packbits(self.off_days),
+            length=len(self.off_days),
+            start_year=self.start_year,
+            end_year=self.end_year,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, country=DEFAULT_COUNTRY, workday_hours=DEFAULT_WORKDAY_HOURS):
+        with np.load(path) as data:
+            off_days = np.unpackbits(data['bitmap'])[:int(data['length'])].astype(bool)
+            return cls(int(data['start_year']), int(data['end_year']), off_days, country, workday_hours)
+
+
+def calendar_cache_path(start_year, end_year, country=DEFAULT_COUNTRY):
+    """ File cache per (negara, rentang tahun, versi holidays) """
+    cache_dir = _settings('SLA_CALENDAR_CACHE_DIR', None)
+    if not cache_dir:
+        return None
+    version = holidays.__version__ if holidays is not None else 'none'
+    return os.path.join(
+        cache_dir, f"calendar_{country}_{start_year}_{end_year}_h{version}_v{CACHE_FORMAT_VERSION}.npz"
+    )
+
+
+def load_or_build_calendar(start_year, end_year, country=DEFAULT_COUNTRY, workday_hours=DEFAULT_WORKDAY_HOURS):
+    """ Muat kalender dari cache disk, atau hitung lalu simpan ke cache """
+    path = calendar_cache_path(start_year, end_year, country)
+    if path and os.path.exists(path):
+        try:
+            return BusinessCalendar.load(path, country, workday_hours)
+        except Exception as e:
+            logger.warning("Cache kalender %s tidak valid, dihitung ulang: %s", path, e)
+    calendar = BusinessCalendar.build(start_year, end_year, country, workday_hours)
+    if path and holidays is not None:
+        try:
+            calendar.save(path)
+        except OSError as e:
+            logger.warning("Cache kalender tidak bisa ditulis: %s", e)
+    return calendar
+
+
+_calendar = None
+_calendar_lock = threading.Lock()
+
+
+def default_year_range():
+    """ SLA_CALENDAR_START_YEAR .. SLA_CALENDAR_END_YEAR (default: tahun ini + 2) """
+    current_year = datetime.now().year
+    return (
+        _settings('SLA_CALENDAR_START_YEAR', 2015),
+        _settings('SLA_CALENDAR_END_YEAR', None) or current_year + 2,
+    )
+
+
+def get_business_calendar(start_year=None, end_year=None):
+    """
+    Kalender bersama untuk process ini, minimal mencakup default_year_range().
+    Jika rentang yang diminta belum tercakup, kalender dibangun ulang untuk
+    gabungan rentangnya (dibatasi MAX_EXTENSION_YEARS di kedua sisi).
+    """
+    global _calendar
+    default_start, default_end = default_year_range()
+    start_year = max(min(start_year or default_start, default_start), default_start - MAX_EXTENSION_YEARS)
+    end_year = min(max(end_year or default_end, default_end), default_end + MAX_EXTENSION_YEARS)
+    calendar = _calendar
+    if calendar is not None and calendar.covers(start_year, end_year):
+        return calendar
+    with _calendar_lock:
+        calendar = _calendar
+        if calendar is not None and calendar.covers(start_year, end_year):
+            return calendar
+        if calendar is not None:
+            start_year = min(start_year, calendar.start_year)
+            end_year = max(end_year, calendar.end_year)
+        workday_hours = _settings('SLA_BUSINESS_HOURS', DEFAULT_WORKDAY_HOURS)
+        country = _settings('SLA_HOLIDAY_COUNTRY', DEFAULT_COUNTRY)
+        _calendar = load_or_build_calendar(start_year, end_year, country, tuple(workday_hours))
+        return _calendar
+
+
+def _calendar_for(*arrays):
+    """ Kalender yang mencakup semua tahun di array datetime64 yang diberikan """
+    years = [
+        array[~np.isnat(array)].astype('datetime64[Y]').astype(np.int64) + 1970
+        for array in arrays
+    ]
+    years = [y for y in years if len(y)]
+    if not years:
+        return get_business_calendar()
+    return get_business_calendar(int(min(y.min() for y in years)), int(max(y.max() for y in years)))
+
+
+def is_off(values):
+    """ is_off vektor (int 0/1) dengan kalender yang mencakup semua tahun di `values` """
+    local = to_local_naive(values)
+    return _calendar_for(local).is_off(local)
+
+
+def business_hours_between(start, end):
+    """ Durasi jam kerja per elemen, kalender diperluas otomatis sesuai data """
+    start, end = to_local_naive(start), to_local_naive(end)
+    return _calendar_for(start, end).business_hours_between(start, end)
@@ -0,0 +1,313 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+CLUSTER_RESULTS_PATH = os.path.join(settings.BASE_DIR, "tickets", "static", "clustering", "cluster_results.json")
+
+# Array koordinat & label yang bisa disimpan di sidecar .npz (cluster_results.npz)
+COORD_KEYS = ("visual_coords_2d", "pca_coords", "mca_coords")
+ARRAY_KEYS = COORD_KEYS + ("cluster_labels",)
+
+DEFAULT_SCATTER_LIMIT = 2000
+MAX_SCATTER_LIMIT = 20000
+SCATTER_GRID_SIZE = 64
+MAX_CACHED_PAYLOADS = 32
+
+cluster_colors = ['rgba(59, 130, 246, 0.8)', 'rgba(72, 187, 120, 0.8)', 'rgba(239, 68, 68, 0.8)']
+
+EMPTY_CLUSTER_DATA = {
+    "num_clusters": 0, "summary_per_cluster": {}, "visual_coords_2d": [],
+    "pca_coords": [], "mca_coords": [], "cluster_labels": [],
+    "numerical_columns_summary": [], "categorical_columns_summary": [],
+    "final_silhouette_score": None, "best_gamma": None,
+}
+
+
+def sidecar_path(json_path):
+    return os.path.splitext(json_path)[0] + ".npz"
+
+
+def convert_nan(obj):
+    """ String 'NaN' dari notebook (numpy_encoder) dikembalikan menjadi np.nan """
+    if isinstance(obj, dict):
+        return {k: convert_nan(v) for k, v in obj.items()}
+    return np.nan if obj == 'NaN' else obj
+
+
+def _uniform_indices(labels, coords, limit, rng):
+    """ Sampling acak seragam (perilaku lama) """
+    return rng.choice(len(labels), limit, replace=False)
+
+
+def _stratified_indices(labels, coords, limit, rng):
+    """
+    Sampling per cluster: setiap cluster mendapat jatah minimum yang sama
+    (agar cluster kecil tetap terlihat), sisanya dibagi proporsional ukuran.
+    """
+    cluster_ids, sizes = np.unique(labels, return_counts=True)
+    quota = np.minimum(sizes, limit // (2 * len(cluster_ids)))
+    remaining = sizes - quota
+    spare = limit - quota.sum()
+    if spare > 0 and remaining.sum() > 0:
+        share = remaining * spare / remaining.sum()
+        extra = np.minimum(np.floor(share).astype(np.int64), remaining)
+        # Sisa pembulatan ke cluster dengan pecahan terbesar
+        leftover = int(min(spare - extra.sum(), (remaining - extra).sum()))
+        if leftover > 0:
+            order = np.argsort(-(share - extra), kind="stable")
+            order = order[(remaining - extra)[order] > 0][:leftover]
+            extra[order] += 1
+        quota = quota + extra
+
+    chosen = []
+    for cluster_id, count in zip(cluster_ids, quota):
+        members = np.flatnonzero(labels == cluster_id)
+        chosen.append(members if count >= len(members) else rng.choice(members, count, replace=False))
+    indices = np.concatenate(chosen) if chosen else np.empty(0, dtype=np.int64)
+    return indices[rng.permutation(len(indices))]
+
+
+def _grid_indices(labels, coords, limit, rng):
+    """
+    Thinning berbasis grid 2D: titik di sel padat dibatasi per sel sehingga
+    area padat tidak menutupi area jarang.
+    """
+    total_points = len(coords)
+    mins, maxs = coords.min(axis=0), coords.max(axis=0)
+    span = np.where(maxs > mins, maxs - mins, 1.0)
+    cell_xy = np.minimum(((coords - mins) / span * SCATTER_GRID_SIZE).astype(np.int64), SCATTER_GRID_SIZE - 1)
+    cells = cell_xy[:, 0] * SCATTER_GRID_SIZE + cell_xy[:, 1]
+
+    # Urutan acak, lalu peringkat titik di dalam selnya
+    shuffled = rng.permutation(total_points)
+    order = shuffled[np.argsort(cells[shuffled], kind="stable")]
+    sorted_cells = cells[order]
+    cell_start = np.searchsorted(sorted_cells, sorted_cells, side="left")
+    rank = np.empty(total_points, dtype=np.int64)
+    rank[order] = np.arange(total_points) - cell_start
+
+    # Kapasitas per sel terkecil yang menghasilkan >= limit titik
+    counts = np.sort(np.bincount(cells))
+    caps = np.arange(1, counts[-1] + 1)
+    below = np.searchsorted(counts, caps, side="left")
+    capped_total = np.concatenate([[0], np.cumsum(counts)])[below] + caps * (len(counts) - below)
+    cap = int(np.searchsorted(capped_total, limit)) + 1
+
+    keep = np.flatnonzero(rank < cap - 1)
+    last = np.flatnonzero(rank == cap - 1)
+    need = limit - len(keep)
+    indices = np.concatenate([keep, rng.choice(last, need, replace=False)])
+    return indices[rng.permutation(len(indices))]
+
+
+SCATTER_SAMPLERS = {
+    "uniform": _uniform_indices,
+    "stratified": _stratified_indices,
+    "grid": _grid_indices,
+}
+
+
+def create_scatter_dataset(coords, labels, num_clusters, limit=DEFAULT_SCATTER_LIMIT, sampling="uniform"):
+    """
+    Fungsi helper untuk memproses (sampling + formatting) koordinat 2D (PCA/MCA/UMAP)
+    menjadi datasets yang siap untuk Chart.js.
+    Pengelompokan per cluster memakai argsort label (bukan loop per cluster).
+    """
+    if coords is None or labels is None or len(coords) == 0 or len(labels) == 0 or len(coords) != len(labels):
+        return None
+
+    coords = np.asarray(coords, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.int64)
+    total_points = len(coords)
+
+    if total_points > limit:
+        # RNG lokal dengan seed yang sama seperti sebelumnya (np.random.seed(42))
+        indices = SCATTER_SAMPLERS[sampling](labels, coords, limit, np.random.RandomState(42))
+    else:
+        indices = np.arange(total_points)
+
+    # Group-by label: argsort stabil mempertahankan urutan sampling di dalam cluster
+    sampled_labels = labels[indices]
+    order = np.argsort(sampled_labels, kind="stable")
+    indices, sampled_labels = indices[order], sampled_labels[order]
+    bounds = np.searchsorted(sampled_labels, np.arange(num_clusters + 1))
+
+    datasets = []
+    for cluster_id in range(num_clusters):
+        xy = coords[indices[bounds[cluster_id]:bounds[cluster_id + 1]]].tolist()
+        datasets.append({
+            "label": f"Cluster {cluster_id}",
+            "data": [{"x": x, "y": y} for x, y in xy],
+            "backgroundColor": cluster_colors[cluster_id % len(cluster_colors)],
+            "pointRadius": 3,
+        })
+    return {
+        "datasets": datasets,
+        "meta": {
+            "sampling": sampling,
+            "limit": limit,
+            "total_points": total_points,
+            "sampled_points": int(bounds[-1] - bounds[0]),
+        },
+    }
+
+
+class ClusterArtifact:
+    """
+    Hasil clustering yang sudah di-parse: metadata/summary (dict) dan
+    koordinat sebagai array NumPy. Payload scatter Chart.js dihitung sekali
+    lalu disimpan.
+    """
+
+    def __init__(self, data, arrays, signature=None):
+        self.data = data
+        self.arrays = arrays
+        self.signature = signature
+        self.num_clusters = int(data.get("num_clusters", 0) or 0)
+        self._payloads = {}
+        self._lock = threading.Lock()
+
+    @property
+    def labels(self):
+        return self.arrays["cluster_labels"]
+
+    def coords(self, key):
+        """ Koordinat untuk chart; visual_coords_2d jatuh ke pca_coords jika kosong """
+        coords = self.arrays.get(key)
+        if key == "visual_coords_2d" and (coords is None or len(coords) == 0):
+            coords = self.arrays.get("pca_coords")
+        return coords
+
+    def scatter(self, key, limit=DEFAULT_SCATTER_LIMIT, sampling="uniform"):
+        """ Payload scatter (memoized per key + parameter sampling) """
+        cache_key = (key, sampling, limit)
+        with self._lock:
+            if cache_key in self._payloads:
+                return self._payloads[cache_key]
+        payload = create_scatter_dataset(self.coords(key), self.labels, self.num_clusters, limit, sampling)
+        with self._lock:
+            if len(self._payloads) >= MAX_CACHED_PAYLOADS:
+                self._payloads.pop(next(iter(self._payloads)))
+            self._payloads[cache_key] = payload
+        return payload
+
+    def precompute(self):
+        for key in COORD_KEYS:
+            self.scatter(key)
+        return self
+
+
+def _as_arrays(source):
+    arrays = {}
+    for key in COORD_KEYS:
+        arr = np.asarray(source.get(key) if source.get(key) is not None else [], dtype=np.float64)
+        arrays[key] = arr.reshape(-1, 2) if arr.size else np.empty((0, 2))
+    labels = source.get("cluster_labels")
+    arrays["cluster_labels"] = np.asarray(labels if labels is not None else [], dtype=np.int64)
+    return arrays
+
+
+def empty_cluster_artifact():
+    return ClusterArtifact(dict(EMPTY_CLUSTER_DATA), _as_arrays({}))
+
+
+def load_cluster_artifact(json_path=CLUSTER_RESULTS_PATH):
+    """
+    Parse cluster_results.json (dan sidecar .npz jika ada dan tidak lebih tua
+    dari JSON, atau JSON sudah di-strip). Jika file tidak ada, artefak kosong
+    dikembalikan.
+    """
+    signature = _signature(json_path)
+    if not os.path.exists(json_path):
+        artifact = empty_cluster_artifact()
+        artifact.signature = signature
+        return artifact
+
+    with open(json_path, "r") as f:
+        data_raw = json.load(f)
+    data = convert_nan({k: v for k, v in data_raw.items() if k not in ARRAY_KEYS})
+
+    npz_path = sidecar_path(json_path)
+    has_json_arrays = any(key in data_raw for key in ARRAY_KEYS)
+    if os.path.exists(npz_path) and (
+        not has_json_arrays or os.path.getmtime(npz_path) >= os.path.getmtime(json_path)
+    ):
+        with np.load(npz_path) as npz:
+            arrays = _as_arrays({key: npz[key] for key in ARRAY_KEYS if key in npz.files})
+    else:
+        arrays = _as_arrays(data_raw)
+    return ClusterArtifact(data, arrays, signature)
+
+
+def write_cluster_sidecar(json_path=CLUSTER_RESULTS_PATH, strip_json=False):
+    """
+    Tulis koordinat & label dari JSON ke sidecar .npz (biner, ringkas).
+    strip_json=True juga menulis ulang JSON tanpa array tsb agar parsing
+    saat startup ringan. Penulisan atomik (file sementara + os.replace).
+    """
+    with open(json_path, "r") as f:
+        data_raw = json.load(f)
+    arrays = _as_arrays(data_raw)
+
+    npz_path = sidecar_path(json_path)
+    tmp_json = json_path + ".tmp"
+    tmp_npz = npz_path + ".tmp.npz"
+    if strip_json:
+        with open(tmp_json, "w") as f:
+            json.dump({k: v for k, v in data_raw.items() if k not in ARRAY_KEYS}, f, indent=4)
+    # npz ditulis setelah JSON agar mtime-nya >= JSON (os.replace mempertahankan mtime)
+    np.savez_compressed(tmp_npz, **arrays)
+
+    if strip_json:
+        os.replace(tmp_json, json_path)
+    os.replace(tmp_npz, npz_path)
+    return npz_path, arrays
+
+
+def _signature(json_path):
+    """ (mtime, size) JSON dan sidecar; berubah -> artefak dimuat ulang """
+    parts = []
+    for path in (json_path, sidecar_path(json_path)):
+        try:
+            stat = os.stat(path)
+            parts.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            parts.append(None)
+    return tuple(parts)
+
+
+class ClusterArtifactLoader:
+    """
+    Memuat artefak clustering sekali per process dan hanya memuat ulang
+    jika mtime/size file berubah. Thread-safe.
+    """
+
+    def __init__(self, json_path=CLUSTER_RESULTS_PATH):
+        self.json_path = json_path
+        self._artifact = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        signature = _signature(self.json_path)
+        artifact = self._artifact
+        if artifact is not None and artifact.signature == signature:
+            return artifact
+        with self._lock:
+            if self._artifact is None or self._artifact.signature != signature:
+                self._artifact = load_cluster_artifact(self.json_path).precompute()
+            return self._artifact
+
+    def version(self):
+        """ Hash pendek mtime/size JSON + sidecar, untuk key cache response /clusters """
+        return hashlib.md5(repr(_signature(self.json_path)).encode("utf-8")).hexdigest()[:12]
+
+    def clear(self):
+        with self._lock:
+            self._artifact = None
+
+
+cluster_artifact_loader = ClusterArtifactLoader()
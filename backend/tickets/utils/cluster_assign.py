@@ -0,0 +1,353 @@
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from .business_calendar import is_off
+from .cluster_artifacts import cluster_artifact_loader
+
+# Kolom notebook (summary cluster) -> field Ticket
+CLUSTER_TICKET_FIELDS = {
+    'Days to Due': 'days_to_due',
+    'Average Resolution Time (Ac)': 'average_resolution_time_ac',
+    'Application SLA Compliance Rate': 'application_sla_compliance_rate',
+    'Resolution Duration': 'resolution_duration',
+    'SLA Threshold': 'sla_threshold',
+    'Is SLA Violated': 'is_sla_violated',
+    'Total Tickets Resolved (Wc)': 'total_tickets_resolved_wc',
+    'SLA to Average Resolution Ratio (Rc)': 'sla_to_average_resolution_ratio_rc',
+    'Time Left Incl. On Hold': 'time_left_incl_on_hold',
+    'Open Month': 'open_month',
+    'Application Creation Hour': 'application_creation_hour',
+    'Application SLA Deadline Hour': 'application_sla_deadline_hour',
+    'Is Open Date Off': 'is_open_date_off',
+    'Is Due Date Off': 'is_due_date_off',
+    'Priority': 'priority',
+    'Category': 'category',
+    'Item': 'item',
+    'Application Creation Day of Week': 'application_creation_day_of_week',
+    'Application SLA Deadline Day of Week': 'application_sla_deadline_day_of_week',
+}
+
+# Kolom notebook -> key input form prediksi (kolom lain diambil dari hasil prediksi)
+CLUSTER_INPUT_FIELDS = {
+    'Priority': 'priority',
+    'Category': 'category',
+    'Item': 'item',
+    'Sub Category': 'sub_category',
+}
+
+# Fitur siklikal (notebook K-Prototypes): kolom -> periode; di ruang model menjadi '<kolom>_sin' / '<kolom>_cos'
+CYCLICAL_PERIODS = {
+    'Application Creation Day of Week': 7,
+    'Application SLA Deadline Day of Week': 7,
+    'Application Creation Hour': 24,
+    'Application SLA Deadline Hour': 24,
+}
+CYCLICAL_SUFFIXES = ('_sin', '_cos')
+
+# Nama hari (Ticket menyimpan 'Monday', ...) -> angka seperti pandas dayofweek
+DAY_OF_WEEK_NUMBERS = {
+    name: number for number, name in enumerate(
+        ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+    )
+}
+
+# Kode kategorikal: nilai yang tidak ada di mode centroid manapun / nilai yang tidak tersedia
+UNKNOWN_CODE = -1
+MISSING_CODE = -2
+
+
+def _normalize(value):
+    return str(value).strip().lower()
+
+
+def _to_number(value):
+    """ Nilai numerik mentah; nama hari -> 0-6, bool -> 0/1, kosong/tidak valid -> NaN """
+    if value is None:
+        return np.nan
+    if isinstance(value, str):
+        day = DAY_OF_WEEK_NUMBERS.get(value.strip().lower())
+        if day is not None:
+            return float(day)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _numbers(values):
+    array = np.asarray(values)
+    if array.dtype.kind in 'biuf':
+        return array.astype(np.float64)
+    return np.asarray([_to_number(v) for v in values], dtype=np.float64)
+
+
+def numeric_column(columns, col, n):
+    """
+    Kolom numerik ruang model dari kolom mentah: '<kolom>_sin' / '<kolom>_cos'
+    dihitung dari kolom siklikalnya (sama dengan notebook), selain itu nilai
+    apa adanya. Kolom yang tidak ada -> NaN semua.
+    """
+    for suffix in CYCLICAL_SUFFIXES:
+        base = col[:-len(suffix)]
+        if col.endswith(suffix) and base in CYCLICAL_PERIODS:
+            values = columns.get(base)
+            if values is None:
+                return np.full(n, np.nan)
+            angle = 2 * np.pi * _numbers(values) / CYCLICAL_PERIODS[base]
+            return np.sin(angle) if suffix == '_sin' else np.cos(angle)
+    values = columns.get(col)
+    if values is None:
+        return np.full(n, np.nan)
+    return _numbers(values)
+
+
+class ClusterAssigner:
+    """
+    Assignment nearest-centroid K-Prototypes untuk tiket baru: centroid
+    numerik (mean_numerical) dan mode kategorikal dari summary cluster
+    disimpan sebagai array NumPy sekali saat dibuat.
+
+    Jarak = jumlah kuadrat selisih numerik + gamma * jumlah kolom kategorikal
+    yang berbeda dari mode centroid (sama dengan biaya K-Prototypes).
+    Nilai yang tidak tersedia (NaN / kolom tidak ada) dilewati, sehingga
+    input form prediksi yang hanya punya sebagian kolom tetap bisa di-assign.
+
+    Jika artefak menyimpan prototype asli K-Prototypes (blok 'prototypes',
+    ditulis recluster_tickets), jarak dihitung di ruang model: kolom
+    siklikal sin/cos dan (x - center) / scale dari RobustScaler; jika tidak,
+    dipakai mean_numerical / mode_categorical dari summary, dengan kolom
+    numerik distandarkan memakai rata-rata dan simpangan baku antar centroid
+    (tanpa itu kolom bersatuan besar, mis. jam, mengalahkan gamma).
+    """
+
+    def __init__(self, cluster_ids, numerical_columns, centroids, categorical_columns, modes, gamma,
+                 center=None, scale=None):
+        self.cluster_ids = np.asarray(cluster_ids, dtype=np.int64)
+        self.numerical_columns = list(numerical_columns)
+        self.centroids = np.asarray(centroids, dtype=np.float64).reshape(len(self.cluster_ids), -1)
+        self.categorical_columns = list(categorical_columns)
+        self.gamma = float(gamma)
+        p = len(self.numerical_columns)
+        self.center = np.zeros(p) if center is None else np.asarray(center, dtype=np.float64)
+        self.scale = np.ones(p) if scale is None else np.asarray(scale, dtype=np.float64)
+
+        # Mode centroid dikodekan per kolom: perbandingan kategorikal jadi perbandingan int
+        self.category_tables = []
+        self.centroid_codes = np.full((len(self.cluster_ids), len(self.categorical_columns)), MISSING_CODE,
+                                      dtype=np.int64)
+        for col_index in range(len(self.categorical_columns)):
+            table = {}
+            for cluster_index, mode in enumerate(modes):
+                value = mode[col_index]
+                if value is None:
+                    continue
+                code = table.setdefault(_normalize(value), len(table))
+                self.centroid_codes[cluster_index, col_index] = code
+            self.category_tables.append(table)
+
+    @classmethod
+    def from_prototypes(cls, prototypes, gamma):
+        """ Dari blok 'prototypes' artefak (centroid K-Prototypes di ruang model) """
+        return cls(
+            prototypes['cluster_ids'], prototypes['numerical_columns'], prototypes['centroids_numerical'],
+            prototypes['categorical_columns'], prototypes['centroids_categorical'], gamma,
+            center=prototypes.get('center'), scale=prototypes.get('scale'),
+        )
+
+    @classmethod
+    def from_cluster_data(cls, data):
+        """ Dari cluster_results.json (ClusterArtifact.data); None jika belum ada cluster """
+        gamma = data.get('best_gamma')
+        gamma = 0.0 if gamma is None or gamma != gamma else gamma
+        if data.get('prototypes'):
+            return cls.from_prototypes(data['prototypes'], gamma)
+
+        summary = data.get('summary_per_cluster') or {}
+        if not summary:
+            return None
+        numerical_columns = list(data.get('numerical_columns_summary') or [])
+        categorical_columns = list(data.get('categorical_columns_summary') or [])
+        cluster_ids = sorted(summary, key=int)
+        centroids = [
+            [
+                np.nan if summary[cid].get('mean_numerical', {}).get(col) is None
+                else float(summary[cid]['mean_numerical'][col])
+                for col in numerical_columns
+            ]
+            for cid in cluster_ids
+        ]
+        modes = [
+            [summary[cid].get('mode_categorical', {}).get(col) for col in categorical_columns]
+            for cid in cluster_ids
+        ]
+        # Centroid dan input berada di ruang yang sama: (x - center) / scale
+        centroids = np.asarray(centroids, dtype=np.float64).reshape(len(cluster_ids), len(numerical_columns))
+        center, scale = cls.summary_scaling(centroids)
+        return cls(
+            [int(cid) for cid in cluster_ids], numerical_columns, (centroids - center) / scale,
+            categorical_columns, modes, gamma, center=center, scale=scale,
+        )
+
+    @staticmethod
+    def summary_scaling(centroids):
+        """
+        (center, scale) per kolom dari sebaran centroid summary: rata-rata dan
+        simpangan baku antar cluster. Kolom tanpa sebaran (satu cluster /
+        nilai sama / kosong) -> center 0, scale 1: selisihnya sama untuk semua
+        cluster sehingga tidak mengubah cluster terdekat.
+        """
+        p = centroids.shape[1]
+        center, scale = np.zeros(p), np.ones(p)
+        for col_index in range(p):
+            values = centroids[:, col_index]
+            values = values[~np.isnan(values)]
+            if len(values) > 1 and values.std() > 0:
+                center[col_index], scale[col_index] = values.mean(), values.std()
+        return center, scale
+
+    @property
+    def source_columns(self):
+        """ Kolom mentah yang dibutuhkan encode() (kolom sin/cos -> kolom siklikalnya) """
+        columns = []
+        for col in self.numerical_columns + self.categorical_columns:
+            for suffix in CYCLICAL_SUFFIXES:
+                if col.endswith(suffix) and col[:-len(suffix)] in CYCLICAL_PERIODS:
+                    col = col[:-len(suffix)]
+            columns.append(col)
+        return list(dict.fromkeys(columns))
+
+    @property
+    def num_clusters(self):
+        return len(self.cluster_ids)
+
+    def encode(self, columns, n):
+        """
+        {nama kolom notebook: list nilai mentah} -> (array numerik (n, p) di
+        ruang centroid dengan NaN untuk nilai kosong, kode kategorikal (n, m)).
+        """
+        numeric = np.empty((n, len(self.numerical_columns)))
+        for col_index, col in enumerate(self.numerical_columns):
+            numeric[:, col_index] = numeric_column(columns, col, n)
+        numeric = (numeric - self.center) / self.scale
+
+        codes = np.full((n, len(self.categorical_columns)), MISSING_CODE, dtype=np.int64)
+        for col_index, col in enumerate(self.categorical_columns):
+            values = columns.get(col)
+            if values is None:
+                continue
+            table = self.category_tables[col_index]
+            codes[:, col_index] = [
+                MISSING_CODE if v is None else table.get(_normalize(v), UNKNOWN_CODE) for v in values
+            ]
+        return numeric, codes
+
+    def distances(self, numeric, codes):
+        """ Matriks jarak (n, k) ke setiap centroid, dihitung per cluster (k kecil) atas seluruh batch """
+        result = np.empty((len(numeric), self.num_clusters))
+        available = codes != MISSING_CODE
+        for cluster_index in range(self.num_clusters):
+            squared = np.square(numeric - self.centroids[cluster_index])
+            numerical_cost = np.where(np.isnan(squared), 0.0, squared).sum(axis=1)
+            mismatches = ((codes != self.centroid_codes[cluster_index]) & available).sum(axis=1)
+            result[:, cluster_index] = numerical_cost + self.gamma * mismatches
+        return result
+
+    def assign(self, columns, n):
+        """ (cluster_id, jarak ke centroid terdekat) per baris """
+        if n == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        distances = self.distances(*self.encode(columns, n))
+        nearest = distances.argmin(axis=1)
+        return self.cluster_ids[nearest], distances[np.arange(n), nearest]
+
+    def assign_tickets(self, rows):
+        """ Untuk dict field Ticket (kwargs import_tickets atau .values()); mengembalikan list cluster_id """
+        columns = {
+            col: [row.get(CLUSTER_TICKET_FIELDS[col]) for row in rows]
+            for col in self.source_columns if col in CLUSTER_TICKET_FIELDS
+        }
+        return self.assign(columns, len(rows))[0].tolist()
+
+    @property
+    def ticket_fields(self):
+        """ Field Ticket yang dibaca assign_tickets """
+        return [CLUSTER_TICKET_FIELDS[col] for col in self.source_columns if col in CLUSTER_TICKET_FIELDS]
+
+    def assign_predictions(self, records, results):
+        """
+        Untuk input form + hasil SLAPredictor: Days to Due dari hasil prediksi,
+        Is SLA Violated dari keputusan model (label asli belum diketahui),
+        fitur waktu (jam/hari/bulan/hari libur) dari open_date & due_date.
+        Mengembalikan list {'cluster_id', 'distance'} (None untuk hasil error).
+        """
+        rows = [
+            (record, result) for record, result in zip(records, results)
+            if isinstance(record, dict) and result.get('status') != 'error'
+        ]
+        columns = {col: [record.get(key) for record, _ in rows] for col, key in CLUSTER_INPUT_FIELDS.items()}
+        columns['Days to Due'] = [result.get('days_to_due') for _, result in rows]
+        columns['Is SLA Violated'] = [float(result.get('sla_violated', False)) for _, result in rows]
+        columns.update(_date_columns([record for record, _ in rows]))
+        labels, distances = self.assign(columns, len(rows))
+        assigned = iter(zip(labels.tolist(), distances.tolist()))
+        output = []
+        for record, result in zip(records, results):
+            if not isinstance(record, dict) or result.get('status') == 'error':
+                output.append(None)
+            else:
+                cluster_id, distance = next(assigned)
+                output.append({'cluster_id': cluster_id, 'distance': round(distance, 6)})
+        return output
+
+
+def _date_columns(records):
+    """ Fitur waktu seperti kolom Ticket, dari open_date/due_date (ISO 8601) input form """
+    parsed = []
+    for record in records:
+        try:
+            parsed.append((datetime.fromisoformat(record['open_date']), datetime.fromisoformat(record['due_date'])))
+        except (KeyError, TypeError, ValueError):
+            parsed.append(None)
+    valid = [dates for dates in parsed if dates is not None]
+    open_off = iter(is_off([open_dt for open_dt, _ in valid]).tolist() if valid else [])
+    due_off = iter(is_off([due_dt for _, due_dt in valid]).tolist() if valid else [])
+    columns = {col: [] for col in (
+        'Open Month', 'Application Creation Hour', 'Application Creation Day of Week',
+        'Application SLA Deadline Hour', 'Application SLA Deadline Day of Week', 'Is Open Date Off', 'Is Due Date Off',
+    )}
+    for dates in parsed:
+        if dates is None:
+            for values in columns.values():
+                values.append(None)
+            continue
+        open_dt, due_dt = dates
+        columns['Open Month'].append(open_dt.month)
+        columns['Application Creation Hour'].append(open_dt.hour)
+        columns['Application Creation Day of Week'].append(open_dt.weekday())
+        columns['Application SLA Deadline Hour'].append(due_dt.hour)
+        columns['Application SLA Deadline Day of Week'].append(due_dt.weekday())
+        columns['Is Open Date Off'].append(next(open_off))
+        columns['Is Due Date Off'].append(next(due_off))
+    return columns
+
+
+_assigner = (None, None)
+_assigner_lock = threading.Lock()
+
+
+def get_cluster_assigner():
+    """
+    ClusterAssigner untuk artefak cluster yang sedang aktif (dibuat ulang hanya
+    jika cluster_artifact_loader memuat artefak baru). None jika belum ada cluster.
+    """
+    global _assigner
+    artifact = cluster_artifact_loader.get()
+    cached_artifact, assigner = _assigner
+    if cached_artifact is artifact:
+        return assigner
+    with _assigner_lock:
+        if _assigner[0] is not artifact:
+            _assigner = (artifact, ClusterAssigner.from_cluster_data(artifact.data))
+        return _assigner[1]
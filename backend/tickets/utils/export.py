@@ -0,0 +1,174 @@
+import csv
+import io
+import json
+import zlib
+from itertools import islice
+
+from django.db import models
+from rest_framework.utils.encoders import JSONEncoder
+
+from ..models import Ticket
+
+# orjson / pyarrow opsional: tanpa orjson NDJSON memakai json stdlib,
+# tanpa pyarrow output parquet tidak tersedia
+try:
+    import orjson
+
+    from ..renderers import ORJSON_OPTIONS
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# output -> (content type, ekstensi file)
+EXPORT_OUTPUTS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+EXPORT_COMPRESSIONS = ('none', 'gzip')
+
+
+def parquet_available():
+    return pq is not None
+
+
+def iter_chunks(rows, size):
+    """ Kelompokkan iterator baris menjadi list berukuran `size` """
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def csv_stream(chunks, serializer):
+    """ Header lalu satu blok bytes per chunk (bukan per baris) """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(serializer.fields)
+    for chunk in chunks:
+        writer.writerows([row[field] for field in serializer.fields] for row in serializer.to_representation(chunk))
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    tail = buffer.getvalue()
+    if tail:
+        yield tail.encode('utf-8')
+
+
+_encoder = JSONEncoder()
+
+
+def _dumps_line(row):
+    if orjson is not None:
+        return orjson.dumps(row, default=_encoder.default, option=ORJSON_OPTIONS) + b'\n'
+    return (json.dumps(row, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def ndjson_stream(chunks, serializer):
+    """ Satu objek JSON per baris, format field sama dengan /api/tickets/ """
+    for chunk in chunks:
+        yield b''.join(_dumps_line(row) for row in serializer.to_representation(chunk))
+
+
+class _ChunkSink(io.RawIOBase):
+    """ File-like tujuan ParquetWriter: bytes ditampung sampai diambil dengan drain() """
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _parquet_type(field):
+    """ Tipe kolom Arrow dari field model; field turunan serializer berupa string """
+    try:
+        model_field = Ticket._meta.get_field(field)
+    except Exception:
+        return pa.string()
+    if isinstance(model_field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(model_field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(model_field, models.IntegerField):
+        return pa.int64()
+    if isinstance(model_field, models.FloatField):
+        return pa.float64()
+    return pa.string()
+
+
+def parquet_stream(chunks, serializer):
+    """
+    Satu row group per chunk. Kolom datetime ditulis sebagai timestamp UTC
+    (bukan string tampilan) agar bisa langsung dipakai pandas/analitik.
+    Footer parquet ditulis saat writer ditutup, di akhir stream.
+    """
+    schema = pa.schema([(field, _parquet_type(field)) for field in serializer.fields])
+    timestamp_fields = [field for field in serializer.fields if pa.types.is_timestamp(schema.field(field).type)]
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for chunk in chunks:
+            rows = serializer.to_representation(chunk)
+            columns = {field: [row[field] for row in rows] for field in serializer.fields}
+            for field in timestamp_fields:
+                columns[field] = [row[field] for row in chunk]
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+EXPORT_WRITERS = {
+    'csv': csv_stream,
+    'ndjson': ndjson_stream,
+    'parquet': parquet_stream,
+}
+
+
+def gzip_stream(stream, level=6):
+    """ Kompres stream bytes on the fly (format gzip, bukan zlib mentah) """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for data in stream:
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_stream(rows, serializer, output='csv', compression='none', chunk_size=2000):
+    """
+    Generator bytes untuk StreamingHttpResponse. `rows` adalah iterator
+    dict .values() (mis. queryset.iterator(chunk_size)); memori konstan
+    sebesar satu chunk berapapun jumlah barisnya.
+    """
+    stream = EXPORT_WRITERS[output](iter_chunks(rows, chunk_size), serializer)
+    if compression == 'gzip':
+        stream = gzip_stream(stream)
+    return stream
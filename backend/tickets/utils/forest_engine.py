@@ -0,0 +1,261 @@
+import numpy as np
+
+INFERENCE_ENGINES = ('flat', 'sklearn')
+
+
+# Node dikodekan sebagai satu int64: (index child kanan << FEATURE_BITS) | (feature + 1);
+# feature 0 = leaf. Child kiri selalu node berikutnya (index + 1, urutan preorder).
+FEATURE_BITS = 16
+FEATURE_MASK = (1 << FEATURE_BITS) - 1
+
+# Jumlah pasangan (baris, tree) per blok traversal
+BLOCK_PAIRS = 1 << 15
+
+
+def _preorder(tree):
+    """ Urutan node preorder (kiri dulu) + peta index lama -> baru """
+    left, right = tree.children_left, tree.children_right
+    if np.array_equal(left[left != -1], np.flatnonzero(left != -1) + 1):
+        # Builder depth-first sklearn sudah menaruh child kiri tepat setelah parent
+        order = np.arange(tree.node_count)
+    else:
+        # Mis. best-first builder (max_leaf_nodes): susun ulang secara preorder
+        order, stack = [], [0]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            if left[node] != -1:
+                stack.append(right[node])
+                stack.append(left[node])
+        order = np.asarray(order)
+    new_index = np.empty(tree.node_count, dtype=np.int64)
+    new_index[order] = np.arange(tree.node_count)
+    return order, new_index
+
+
+def _float32_floor(values):
+    """
+    float32 terbesar <= nilai float64. Untuk x float32:
+    x <= t (float64)  <=>  x <= _float32_floor(t), jadi perbandingan bisa
+    dilakukan di float32 tanpa mengubah hasil.
+    """
+    rounded = values.astype(np.float32)
+    too_big = rounded.astype(np.float64) > values
+    rounded[too_big] = np.nextafter(rounded[too_big], np.float32(-np.inf))
+    return rounded
+
+
+def _path_deltas(nodes, values, roots):
+    """
+    Selisih probabilitas kelas tiap node terhadap parent-nya (0 untuk root)
+    dan rata-rata probabilitas root antar tree (bias), untuk contributions.
+    """
+    proba = values / values.sum(axis=1, keepdims=True)
+    internal = np.flatnonzero(nodes & FEATURE_MASK)
+    parent = np.arange(len(nodes))
+    parent[internal + 1] = internal
+    parent[nodes[internal] >> FEATURE_BITS] = internal
+    return proba - proba[parent], proba[roots].mean(axis=0)
+
+
+class FlatForest:
+    """
+    Random forest (RandomForestClassifier / ExtraTreesClassifier, satu
+    output) yang dipipihkan menjadi array node contiguous: semua tree
+    disambung, index child sudah global. Satu batch dievaluasi dengan
+    traversal vektor atas semua pasangan (baris, tree) per level; pasangan
+    yang sudah sampai leaf dikeluarkan, tanpa validasi input, dispatch
+    joblib, maupun konversi DataFrame per panggilan.
+
+    Hasil identik (bit per bit) dengan predict_proba sklearn: input dibulatkan
+    ke float32 seperti sklearn, nilai leaf diambil dari tree_.value yang sama,
+    dan probabilitas dijumlahkan per tree dengan urutan yang sama sebelum
+    dibagi jumlah tree.
+
+    Traversal NumPy unggul saat overhead per panggilan dominan (satu sampai
+    ratusan baris); untuk batch besar loop Cython sklearn lebih cepat, jadi
+    batch > max_batch_rows diteruskan ke model sklearn aslinya (`fallback`).
+
+    Untuk kontribusi fitur per prediksi (contributions), selisih
+    probabilitas node terhadap parent-nya (`delta`) dihitung sekali saat
+    dipipihkan; penjelasan cukup menjumlahkan delta di sepanjang jalur
+    traversal yang sama.
+    """
+
+    def __init__(self, nodes, threshold, missing_left, value, roots, max_depth, classes, n_features,
+                 fallback=None, max_batch_rows=None, delta=None, bias=None):
+        self.nodes = nodes
+        self.threshold = threshold
+        self.missing_left = missing_left
+        self.value = value
+        self.delta = delta
+        self.bias = bias
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        self.fallback = fallback
+        self.max_batch_rows = max_batch_rows
+
+    @classmethod
+    def from_sklearn(cls, model, max_batch_rows=None):
+        """ Pipihkan forest sklearn; TypeError jika model tidak didukung """
+        estimators = getattr(model, 'estimators_', None)
+        if not estimators or not hasattr(model, 'predict_proba') or getattr(model, 'n_outputs_', 1) != 1:
+            raise TypeError(f"Model {type(model).__name__} tidak didukung engine flat (butuh forest klasifikasi satu output)")
+        if model.n_features_in_ >= FEATURE_MASK:
+            raise TypeError(f"Engine flat mendukung maksimal {FEATURE_MASK - 1} fitur")
+        n_classes = len(model.classes_)
+
+        nodes, thresholds, missing_lefts, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            order, new_index = _preorder(tree)
+            is_leaf = tree.children_left[order] == -1
+            right = np.where(is_leaf, 0, new_index[tree.children_right[order]] + offset)
+            feature_code = np.where(is_leaf, 0, tree.feature[order] + 1)
+            nodes.append((right << FEATURE_BITS) | feature_code)
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold[order]))
+            missing = getattr(tree, 'missing_go_to_left', None)
+            missing_lefts.append(
+                np.zeros(tree.node_count, dtype=bool) if missing is None else missing[order].astype(bool)
+            )
+            # Sama dengan DecisionTreeClassifier.predict_proba: tree_.value[:, 0, :n_classes]
+            values.append(tree.value[order, 0, :n_classes])
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        nodes = np.ascontiguousarray(np.concatenate(nodes), dtype=np.int64)
+        values = np.ascontiguousarray(np.concatenate(values), dtype=np.float64)
+        roots = np.asarray(roots, dtype=np.int64)
+        delta, bias = _path_deltas(nodes, values, roots)
+        return cls(
+            nodes=nodes,
+            threshold=_float32_floor(np.concatenate(thresholds).astype(np.float64)),
+            missing_left=np.ascontiguousarray(np.concatenate(missing_lefts)),
+            value=values,
+            roots=roots,
+            max_depth=max_depth,
+            classes=model.classes_,
+            n_features=model.n_features_in_,
+            fallback=model,
+            max_batch_rows=max_batch_rows,
+            delta=delta,
+            bias=bias,
+        )
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @property
+    def node_count(self):
+        return len(self.nodes)
+
+    def _validate(self, X):
+        # sklearn memvalidasi X sebagai float32 (threshold sudah disesuaikan ke float32)
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X harus 2D dengan {self.n_features_in_} fitur, didapat shape {X.shape}")
+        return X
+
+    def apply(self, X):
+        """ Index node leaf (global) per baris x tree, shape (n_samples, n_estimators) """
+        return self._traverse(self._validate(X))[0]
+
+    def contributions(self, X, class_index=1):
+        """
+        Dekomposisi jalur (Saabas / treeinterpreter) untuk kelas class_index:
+        setiap split yang dilewati menyumbang selisih probabilitas child -
+        parent ke fitur split tsb, dirata-rata atas semua tree. Mengembalikan
+        (bias, kontribusi shape (n_samples, n_features)) dengan
+        bias + kontribusi.sum(axis=1) == predict_proba(X)[:, class_index]
+        (selisih hanya pembulatan float). Biaya sama dengan satu traversal
+        apply, tidak eksponensial seperti SHAP eksak.
+        """
+        X = self._validate(X)
+        _, contrib = self._traverse(X, np.ascontiguousarray(self.delta[:, class_index]))
+        contrib /= len(self.roots)
+        return float(self.bias[class_index]), contrib
+
+    def _traverse(self, X, delta=None):
+        n_samples, n_trees = len(X), len(self.roots)
+        leaves = np.empty((n_samples, n_trees), dtype=np.int64)
+        contrib = np.zeros((n_samples, self.n_features_in_)) if delta is not None else None
+        # Diproses per blok baris agar array sementara muat di cache CPU
+        block = max(1, BLOCK_PAIRS // n_trees)
+        for start in range(0, n_samples, block):
+            stop = min(start + block, n_samples)
+            self._apply_block(
+                X[start:stop], leaves[start:stop].reshape(-1),
+                delta, contrib[start:stop].reshape(-1) if contrib is not None else None,
+            )
+        return leaves, contrib
+
+    def _apply_block(self, X, out, delta=None, contrib=None):
+        """
+        Traversal satu blok; jika delta diberikan, delta node tujuan setiap
+        langkah ditambahkan ke contrib[baris, fitur split] (contrib berbentuk
+        datar n_samples * n_features).
+        """
+        n_samples, n_trees = len(X), len(self.roots)
+        flat_x = X.ravel()
+        has_missing = bool(np.isnan(flat_x).any())
+
+        # Satu elemen per pasangan (baris, tree), urutan baris-major
+        pair = np.arange(n_samples * n_trees, dtype=np.int64)
+        position = np.tile(self.roots, n_samples)
+        row_offset = np.repeat(np.arange(n_samples, dtype=np.int64) * self.n_features_in_, n_trees)
+
+        while len(position):
+            code = self.nodes[position]
+            feature = (code & FEATURE_MASK) - 1
+            at_leaf = feature < 0
+            if at_leaf.any():
+                # Pasangan yang sudah di leaf dicatat lalu dikeluarkan dari traversal
+                out[pair[at_leaf]] = position[at_leaf]
+                active = ~at_leaf
+                pair, position, row_offset = pair[active], position[active], row_offset[active]
+                code, feature = code[active], feature[active]
+                if not len(position):
+                    break
+            x = flat_x[row_offset + feature]
+            go_left = x <= self.threshold[position]
+            if has_missing:
+                missing = np.isnan(x)
+                if missing.any():
+                    go_left[missing] = self.missing_left[position[missing]]
+            position = np.where(go_left, position + 1, code >> FEATURE_BITS)
+            if contrib is not None:
+                # row_offset + feature = index (baris, fitur) di contrib datar
+                contrib += np.bincount(row_offset + feature, weights=delta[position], minlength=len(contrib))
+
+    def predict_proba(self, X):
+        if self.fallback is not None and self.max_batch_rows is not None and len(X) > self.max_batch_rows:
+            return self.fallback.predict_proba(X)
+        leaves = self.apply(X)
+        proba = np.zeros((leaves.shape[0], self.value.shape[1]), dtype=np.float64)
+        # Dijumlahkan per tree (bukan sum sekaligus) agar urutan penjumlahan float sama dengan sklearn
+        for tree_index in range(leaves.shape[1]):
+            proba += self.value[leaves[:, tree_index]]
+        proba /= len(self.roots)
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def build_inference_engine(model, engine='sklearn', max_batch_rows=None):
+    """
+    Engine untuk predict_proba: FlatForest jika engine='flat' (batch di atas
+    max_batch_rows tetap lewat sklearn), atau model sklearn apa adanya.
+    TypeError jika model tidak bisa dipipihkan.
+    """
+    if engine not in INFERENCE_ENGINES:
+        raise ValueError(f"engine harus salah satu dari: {', '.join(INFERENCE_ENGINES)}")
+    if engine == 'flat':
+        return FlatForest.from_sklearn(model, max_batch_rows=max_batch_rows)
+    return model
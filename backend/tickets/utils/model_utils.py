@@ -1,34 +1,99 @@
+import hashlib
+import logging
 import os
+import threading
+import time
 from datetime import datetime
 
 import joblib
 import numpy as np
 import pandas as pd  # Kita butuh pandas untuk holiday
 
-# Coba impor holidays, jika gagal, beri peringatan
-try:
-    from holidays import Indonesia
-except ImportError:
-    print("WARNING: 'holidays' library not installed. 'Is Holiday' feature will be 0.")
-    Indonesia = None
+from .business_calendar import business_hours_between, get_business_calendar, is_off
+from .forest_engine import FlatForest, build_inference_engine
+from .prediction_cache import get_prediction_cache
+from .structured_logging import stage_timer
+
+# Level diatur lewat SLA_PREDICTOR_DEBUG (settings.LOGGING); detail per prediksi hanya di DEBUG
+logger = logging.getLogger('tickets.predictor')
+
+# Pasangan kolom (nama di notebook, key dari React) untuk fitur kategorikal
+CATEGORICAL_INPUT_COLUMNS = [
+    ('Priority', 'priority'),
+    ('Category', 'category'),
+    ('Item', 'item'),
+    ('Sub Category', 'sub_category'),
+]
+
+
+# Tiket contoh untuk warm-up (memicu jalur preprocessing + predict_proba sekali)
+WARMUP_RECORD = {
+    'priority': '3 - medium',
+    'category': 'application',
+    'item': 'application 10',
+    'open_date': '2025-01-06T09:00',
+    'due_date': '2025-01-08T17:00',
+}
+
+
+# Bentuk ISO 8601 yang di-parse vektor oleh preprocess_batch: tanggal, jam opsional
+# (menit/detik/pecahan detik opsional) dan offset opsional (Z atau +HH:MM)
+ISO_DATETIME_PATTERN = (
+    r'^(\d{4}-\d{2}-\d{2})'
+    r'(?:([T ](?:[01]\d|2[0-3])(?::[0-5]\d(?::[0-5]\d(?:\.\d{1,6})?)?)?)(Z|[+-](?:[01]\d|2[0-3]):[0-5]\d)?)?$'
+)
+
+# Pesan yang sama dengan TypeError datetime saat open_date dan due_date dikurangkan di preprocess_input
+MIXED_TIMEZONE_MESSAGE = "can't subtract offset-naive and offset-aware datetimes"
+
+
+# File artefak model; mtime/size-nya menentukan versi model (reload + invalidasi cache prediksi)
+MODEL_FILES = [
+    'rf_sla_model.pkl', 'label_encoders.pkl', 'minmax_scaler.pkl', 'feature_names.pkl', 'best_threshold.pkl',
+]
+
+
+def default_model_dir():
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def model_files_signature(model_dir):
+    """ (mtime, size) tiap file model; berubah -> model perlu dimuat ulang """
+    parts = []
+    for name in MODEL_FILES:
+        try:
+            stat = os.stat(os.path.join(model_dir, name))
+            parts.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            parts.append(None)
+    return tuple(parts)
+
 
 class SLAPredictor:
-    def __init__(self):
-        script_dir = os.path.dirname(os.path.abspath(__file__))
+    def __init__(self, model_dir=None, mmap_mode=None, engine=None):
+        """
+        mmap_mode='r' membuat joblib memetakan array numpy di file .pkl
+        (yang tidak dikompres) langsung dari disk, sehingga page cache-nya
+        dipakai bersama oleh semua worker.
+        engine: 'sklearn' (predict_proba model apa adanya) atau 'flat'
+        (FlatForest); default dari SLA_INFERENCE_ENGINE ('sklearn').
+        """
+        load_start = time.perf_counter()
+        script_dir = model_dir or default_model_dir()
+        self.model_dir = script_dir
+        # Signature diambil sebelum file dibaca: jika file diganti saat loading, reload berikutnya tetap terpicu
+        self.signature = model_files_signature(script_dir)
+        self.files_checked_at = time.monotonic()
+        self.model_version = hashlib.blake2b(repr(self.signature).encode('utf-8'), digest_size=8).hexdigest()
         model_path = os.path.join(script_dir, 'rf_sla_model.pkl')
         encoders_path = os.path.join(script_dir, 'label_encoders.pkl')
         scaler_path = os.path.join(script_dir, 'minmax_scaler.pkl')
         features_path = os.path.join(script_dir, 'feature_names.pkl')
         threshold_path = os.path.join(script_dir, 'best_threshold.pkl')
         
-        # Inisialisasi kalender libur
-        if Indonesia:
-            # Ambil tahun sekarang dan tahun depan untuk kalender libur
-            current_year = datetime.now().year
-            self.holidays_id = Indonesia(years=[current_year, current_year + 1])
-            self.holiday_dates = set(self.holidays_id.keys())
-        else:
-            self.holiday_dates = set()
+        # Kalender libur dimuat sekarang (bitmap per hari, rentang SLA_CALENDAR_*);
+        # tahun di luar rentang diperluas otomatis saat dipakai
+        get_business_calendar()
 
         # Validasi file
         missing_files = []
@@ -44,211 +109,544 @@ class SLAPredictor:
         if missing_files:
             raise FileNotFoundError(f"File hilang di {script_dir}: {', '.join(missing_files)}. Pastikan Anda sudah melatih ulang model dan menyalin file .pkl yang baru.")
         
-        self.model = joblib.load(model_path)
-        self.encoders = joblib.load(encoders_path) # Dict encoders
-        self.scaler = joblib.load(scaler_path)
+        self.model = joblib.load(model_path, mmap_mode=mmap_mode)
+        self.encoders = joblib.load(encoders_path, mmap_mode=mmap_mode) # Dict encoders
+        self.scaler = joblib.load(scaler_path, mmap_mode=mmap_mode)
         self.feature_names = joblib.load(features_path)
         self.threshold = joblib.load(threshold_path)
+        self.encoder_tables = compile_encoder_tables(self.encoders)
+        self.engine_name, self.engine = self._build_engine(engine)
+        self.explain_top_n, self.explainer = self._build_explainer()
         
         # Cari tahu kolom mana yang di-scale saat training
         # Ini jauh lebih aman daripada hardcode indeks
         try:
             # Cek scaler punya atribut features_names_in_ (dari scikit-learn >= 0.24)
             self.scaled_feature_names = self.scaler.feature_names_in_
-            print(f"Scaler dilatih pada fitur: {self.scaled_feature_names}")
         except AttributeError:
             # Fallback jika versi scikit-learn lama (mengambil dari notebook Anda)
             self.scaled_feature_names = ['Days to Due'] # Sesuaikan jika Anda mengubah scaling di notebook
-            print(f"Scaler fallback, asumsi fitur: {self.scaled_feature_names}")
-            
-        print("Model (versi baru) berhasil dimuat!")
-        print(f"Model ini mengharapkan {len(self.feature_names)} fitur:")
-        print(self.feature_names)
+            logger.warning("Scaler tanpa feature_names_in_, asumsi fitur: %s", self.scaled_feature_names)
+
+        logger.info("Model (versi baru) berhasil dimuat", extra={
+            'model_dir': script_dir,
+            'feature_names': list(self.feature_names),
+            'scaled_features': list(self.scaled_feature_names),
+            'mmap_mode': mmap_mode,
+            'model_version': self.model_version,
+            'engine': self.engine_name,
+            'load_ms': round((time.perf_counter() - load_start) * 1000, 3),
+        })
+
+
+    def _build_engine(self, engine):
+        """ (nama, objek dengan predict_proba); model yang tidak bisa dipipihkan tetap lewat sklearn """
+        from django.conf import settings
+
+        engine = engine or getattr(settings, 'SLA_INFERENCE_ENGINE', 'sklearn')
+        max_batch_rows = getattr(settings, 'SLA_FLAT_ENGINE_MAX_ROWS', 256)
+        try:
+            return engine, build_inference_engine(self.model, engine, max_batch_rows=max_batch_rows)
+        except TypeError as e:
+            logger.warning("Engine %s tidak dipakai, kembali ke sklearn: %s", engine, e)
+            return 'sklearn', self.model
+
+    def _build_explainer(self):
+        """
+        (jumlah top kontributor, FlatForest untuk contributions). Engine flat
+        dipakai ulang; dengan engine sklearn forest dipipihkan khusus untuk
+        penjelasan. None jika dimatikan (SLA_EXPLAIN_TOP_N=0) atau model bukan forest.
+        """
+        from django.conf import settings
 
+        top_n = getattr(settings, 'SLA_EXPLAIN_TOP_N', 5)
+        if top_n <= 0:
+            return 0, None
+        if isinstance(self.engine, FlatForest):
+            return top_n, self.engine
+        try:
+            return top_n, FlatForest.from_sklearn(self.model)
+        except TypeError as e:
+            logger.warning("Kontribusi fitur tidak tersedia: %s", e)
+            return 0, None
+
+    def explain(self, X):
+        """
+        Kontribusi fitur per baris X (dekomposisi jalur forest) terhadap
+        probabilitas kelas '1' (Melanggar): {'baseline': rata-rata probabilitas
+        root, 'top': [{'feature', 'contribution'}, ...]} dengan kontribusi
+        terbesar (absolut) lebih dulu. Kontribusi positif menaikkan risiko.
+        None per baris jika penjelasan tidak tersedia.
+        """
+        if self.explainer is None or not len(X):
+            return [None] * len(X)
+        violated_idx = np.where(self.model.classes_ == 1)[0][0]
+        baseline, contrib = self.explainer.contributions(X, violated_idx)
+        top_n = min(self.explain_top_n, contrib.shape[1])
+        order = np.argsort(-np.abs(contrib), axis=1, kind='stable')[:, :top_n]
+        top_values = np.take_along_axis(contrib, order, axis=1)
+        baseline = round(baseline, 4)
+        return [
+            {
+                'baseline': baseline,
+                'top': [
+                    {'feature': self.feature_names[index], 'contribution': round(value, 4)}
+                    for index, value in zip(indices, values) if value != 0
+                ],
+            }
+            for indices, values in zip(order.tolist(), top_values.tolist())
+        ]
 
     def _is_off(self, dt):
         """ Cek apakah tanggal adalah weekend (Sabtu=5, Minggu=6) atau hari libur """
-        is_weekend = dt.weekday() >= 5
-        is_holiday = dt.date() in self.holiday_dates
-        return 1 if (is_weekend or is_holiday) else 0
+        return get_business_calendar(dt.year, dt.year).is_off_date(dt)
 
     def preprocess_input(self, input_data):
-        print("\n" + "="*30)
-        print("=== 1. PREPROCESS_INPUT DIMULAI ===")
-        print(f"Input Data Mentah: {input_data}")
+        debug = logger.isEnabledFor(logging.DEBUG)
 
         # 1. Konversi Tanggal
         try:
             open_dt = datetime.fromisoformat(input_data['open_date'])
             due_dt = datetime.fromisoformat(input_data['due_date'])
-            print(f"Tanggal dikonversi: Open={open_dt}, Due={due_dt}")
         except Exception as e:
-            print(f"!!! ERROR TANGGAL: {e}")
+            logger.debug("Tanggal tidak valid", extra={'input': input_data, 'error': str(e)})
             raise e
 
         # 2. Buat DataFrame
         processed_df = pd.DataFrame(columns=self.feature_names)
         
         # 3. Hitung Fitur Turunan
-        days_to_due_val = (due_dt - open_dt).days
-        processed_df.loc[0, 'Days to Due'] = days_to_due_val
-        print(f"Days to Due: {days_to_due_val}")
-        
-        open_month_val = open_dt.month
-        processed_df.loc[0, 'Open Month'] = open_month_val
-        print(f"Open Month: {open_month_val}")
-        
-        # ... (tambahkan print untuk fitur turunan lainnya: Hour, Day of Week, Is Off) ...
+        processed_df.loc[0, 'Days to Due'] = (due_dt - open_dt).days
+        processed_df.loc[0, 'Open Month'] = open_dt.month
         processed_df.loc[0, 'Application Creation Hour'] = open_dt.hour
-        print(f"Creation Hour: {open_dt.hour}")
         processed_df.loc[0, 'Is Open Date Off'] = self._is_off(open_dt)
-        print(f"Is Open Off: {self._is_off(open_dt)}")
 
 
         # 4. Handle Fitur Kategorikal
-        print("\n--- Encoding Dimulai ---")
-        for col_name_map in [
-            ('Priority', 'priority'), 
-            ('Category', 'category'),
-            ('Item', 'item'),
-            ('Sub Category', 'sub_category')
-        ]:
-            notebook_col, react_col = col_name_map
-            if notebook_col in self.encoders:
-                le = self.encoders[notebook_col]
+        unknown_values = {}
+        for notebook_col, react_col in CATEGORICAL_INPUT_COLUMNS:
+            if notebook_col in self.encoder_tables:
+                table, fallback = self.encoder_tables[notebook_col]
                 input_val = input_data.get(react_col, 'nan').lower().strip()
-                
-                if input_val in le.classes_:
-                    encoded_val = le.transform([input_val])[0]
-                    print(f"Encode {notebook_col}: '{input_val}' -> {encoded_val}")
-                else:
-                    print(f"!!! '{input_val}' (untuk {notebook_col}) TIDAK DITEMUKAN di encoder.")
-                    if 'unknown' in le.classes_:
-                         encoded_val = le.transform(['unknown'])[0]
-                         print(f"    -> Fallback ke 'unknown': {encoded_val}")
-                    else:
-                         encoded_val = -1
-                         print(f"    -> Fallback ke -1")
-                
+
+                encoded_val = table.get(input_val)
+                if encoded_val is None:
+                    unknown_values[notebook_col] = input_val
+                    encoded_val = fallback
+
                 processed_df.loc[0, notebook_col] = encoded_val
-        print("--- Encoding Selesai ---")
 
         # 5. Fillna
         processed_df = processed_df.fillna(0)
         
         # 6. Scaling
-        if self.scaled_feature_names:
+        if self.scaled_feature_names is not None and len(self.scaled_feature_names):
             cols_to_scale = [col for col in self.scaled_feature_names if col in processed_df.columns]
             if cols_to_scale:
-                print(f"\nScaling kolom: {cols_to_scale}")
-                # Ambil nilai sebelum di-scale
-                before_scale = processed_df[cols_to_scale].values
                 processed_df[cols_to_scale] = self.scaler.transform(processed_df[cols_to_scale])
-                # Ambil nilai sesudah di-scale
-                after_scale = processed_df[cols_to_scale].values
-                print(f"Nilai '{cols_to_scale[0]}' SEBELUM scale: {before_scale[0][0]}")
-                print(f"Nilai '{cols_to_scale[0]}' SETELAH scale: {after_scale[0][0]}")
 
         # 7. Kembalikan array
         final_array = processed_df[self.feature_names].values
-        print(f"\nBentuk Array Final: {final_array.shape}")
-        print("=== PREPROCESS_INPUT SELESAI ===\n")
+        if debug:
+            logger.debug("preprocess_input selesai", extra={
+                'input': input_data,
+                'features': dict(zip(self.feature_names, final_array[0].tolist())),
+                'unknown_values': unknown_values,
+            })
         return final_array
   
 
-    def predict(self, input_data):
-        try:
-            # 1. Preprocessing input
-            X = self.preprocess_input(input_data)
-
-            print("\n" + "=" * 30)
-            print("=== 2. PREDICT DIMULAI ===")
-            print(f"Data array yang akan diprediksi:\n{X}")
-
-            # 2. Dapatkan probabilitas dari model
-            proba_all = self.model.predict_proba(X)[0]
-            print(f"Probabilitas Mentah (Semua Kelas): {proba_all}")
-            print(f"Kelas Model: {self.model.classes_}")
-
-            # 3. Cari probabilitas untuk kelas '1' (Melanggar)
-            violated_idx = np.where(self.model.classes_ == 1)[0][0]
-            pred_proba = proba_all[violated_idx]
-            print(f"Probabilitas Melanggar (Kelas 1): {pred_proba:.6f}")
-
-            # 4. Terapkan threshold
-            print(f"Threshold yang Digunakan: {self.threshold}")
-            model_prediction = 1 if pred_proba >= self.threshold else 0
-            print(f"Hasil Prediksi Model (sebelum hardcode): {model_prediction}")
-            model_confidence = pred_proba * 100
-
-            # 5. Logika hardcode '1 - critical'
-            input_priority_raw = input_data.get('priority', '').strip().lower()
-            if input_priority_raw == '1 - critical':
-                final_prediction = 1
-                final_confidence = 100.0
-                final_text = 'Ya (Aturan Bisnis)'
-            else:
-                final_prediction = model_prediction
-                final_confidence = model_confidence
-                final_text = 'Ya' if final_prediction else 'Tidak'
+    def preprocess_batch(self, records):
+        """
+        Versi vektor dari preprocess_input untuk banyak tiket sekaligus.
+        Tanggal, encoder dan scaler diproses per kolom (bukan per baris).
+        Mengembalikan (X, valid_idx, errors): X hanya berisi baris yang valid,
+        valid_idx = posisi baris tsb di input, errors = {posisi: pesan}.
+        """
+        X, valid_idx, errors, _ = self._featurize_batch(records)
+        return X, valid_idx, errors
+
+    def _featurize_batch(self, records):
+        """ preprocess_batch + (days_to_due, open_hour, business_hours_to_due) per baris valid untuk _build_result """
+        n = len(records)
+        errors = {}
+        raw = pd.DataFrame.from_records(
+            [r if isinstance(r, dict) else {} for r in records], index=range(n)
+        )
+        for i, r in enumerate(records):
+            if not isinstance(r, dict):
+                errors[i] = "Setiap tiket harus berupa object JSON."
+
+        # 1. Konversi Tanggal (sekali jalan untuk semua baris)
+        open_dt, open_offset, open_aware = self._parse_dates(raw.get('open_date'), n)
+        due_dt, due_offset, due_aware = self._parse_dates(raw.get('due_date'), n)
+        invalid = open_dt.isna().to_numpy() | due_dt.isna().to_numpy()
+        for i in np.flatnonzero(invalid):
+            errors.setdefault(int(i), "Format open_date/due_date tidak valid (harus ISO 8601).")
+        # Satu tanggal dengan timezone dan satu tanpa: preprocess_input gagal dengan TypeError yang sama
+        for i in np.flatnonzero(~invalid & (open_aware.to_numpy() != due_aware.to_numpy())):
+            errors.setdefault(int(i), MIXED_TIMEZONE_MESSAGE)
+
+        # 2. Handle Fitur Kategorikal
+        encoded = {}
+        for notebook_col, react_col in CATEGORICAL_INPUT_COLUMNS:
+            if notebook_col not in self.encoder_tables:
+                continue
+            col = raw.get(react_col)
+            if col is None:
+                col = pd.Series('nan', index=raw.index)
+            bad = col.notna() & ~col.map(lambda v: isinstance(v, str))
+            for i in np.flatnonzero(bad.to_numpy()):
+                errors.setdefault(int(i), f"Field '{react_col}' harus berupa teks.")
+            values = col.where(col.notna() & ~bad, 'nan').astype(str).str.lower().str.strip()
+            encoded[notebook_col] = self.encode_column(notebook_col, values)
+
+        valid_idx = np.array([i for i in range(n) if i not in errors], dtype=int)
+        if len(valid_idx) == 0:
+            return np.empty((0, len(self.feature_names))), valid_idx, errors, ([], [], [])
+
+        open_v = open_dt.iloc[valid_idx]
+        due_v = due_dt.iloc[valid_idx]
+        # Selisih dihitung dalam UTC agar sama dengan aritmetika datetime aware
+        delta = (due_v - due_offset.iloc[valid_idx]) - (open_v - open_offset.iloc[valid_idx])
+        days_to_due = delta.dt.days.to_numpy()
+        open_hour = open_v.dt.hour.to_numpy()
+        business_hours = business_hours_between(
+            open_v.to_numpy(dtype='datetime64[ns]'), due_v.to_numpy(dtype='datetime64[ns]')
+        )
+
+        # 3. Hitung Fitur Turunan (fitur lain tetap 0 seperti di preprocess_input)
+        processed_df = pd.DataFrame(0.0, index=range(len(valid_idx)), columns=self.feature_names)
+        features = {
+            'Days to Due': days_to_due,
+            'Open Month': open_v.dt.month.to_numpy(),
+            'Application Creation Hour': open_hour,
+            'Is Open Date Off': self._is_off_vectorized(open_v),
+        }
+        for notebook_col, values in encoded.items():
+            features[notebook_col] = values[valid_idx]
+        for col, values in features.items():
+            if col in processed_df.columns:
+                processed_df[col] = values.astype(float)
+
+        # 4. Scaling
+        if self.scaled_feature_names is not None and len(self.scaled_feature_names):
+            cols_to_scale = [col for col in self.scaled_feature_names if col in processed_df.columns]
+            if cols_to_scale:
+                processed_df[cols_to_scale] = self.scaler.transform(processed_df[cols_to_scale])
+
+        X = processed_df[self.feature_names].to_numpy(dtype=float)
+        return X, valid_idx, errors, (days_to_due.tolist(), open_hour.tolist(), business_hours.tolist())
+
+    @staticmethod
+    def _parse_dates(series, n):
+        """
+        Parse kolom tanggal ISO 8601 secara vektor. Mengembalikan
+        (wall, offset, aware): waktu lokal tanpa timezone, offset UTC-nya
+        (0 untuk nilai tanpa timezone) dan apakah nilai punya timezone;
+        nilai gagal -> NaT. Bentuk umum (ISO_DATETIME_PATTERN) di-parse
+        pandas sekaligus; bentuk lain yang diterima datetime.fromisoformat
+        (mis. '20250106', '+0700') di-parse per nilai dengan parser yang
+        sama seperti preprocess_input.
+        """
+        values = pd.Series(
+            series.to_numpy(dtype=object) if series is not None else [None] * n, index=range(n), dtype=object
+        )
+        parts = values.where(values.map(lambda v: isinstance(v, str))).str.extract(ISO_DATETIME_PATTERN)
+        wall = pd.to_datetime(parts[0] + parts[1].fillna(''), format='ISO8601', errors='coerce')
+        tz = parts[2]
+        sign = np.where(tz.str[0] == '-', -1.0, 1.0)
+        hours = pd.to_numeric(tz.str[1:3], errors='coerce')
+        minutes = pd.to_numeric(tz.str[4:6], errors='coerce')
+        seconds = (hours * 3600 + minutes * 60).fillna(0.0).to_numpy() * sign
+        offset = pd.Series(np.where(tz == 'Z', 0.0, seconds), index=range(n))
+        aware = tz.notna()
+
+        for i in np.flatnonzero((values.notna() & parts[0].isna()).to_numpy()):
+            try:
+                dt = datetime.fromisoformat(values.iat[i])
+            except (TypeError, ValueError):
+                continue
+            wall.iat[i] = dt.replace(tzinfo=None)
+            utc_offset = dt.utcoffset()
+            offset.iat[i] = utc_offset.total_seconds() if utc_offset is not None else 0.0
+            aware.iat[i] = utc_offset is not None
+        return wall, pd.to_timedelta(offset, unit='s'), aware
+
+    def _is_off_vectorized(self, dates):
+        """ Versi vektor dari _is_off untuk pandas Series datetime (waktu lokal naive) """
+        return is_off(dates.to_numpy(dtype='datetime64[ns]'))
 
-            print(f"Prediksi Final (setelah hardcode): {final_prediction}")
-            print("=== PREDICT SELESAI ===")
+    def encode_column(self, notebook_col, values):
+        """
+        Encode satu kolom kategorikal (pandas Series / array NumPy / list)
+        sekaligus lewat lookup table, dengan aturan fallback yang sama seperti
+        preprocess_input. Mengembalikan array int.
+        """
+        table, fallback = self.encoder_tables[notebook_col]
+        if not isinstance(values, pd.Series):
+            values = pd.Series(np.asarray(values, dtype=object))
+        return values.map(table).fillna(fallback).to_numpy(dtype=np.int64)
 
-            # --- START PERBAIKAN UNTUK FRONTEND REACT ---
-            # Frontend React mengharapkan key/data yang berbeda.
+    def decisions(self, probas, priorities):
+        """ Versi vektor keputusan final _build_result: threshold model + aturan bisnis '1 - critical' """
+        critical = np.array([str(p).strip().lower() == '1 - critical' for p in priorities], dtype=bool)
+        return critical | (np.asarray(probas) >= self.threshold)
 
-            # A. Ambil/Hitung ulang data untuk UI (Days to Due & Open Hour)
+    def _build_result(self, input_data, pred_proba, days_to_due=None, open_hour=None, business_hours=None):
+        """
+        Menerapkan threshold + aturan bisnis pada probabilitas kelas '1'
+        dan menyusun response yang diharapkan frontend React.
+        days_to_due/open_hour/business_hours yang sudah dihitung (predict_batch)
+        dipakai langsung; None -> dihitung ulang dari input_data.
+        """
+        model_prediction = 1 if pred_proba >= self.threshold else 0
+        model_confidence = pred_proba * 100
+
+        # 5. Logika hardcode '1 - critical'
+        input_priority_raw = input_data.get('priority', '').strip().lower()
+        if input_priority_raw == '1 - critical':
+            final_prediction = 1
+            final_confidence = 100.0
+            final_text = 'Ya (Aturan Bisnis)'
+        else:
+            final_prediction = model_prediction
+            final_confidence = model_confidence
+            final_text = 'Ya' if final_prediction else 'Tidak'
+
+        # --- START PERBAIKAN UNTUK FRONTEND REACT ---
+        # Frontend React mengharapkan key/data yang berbeda.
+
+        # A. Ambil/Hitung ulang data untuk UI (Days to Due & Open Hour)
+        if days_to_due is not None and open_hour is not None:
+            ui_days_to_due, ui_open_hour = int(days_to_due), int(open_hour)
+        else:
             try:
                 open_dt = datetime.fromisoformat(input_data['open_date'])
                 due_dt = datetime.fromisoformat(input_data['due_date'])
                 ui_days_to_due = (due_dt - open_dt).days
                 ui_open_hour = open_dt.hour
+                # Jam kerja dihitung dari jam dinding yang tertulis (seperti Is Open Date Off)
+                business_hours = business_hours_between(
+                    [open_dt.replace(tzinfo=None)], [due_dt.replace(tzinfo=None)]
+                )[0]
             except Exception:
                 ui_days_to_due = -1
                 ui_open_hour = -1
+        ui_business_hours = round(float(business_hours), 2) if business_hours is not None else None
 
-            # B. Siapkan risk factors & recommendations
-            ui_risk_factors = []
-            ui_recommendations = ""
-
-            if final_prediction == 1:
-                # Jika diprediksi Melanggar
-                ui_risk_factors.append(f"Probabilitas pelanggaran: {final_confidence:.2f}%")
-                if ui_days_to_due <= 3:
-                    ui_risk_factors.append("Waktu pengerjaan (Days to Due) singkat")
-                if input_priority_raw == '1 - critical':
-                    ui_risk_factors.append("Aturan Bisnis: Tiket Critical")
-                ui_recommendations = (
-                    "Rekomendasikan eskalasi ke tim terkait atau pantau tiket ini secara proaktif."
-                )
-            else:
-                # Jika diprediksi Aman
-                ui_risk_factors.append(f"Risiko pelanggaran rendah ({final_confidence:.2f}%)")
-                if ui_days_to_due > 10:
-                    ui_risk_factors.append("Waktu pengerjaan (Days to Due) panjang")
-                ui_recommendations = "Tiket dapat diproses sesuai alur kerja standar."
-
-            # C. Buat dictionary return yang sesuai dengan kebutuhan React
-            return {
-                'status': 'sukses',
-                'sla_violated': bool(final_prediction),
-                'confidence': final_confidence,
-                'violation_text': final_text,              # Ganti 'text_result' -> 'violation_text'
-                'days_to_due': ui_days_to_due,
-                'open_hour': ui_open_hour,
-                'risk_factors': ui_risk_factors,
-                'recommended_actions': ui_recommendations
-            }
-            # --- AKHIR PERBAIKAN ---
+        # B. Siapkan risk factors & recommendations
+        ui_risk_factors = []
+        ui_recommendations = ""
+
+        if final_prediction == 1:
+            # Jika diprediksi Melanggar
+            ui_risk_factors.append(f"Probabilitas pelanggaran: {final_confidence:.2f}%")
+            if ui_days_to_due <= 3:
+                ui_risk_factors.append("Waktu pengerjaan (Days to Due) singkat")
+            if input_priority_raw == '1 - critical':
+                ui_risk_factors.append("Aturan Bisnis: Tiket Critical")
+            ui_recommendations = (
+                "Rekomendasikan eskalasi ke tim terkait atau pantau tiket ini secara proaktif."
+            )
+        else:
+            # Jika diprediksi Aman
+            ui_risk_factors.append(f"Risiko pelanggaran rendah ({final_confidence:.2f}%)")
+            if ui_days_to_due > 10:
+                ui_risk_factors.append("Waktu pengerjaan (Days to Due) panjang")
+            ui_recommendations = "Tiket dapat diproses sesuai alur kerja standar."
+
+        # C. Buat dictionary return yang sesuai dengan kebutuhan React
+        return {
+            'status': 'sukses',
+            'sla_violated': bool(final_prediction),
+            'confidence': final_confidence,
+            'violation_text': final_text,              # Ganti 'text_result' -> 'violation_text'
+            'days_to_due': ui_days_to_due,
+            'open_hour': ui_open_hour,
+            'business_hours_to_due': ui_business_hours,  # Jam kerja (hari kerja, SLA_BUSINESS_HOURS) sampai due date
+            'risk_factors': ui_risk_factors,
+            'recommended_actions': ui_recommendations
+        }
+
+    def predict(self, input_data):
+        timer = stage_timer(logger)
+        try:
+            # 1. Preprocessing input
+            with timer.stage('preprocess'):
+                X = self.preprocess_input(input_data)
+
+            # 2. Dapatkan probabilitas dari model (atau cache prediksi), ambil kelas '1' (Melanggar)
+            with timer.stage('predict_proba'):
+                probas, cache_hits = self.violation_probas(X)
+                pred_proba = probas[0]
+
+            # 3. Threshold + aturan bisnis
+            with timer.stage('build_result'):
+                result = self._build_result(input_data, pred_proba)
+
+            # 4. Kontribusi fitur terhadap probabilitas
+            with timer.stage('explain'):
+                result['feature_contributions'] = self.explain(X)[0]
+            logger.debug("predict", extra=timer.fields(
+                rows=1, proba=float(pred_proba), threshold=float(self.threshold),
+                sla_violated=result['sla_violated'], cache_hits=cache_hits,
+            ))
+            return result
 
         except Exception as e:
-            print(f"!!! ERROR SAAT PREDIKSI: {e}")
+            logger.warning("Prediksi gagal: %s", e, extra={'error_type': type(e).__name__})
             return {'status': 'error', 'message': str(e)}
 
-    
+    def predict_batch(self, records):
+        """
+        Prediksi banyak tiket dengan satu kali preprocessing vektor dan satu
+        panggilan predict_proba. Hasil berurutan sesuai input; baris yang gagal
+        diproses mendapat {'status': 'error', 'message': ...} tanpa
+        menggagalkan baris lainnya.
+        """
+        timer = stage_timer(logger)
+        results = [None] * len(records)
+        try:
+            with timer.stage('preprocess'):
+                X, valid_idx, errors, (days_to_due, open_hours, business_hours) = self._featurize_batch(records)
+        except Exception as e:
+            logger.warning("Preprocessing batch gagal: %s", e, extra={'rows': len(records)})
+            return [{'status': 'error', 'message': str(e)} for _ in records]
+
+        for i, message in errors.items():
+            results[i] = {'status': 'error', 'message': message}
 
-        
+        if len(valid_idx):
+            with timer.stage('predict_proba'):
+                # Tanpa cache prediksi: batch besar (mis. upload CSV) akan mengusir
+                # entry milik /predict/ dan jarang berulang persis
+                probas, _ = self.violation_probas(X, use_cache=False)
+            with timer.stage('explain'):
+                explanations = self.explain(X)
+            with timer.stage('build_result'):
+                rows = zip(valid_idx, probas, explanations, days_to_due, open_hours, business_hours)
+                for i, pred_proba, explanation, days, hour, hours in rows:
+                    try:
+                        results[i] = self._build_result(records[i], pred_proba, days, hour, hours)
+                        results[i]['feature_contributions'] = explanation
+                    except Exception as e:
+                        results[i] = {'status': 'error', 'message': str(e)}
+        logger.debug("predict_batch", extra=timer.fields(rows=len(records), error_count=len(errors)))
+        return results
+
+    def violation_probas(self, X, use_cache=True):
+        """
+        Probabilitas kelas '1' (Melanggar) per baris X (hasil preprocess_input /
+        preprocess_batch), tanpa threshold maupun aturan bisnis. Baris yang fiturnya
+        sudah pernah diprediksi dengan versi model yang sama diambil dari
+        cache prediksi; predict_proba hanya dipanggil untuk sisanya.
+        use_cache=False untuk scoring massal (predict_batch, rescore_tickets)
+        agar cache /predict/ tidak terisi ulang. Mengembalikan (probas, jumlah cache hit).
+        """
+        violated_idx = np.where(self.model.classes_ == 1)[0][0]
+        cache = get_prediction_cache() if use_cache else None
+        if cache is None:
+            return self.engine.predict_proba(X)[:, violated_idx], 0
+
+        keys = [cache.make_key(row, self.model_version) for row in X]
+        probas = np.empty(len(keys))
+        missing = []
+        for i, key in enumerate(keys):
+            value = cache.get(key, self.model_version)
+            if value is None:
+                missing.append(i)
+            else:
+                probas[i] = value
+        if missing:
+            computed = self.engine.predict_proba(X[missing])[:, violated_idx]
+            probas[missing] = computed
+            for i, value in zip(missing, computed):
+                cache.set(keys[i], value, self.model_version)
+        return probas, len(keys) - len(missing)
+
+
+def compile_encoder_tables(encoders):
+    """
+    Ubah dict LabelEncoder menjadi {kolom: (dict nilai -> kode, kode fallback)}.
+    Kode sama dengan LabelEncoder.transform (indeks di classes_); nilai tak
+    dikenal -> kode 'unknown' jika ada, selain itu -1.
+    """
+    tables = {}
+    for col, le in encoders.items():
+        table = {value: code for code, value in enumerate(le.classes_.tolist())}
+        tables[col] = (table, table.get('unknown', -1))
+    return tables
+
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+
+def _model_files_changed(predictor, settings, throttle=True):
+    """
+    Bandingkan signature file model (os.stat). Dengan throttle, stat dilakukan
+    paling sering sekali per SLA_MODEL_RELOAD_CHECK_INTERVAL detik per process,
+    bukan di setiap request.
+    """
+    if not getattr(settings, 'SLA_MODEL_AUTO_RELOAD', True):
+        return False
+    if throttle:
+        now = time.monotonic()
+        if now - predictor.files_checked_at < getattr(settings, 'SLA_MODEL_RELOAD_CHECK_INTERVAL', 5.0):
+            return False
+        predictor.files_checked_at = now
+    return model_files_signature(predictor.model_dir) != predictor.signature
+
+
+def get_predictor():
+    """
+    SLAPredictor bersama untuk process ini, dimuat saat pertama kali dipakai
+    (bukan saat import views), sehingga migrate/import_tickets dll tidak ikut
+    memuat model. Thread-safe (double-checked locking).
+    Jika mtime/size file model berubah (SLA_MODEL_AUTO_RELOAD, dicek paling
+    sering tiap SLA_MODEL_RELOAD_CHECK_INTERVAL detik), model dimuat ulang;
+    versi model baru otomatis membuang isi cache prediksi.
+    """
+    from django.conf import settings
+
+    global _predictor
+    predictor = _predictor
+    if predictor is not None and not _model_files_changed(predictor, settings):
+        return predictor
+    with _predictor_lock:
+        if _predictor is None:
+            _predictor = SLAPredictor(
+                model_dir=getattr(settings, 'SLA_MODEL_DIR', None),
+                mmap_mode=getattr(settings, 'SLA_MODEL_MMAP_MODE', None),
+            )
+        elif _model_files_changed(_predictor, settings, throttle=False):
+            try:
+                reloaded = SLAPredictor(model_dir=_predictor.model_dir, mmap_mode=getattr(settings, 'SLA_MODEL_MMAP_MODE', None))
+            except Exception as e:
+                # Mis. file sedang disalin: model lama tetap dipakai, dicoba lagi di request berikutnya
+                logger.warning("Reload model gagal, model lama tetap dipakai: %s", e)
+            else:
+                logger.info("File model berubah, SLAPredictor dimuat ulang", extra={
+                    'old_version': _predictor.model_version, 'model_version': reloaded.model_version,
+                })
+                _predictor = reloaded
+        return _predictor
+
+
+def warm_up_predictor():
+    """
+    Muat model dan jalankan satu prediksi contoh. Dipanggil dari hook gunicorn
+    (master saat preload_app, atau post_fork per worker) agar request pertama
+    tidak menanggung biaya load.
+    """
+    predictor = get_predictor()
+    predictor.predict_batch([WARMUP_RECORD])
+    return predictor
 
 
-    
\ No newline at end of file
+def reset_predictor():
+    """ Buang predictor yang sudah dimuat (mis. setelah file model diganti) """
+    global _predictor
+    with _predictor_lock:
+        _predictor = None
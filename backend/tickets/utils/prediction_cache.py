@@ -0,0 +1,134 @@
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Perkiraan memori satu entry: key digest (bytes), value (float, expiry) dan node OrderedDict
+_DIGEST_SIZE = 16
+ENTRY_BYTES = (
+    sys.getsizeof(b'\0' * _DIGEST_SIZE) + sys.getsizeof((0.0, 0.0)) + 2 * sys.getsizeof(0.0) + 104
+)
+
+
+class PredictionCache:
+    """
+    Cache LRU + TTL untuk probabilitas pelanggaran per baris fitur final
+    (setelah encoding & scaling). Key = hash baris fitur + versi model, jadi
+    input berbeda yang menghasilkan fitur sama (mis. item tak dikenal yang
+    sama-sama dikodekan 'unknown', atau open_date yang hanya berbeda menit
+    sehingga jam dan Days to Due-nya sama) memakai hasil yang sama dan predict_proba dilewati.
+    Dipakai oleh predict() (/predict/); predict_batch tidak memakai cache ini.
+    Dibatasi jumlah entry dan perkiraan memori; versi model berubah ->
+    seluruh isi dibuang. Counter berlaku per worker process.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=8 * 1024 * 1024, ttl=600.0):
+        self.max_entries = max(1, min(max_entries, max_bytes // ENTRY_BYTES))
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.model_version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    @staticmethod
+    def make_key(row, model_version):
+        digest = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+        digest.update(model_version.encode('utf-8'))
+        digest.update(np.ascontiguousarray(row, dtype=np.float64).tobytes())
+        return digest.digest()
+
+    def _check_version(self, model_version):
+        """ Dipanggil dengan lock: model baru -> entry lama tidak berlaku lagi """
+        if model_version != self.model_version:
+            if self._entries:
+                self._counters['invalidations'] += 1
+                self._entries.clear()
+            self.model_version = model_version
+
+    def get(self, key, model_version):
+        """ Probabilitas yang di-cache, atau None (miss / kedaluwarsa) """
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(model_version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return value
+
+    def set(self, key, value, model_version):
+        with self._lock:
+            self._check_version(model_version)
+            self._entries[key] = (float(value), time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            entries = len(self._entries)
+        total = counters['hits'] + counters['misses']
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'approx_bytes': entries * ENTRY_BYTES,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'model_version': self.model_version,
+            **counters,
+            'hit_rate': round(counters['hits'] / total, 4) if total else 0.0,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            for name in self._counters:
+                self._counters[name] = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache():
+    """ PredictionCache bersama untuk process ini, atau None jika SLA_PREDICTION_CACHE_ENABLED=False """
+    from django.conf import settings
+
+    global _cache
+    if not getattr(settings, 'SLA_PREDICTION_CACHE_ENABLED', True):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PredictionCache(
+                    max_entries=getattr(settings, 'SLA_PREDICTION_CACHE_MAX_ENTRIES', 10000),
+                    max_bytes=getattr(settings, 'SLA_PREDICTION_CACHE_MAX_BYTES', 8 * 1024 * 1024),
+                    ttl=getattr(settings, 'SLA_PREDICTION_CACHE_TTL', 600),
+                )
+    return _cache
+
+
+def prediction_cache_stats():
+    from django.conf import settings
+
+    enabled = getattr(settings, 'SLA_PREDICTION_CACHE_ENABLED', True)
+    if _cache is None:
+        return {'enabled': enabled, 'entries': 0, 'hits': 0, 'misses': 0, 'hit_rate': 0.0}
+    return {'enabled': enabled, **_cache.stats()}
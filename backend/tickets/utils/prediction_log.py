@@ -0,0 +1,282 @@
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, connection
+
+from ..models import PredictionLog
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('drop', 'block', 'sample')
+
+# Penanda berhenti untuk thread flusher
+_STOP = object()
+
+# Semua buffer di process ini, untuk di-reset oleh hook fork (_after_fork_in_child)
+_instances = weakref.WeakSet()
+
+
+class PredictionLogBuffer:
+    """
+    Write-behind untuk PredictionLog: request hanya memasukkan entry ke queue
+    in-process (bounded), thread flusher menulis dengan bulk_create setiap
+    `batch_size` entry atau setiap `flush_interval` detik.
+
+    Saat queue penuh, `overflow` menentukan perilakunya:
+    - drop:   entry baru dibuang;
+    - block:  tunggu slot kosong maksimal `block_timeout` detik, lalu dibuang;
+    - sample: begitu queue terisi >= `sample_threshold`, hanya sebagian
+              (`sample_rate`) entry yang disimpan; tetap dibuang jika penuh.
+
+    created_at diisi saat flush (auto_now_add), jadi bisa mundur hingga
+    `flush_interval` dari waktu request. Counter berlaku per worker process:
+    di process hasil fork lock, queue, thread dan counter dibuat ulang
+    (hook os.register_at_fork, cadangan: cek pid sebelum mengambil lock).
+    """
+
+    def __init__(self, max_size=10000, batch_size=200, flush_interval=2.0,
+                 overflow='drop', block_timeout=0.05, sample_rate=0.1, sample_threshold=0.8):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow harus salah satu dari: {', '.join(OVERFLOW_POLICIES)}")
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.sample_rate = sample_rate
+        self.sample_threshold = sample_threshold
+        self._reset()
+        _instances.add(self)
+
+    def _reset(self):
+        """
+        State per process: lock, queue, thread & counter tidak ikut terbawa dengan
+        benar saat fork (lock bisa tersalin dalam keadaan dipegang thread yang tidak
+        ada di process anak, sehingga harus dibuat baru, bukan dipakai).
+        """
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._counters = {
+            'queued': 0, 'flushed': 0, 'dropped': 0, 'sampled_out': 0, 'failed': 0, 'retried': 0, 'flushes': 0,
+        }
+        self._queue = queue.Queue(maxsize=self.max_size)
+        self._thread = None
+        self._stopping = False
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _ensure_started(self):
+        if self._pid != os.getpid():
+            # Tanpa mengambil self._lock: lock warisan process induk mungkin terkunci
+            self._reset()
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='prediction-log-flusher', daemon=True)
+                    self._thread.start()
+
+    def add(self, entry):
+        """ Masukkan satu PredictionLog (belum disimpan). True jika masuk queue """
+        if self._stopping and self._pid == os.getpid():
+            # Sudah/sedang shutdown: tulis langsung agar tidak hilang
+            self._write([entry])
+            return True
+        self._ensure_started()
+
+        if self.overflow == 'sample' and self._queue.qsize() >= self.max_size * self.sample_threshold:
+            if random.random() >= self.sample_rate:
+                self._count('sampled_out')
+                return False
+        try:
+            if self.overflow == 'block':
+                self._queue.put(entry, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(entry)
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('queued')
+        return True
+
+    def add_many(self, entries):
+        return sum(1 for entry in entries if self.add(entry))
+
+    def _run(self):
+        try:
+            while True:
+                batch, stop = self._collect()
+                if stop:
+                    batch += self._drain()
+                if batch:
+                    # Thread ini hidup lama tanpa siklus request: buang koneksi yang
+                    # sudah melewati CONN_MAX_AGE atau rusak (mis. diputus server)
+                    close_old_connections()
+                    self._write(batch)
+                if stop:
+                    return
+        finally:
+            # Koneksi database milik thread ini
+            connection.close()
+
+    def _collect(self):
+        """ Ambil entry sampai batch_size atau flush_interval habis (mana yang lebih dulu) """
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _drain(self):
+        entries = []
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                return entries
+            if entry is not _STOP:
+                entries.append(entry)
+
+    def _write(self, entries):
+        if not entries:
+            return
+        try:
+            try:
+                PredictionLog.objects.bulk_create(entries, batch_size=self.batch_size)
+            except OperationalError as e:
+                # Koneksi putus di tengah jalan: sekali lagi dengan koneksi baru
+                # (di dalam transaksi pemanggil koneksi tidak boleh ditutup)
+                if connection.in_atomic_block:
+                    raise
+                logger.info("Flush PredictionLog diulang dengan koneksi baru: %s", e)
+                self._count('retried')
+                connection.close()
+                PredictionLog.objects.bulk_create(entries, batch_size=self.batch_size)
+        except Exception as e:
+            self._count('failed', len(entries))
+            logger.warning("Flush PredictionLog gagal: %s", e, extra={'rows': len(entries)})
+        else:
+            self._count('flushed', len(entries))
+        self._count('flushes')
+
+    def shutdown(self, timeout=10.0):
+        """
+        Flush semua entry yang tersisa lalu hentikan thread (dipanggil saat
+        worker berhenti). Entry yang masih tertinggal ditulis dari thread pemanggil.
+        """
+        if self._pid != os.getpid():
+            return
+        self._stopping = True
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            thread.join(timeout)
+        if thread is None or not thread.is_alive():
+            self._write(self._drain())
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            'pid': os.getpid(),
+            'overflow': self.overflow,
+            'max_size': self.max_size,
+            'batch_size': self.batch_size,
+            'flush_interval': self.flush_interval,
+            'queue_size': self._queue.qsize() if self._pid == os.getpid() else 0,
+            'running': bool(self._thread and self._thread.is_alive()),
+            **counters,
+        }
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def _after_fork_in_child():
+    """ Hook fork: process anak hanya punya satu thread, lock lama dibuang sebelum ada yang menunggunya """
+    global _buffer_lock
+    _buffer_lock = threading.Lock()
+    for buffer in list(_instances):
+        buffer._reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def buffered_enabled():
+    return getattr(settings, 'SLA_PREDICTION_LOG_BUFFERED', True)
+
+
+def get_prediction_log_buffer():
+    """ PredictionLogBuffer bersama untuk process ini (konfigurasi dari settings) """
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = PredictionLogBuffer(
+                    max_size=getattr(settings, 'SLA_PREDICTION_LOG_QUEUE_SIZE', 10000),
+                    batch_size=getattr(settings, 'SLA_PREDICTION_LOG_BATCH_SIZE', 200),
+                    flush_interval=getattr(settings, 'SLA_PREDICTION_LOG_FLUSH_INTERVAL', 2.0),
+                    overflow=getattr(settings, 'SLA_PREDICTION_LOG_OVERFLOW', 'drop'),
+                    block_timeout=getattr(settings, 'SLA_PREDICTION_LOG_BLOCK_TIMEOUT', 0.05),
+                    sample_rate=getattr(settings, 'SLA_PREDICTION_LOG_SAMPLE_RATE', 0.1),
+                )
+                atexit.register(shutdown_prediction_log)
+    return _buffer
+
+
+def log_predictions(entries):
+    """
+    Simpan PredictionLog: lewat buffer write-behind, atau langsung
+    bulk_create jika SLA_PREDICTION_LOG_BUFFERED=False.
+    """
+    entries = list(entries)
+    if not entries:
+        return 0
+    if not buffered_enabled():
+        PredictionLog.objects.bulk_create(entries, batch_size=500)
+        return len(entries)
+    return get_prediction_log_buffer().add_many(entries)
+
+
+def shutdown_prediction_log(timeout=10.0):
+    """ Flush buffer yang ada (atexit / hook worker_exit gunicorn) """
+    if _buffer is not None:
+        _buffer.shutdown(timeout)
+
+
+def reset_prediction_log(timeout=10.0):
+    """ Flush dan buang buffer; pemakaian berikutnya membuat buffer (dan thread) baru """
+    global _buffer
+    with _buffer_lock:
+        if _buffer is not None:
+            _buffer.shutdown(timeout)
+        _buffer = None
+
+
+def prediction_log_stats():
+    if _buffer is None:
+        return {'buffered': buffered_enabled(), 'pid': os.getpid(), 'running': False}
+    return {'buffered': buffered_enabled(), **_buffer.stats()}
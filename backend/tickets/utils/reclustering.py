@@ -0,0 +1,413 @@
+import json
+import logging
+import os
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from sklearn.decomposition import PCA
+from sklearn.preprocessing import RobustScaler, StandardScaler
+
+from ..models import ClusterSummary, Ticket
+from .cluster_artifacts import (CLUSTER_RESULTS_PATH, MAX_SCATTER_LIMIT, _stratified_indices,
+                                cluster_artifact_loader, sidecar_path)
+from .cluster_assign import CLUSTER_TICKET_FIELDS, CYCLICAL_PERIODS, ClusterAssigner, numeric_column
+from .structured_logging import StageTimer
+
+# kmodes wajib untuk re-clustering; prince (MCA) dan umap-learn (koordinat 2D) opsional
+try:
+    from kmodes.kprototypes import KPrototypes
+except ImportError:
+    KPrototypes = None
+
+try:
+    import prince
+except ImportError:
+    prince = None
+
+try:
+    import umap
+except ImportError:
+    umap = None
+
+logger = logging.getLogger('tickets.clustering')
+
+# Fitur model K-Prototypes, sama dengan notebook shil_tertinggi_k_proto.ipynb
+MODEL_CATEGORICAL_COLUMNS = ['Item', 'Priority', 'Is Open Date Off', 'Is Due Date Off', 'Category']
+MODEL_NUMERICAL_COLUMNS = [
+    'Days to Due', 'Average Resolution Time (Ac)', 'Application SLA Compliance Rate',
+] + [f'{col}{suffix}' for col in CYCLICAL_PERIODS for suffix in ('_sin', '_cos')]
+
+# Kolom ringkasan per cluster (data asli, untuk dashboard)
+SUMMARY_NUMERICAL_COLUMNS = [
+    'Days to Due', 'Average Resolution Time (Ac)', 'Application SLA Compliance Rate',
+    'Resolution Duration', 'SLA Threshold', 'Is SLA Violated',
+]
+SUMMARY_CATEGORICAL_COLUMNS = [
+    'Priority', 'Item', 'Application Creation Day of Week', 'Application Creation Hour',
+    'Is Open Date Off', 'Is Due Date Off', 'Open Month', 'Application SLA Deadline Hour',
+    'Application SLA Deadline Day of Week',
+]
+
+# Jumlah tiket per statement UPDATE cluster_id (di bawah batas 999 parameter SQLite lama)
+UPDATE_BATCH_SIZE = 500
+
+
+def load_ticket_columns(batch_size=5000):
+    """
+    Baca kolom yang dibutuhkan dari tabel Ticket per chunk (iterator
+    server-side, tanpa instance model). Mengembalikan (numbers, {kolom notebook: list nilai}).
+    """
+    columns = list(dict.fromkeys(
+        [col.rsplit('_', 1)[0] if col.endswith(('_sin', '_cos')) else col for col in MODEL_NUMERICAL_COLUMNS]
+        + MODEL_CATEGORICAL_COLUMNS + SUMMARY_NUMERICAL_COLUMNS + SUMMARY_CATEGORICAL_COLUMNS
+    ))
+    fields = [CLUSTER_TICKET_FIELDS[col] for col in columns]
+    numbers = []
+    values = {col: [] for col in columns}
+    rows = Ticket.objects.order_by('number').values_list('number', *fields).iterator(chunk_size=batch_size)
+    for row in rows:
+        numbers.append(row[0])
+        for col, value in zip(columns, row[1:]):
+            values[col].append(value)
+    return np.asarray(numbers, dtype=object), values
+
+
+def encode_categories(columns, names):
+    """ Kode int per kolom kategorikal (nilai dinormalisasi seperti ClusterAssigner) + daftar nilainya """
+    codes = np.empty((len(columns[names[0]]) if names else 0, len(names)), dtype=np.int64)
+    categories = []
+    for col_index, col in enumerate(names):
+        normalized = np.asarray([str(v).strip().lower() for v in columns[col]], dtype=object)
+        uniques, codes[:, col_index] = np.unique(normalized, return_inverse=True)
+        categories.append(uniques)
+    return codes, categories
+
+
+def mixed_silhouette(numeric, codes, labels, gamma, block_size=1024):
+    """
+    Silhouette dengan jarak K-Prototypes (kuadrat Euclidean + gamma * mismatch),
+    sama dengan silhouette_score(metric='precomputed') di notebook, tetapi
+    dihitung per blok baris: memori O(block_size * n), bukan matriks n x n.
+    Nilai numerik NaN dilewati per pasangan (seperti ClusterAssigner.distances).
+    """
+    n = len(labels)
+    cluster_ids, inverse = np.unique(labels, return_inverse=True)
+    if len(cluster_ids) < 2 or n < 3:
+        return None
+    membership = np.zeros((n, len(cluster_ids)))
+    membership[np.arange(n), inverse] = 1.0
+    sizes = membership.sum(axis=0)
+    # sum_c m_ic * m_jc * (x_ic - x_jc)^2 dengan m = bukan NaN, sebagai tiga perkalian matriks
+    present = (~np.isnan(numeric)).astype(np.float64)
+    values = np.nan_to_num(numeric)
+    squares = values * values
+
+    scores = np.empty(n)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        distances = squares[start:stop] @ present.T + present[start:stop] @ squares.T \
+            - 2 * values[start:stop] @ values.T
+        np.maximum(distances, 0, out=distances)
+        for col_index in range(codes.shape[1]):
+            distances += gamma * (codes[start:stop, col_index, None] != codes[None, :, col_index])
+        distances[np.arange(stop - start), np.arange(start, stop)] = 0.0
+
+        sums = distances @ membership
+        own = inverse[start:stop]
+        own_size = sizes[own] - 1
+        a = np.divide(sums[np.arange(stop - start), own], own_size, out=np.zeros(stop - start), where=own_size > 0)
+        means = sums / sizes
+        means[np.arange(stop - start), own] = np.inf
+        b = means.min(axis=1)
+        # Seperti sklearn: silhouette titik di cluster berukuran 1 = 0
+        scores[start:stop] = np.where(own_size > 0, (b - a) / np.maximum(a, b), 0.0)
+    return float(np.nan_to_num(scores).mean())
+
+
+def _json_value(value):
+    """ Nilai NumPy -> tipe JSON; NaN ditulis 'NaN' seperti numpy_encoder notebook """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return 'NaN'
+    return value
+
+
+class ReclusterPipeline:
+    """
+    Re-clustering K-Prototypes dari tabel Ticket, tahap demi tahap seperti
+    notebook (cyclical encoding + RobustScaler, K-Prototypes init Cao), tetapi
+    dapat diskalakan:
+    - n_init dijalankan paralel oleh kmodes (n_jobs=workers);
+    - tuning k/gamma dan model final boleh dilatih pada sampel, lalu semua
+      tiket di-assign vektor ke prototype terdekat (ClusterAssigner);
+    - silhouette dihitung pada sampel stratified per cluster, per blok;
+    - PCA/MCA/UMAP hanya untuk sampel koordinat yang ditampilkan di chart.
+    Durasi per tahap dicatat di `timer`.
+    """
+
+    def __init__(self, k_values=(3,), gammas=(None,), n_init=10, workers=1, fit_sample=None,
+                 tuning_sample=20000, silhouette_sample=5000, coords_sample=MAX_SCATTER_LIMIT,
+                 batch_size=5000, random_state=42, log=None):
+        if KPrototypes is None:
+            raise ImportError("Re-clustering membutuhkan package 'kmodes' (pip install kmodes)")
+        self.k_values = list(k_values)
+        self.gammas = list(gammas)
+        self.n_init = n_init
+        self.workers = workers
+        self.fit_sample = fit_sample
+        self.tuning_sample = tuning_sample
+        self.silhouette_sample = silhouette_sample
+        self.coords_sample = coords_sample
+        self.batch_size = batch_size
+        self.random_state = random_state
+        self.log = log or (lambda message: logger.info(message))
+        self.timer = StageTimer()
+
+    def run(self):
+        with self.timer.stage('load'):
+            self.numbers, self.columns = load_ticket_columns(self.batch_size)
+        n = len(self.numbers)
+        if n == 0:
+            raise ValueError("Tabel Ticket kosong, tidak ada yang bisa di-cluster.")
+        self.log(f"{n} tiket dimuat.")
+        rng = np.random.RandomState(self.random_state)
+
+        with self.timer.stage('preprocess'):
+            raw_numeric = np.column_stack([numeric_column(self.columns, col, n) for col in MODEL_NUMERICAL_COLUMNS])
+            # NaN dibiarkan: RobustScaler mengabaikannya saat fit, dan jarak (assign, silhouette)
+            # melewati nilai kosong persis seperti ClusterAssigner saat serving
+            self.scaler = RobustScaler().fit(raw_numeric)
+            self.numeric = self.scaler.transform(raw_numeric)
+            self.codes, self.categories = encode_categories(self.columns, MODEL_CATEGORICAL_COLUMNS)
+
+        k, gamma = self.k_values[0], self.gammas[0]
+        if len(self.k_values) > 1 or len(self.gammas) > 1:
+            with self.timer.stage('tuning'):
+                k, gamma = self.tune(rng)
+
+        with self.timer.stage('kprototypes'):
+            fit_idx = self._sample(rng, n, self.fit_sample)
+            model = self._fit(k, gamma, fit_idx, self.n_init)
+            self.assigner = self._assigner(model)
+            self.log(f"K-Prototypes k={k}: gamma {self.assigner.gamma:.4f}, cost {model.cost_:.2f}, "
+                     f"{model.n_iter_} iterasi, dilatih pada {len(fit_idx)} tiket.")
+
+        with self.timer.stage('assign'):
+            self.labels = np.empty(n, dtype=np.int64)
+            for start in range(0, n, 100000):
+                stop = min(start + 100000, n)
+                distances = self.assigner.distances(self.numeric[start:stop], self._assigner_codes(start, stop))
+                self.labels[start:stop] = self.assigner.cluster_ids[distances.argmin(axis=1)]
+
+        with self.timer.stage('silhouette'):
+            sample = _stratified_indices(self.labels, None, min(self.silhouette_sample, n), rng) \
+                if n > self.silhouette_sample else np.arange(n)
+            self.silhouette = mixed_silhouette(
+                self.numeric[sample], self.codes[sample], self.labels[sample], self.assigner.gamma
+            )
+            self.log(f"Silhouette (sampel stratified {len(sample)} tiket): {self.silhouette}")
+
+        with self.timer.stage('projections'):
+            self.coords_idx = _stratified_indices(self.labels, None, self.coords_sample, rng) \
+                if n > self.coords_sample else np.arange(n)
+            self.arrays = self.project(self.coords_idx)
+
+        with self.timer.stage('summary'):
+            self.summary = self.summarize()
+        return self
+
+    @staticmethod
+    def _sample(rng, n, size):
+        if not size or n <= size:
+            return np.arange(n)
+        return np.sort(rng.choice(n, size, replace=False))
+
+    def _matrix(self, idx):
+        """
+        Matriks K-Prototypes: kolom kategorikal (kode) dulu, lalu numerik (seperti notebook).
+        kmodes tidak menerima NaN: nilai kosong diisi median kolom (0 di ruang RobustScaler).
+        """
+        return np.hstack([self.codes[idx].astype(np.float64), np.nan_to_num(self.numeric[idx])])
+
+    def _fit(self, k, gamma, idx, n_init):
+        model = KPrototypes(
+            n_clusters=k, init='Cao', n_init=n_init, gamma=gamma, n_jobs=self.workers,
+            random_state=self.random_state, verbose=0,
+        )
+        model.fit(self._matrix(idx), categorical=list(range(len(MODEL_CATEGORICAL_COLUMNS))))
+        return model
+
+    def _assigner(self, model):
+        """ Prototype kmodes (numerik di ruang scaler, kategorikal -> nilai asli) sebagai ClusterAssigner """
+        centroids = np.asarray(model.cluster_centroids_, dtype=np.float64)
+        p = len(MODEL_NUMERICAL_COLUMNS)
+        modes = [
+            [self.categories[col_index][int(round(code))] for col_index, code in enumerate(row)]
+            for row in centroids[:, p:]
+        ]
+        assigner = ClusterAssigner(range(len(centroids)), MODEL_NUMERICAL_COLUMNS, centroids[:, :p],
+                                   MODEL_CATEGORICAL_COLUMNS, modes, model.gamma)
+        # Data training sudah di-scale: prototype disimpan dengan center/scale scaler untuk input mentah
+        self.prototypes = {
+            'cluster_ids': list(range(len(centroids))),
+            'numerical_columns': MODEL_NUMERICAL_COLUMNS,
+            'categorical_columns': MODEL_CATEGORICAL_COLUMNS,
+            'centroids_numerical': centroids[:, :p].tolist(),
+            'centroids_categorical': [[_json_value(v) for v in row] for row in modes],
+            'center': self.scaler.center_.tolist(),
+            'scale': self.scaler.scale_.tolist(),
+        }
+        return assigner
+
+    def _assigner_codes(self, start, stop):
+        """ Kode kategorikal pipeline -> kode tabel ClusterAssigner (nilai sama, penomoran berbeda) """
+        codes = np.empty((stop - start, len(MODEL_CATEGORICAL_COLUMNS)), dtype=np.int64)
+        for col_index, categories in enumerate(self.categories):
+            table = self.assigner.category_tables[col_index]
+            lookup = np.asarray([table.get(value, -1) for value in categories], dtype=np.int64)
+            codes[:, col_index] = lookup[self.codes[start:stop, col_index]]
+        return codes
+
+    def tune(self, rng):
+        """ Grid k x gamma pada sampel (seperti notebook), dipilih silhouette tertinggi """
+        idx = self._sample(rng, len(self.numbers), self.tuning_sample)
+        best = None
+        for k in self.k_values:
+            for gamma in self.gammas:
+                model = self._fit(k, gamma, idx, max(1, min(self.n_init, 5)))
+                labels = np.asarray(model.labels_, dtype=np.int64)
+                sample = _stratified_indices(labels, None, self.silhouette_sample, rng) \
+                    if len(idx) > self.silhouette_sample else np.arange(len(idx))
+                score = mixed_silhouette(
+                    self.numeric[idx][sample], self.codes[idx][sample], labels[sample], model.gamma
+                )
+                self.log(f"Tuning k={k} gamma={model.gamma:.4f}: silhouette {score}")
+                if score is not None and (best is None or score > best[0]):
+                    best = (score, k, gamma)
+        if best is None:
+            return self.k_values[0], self.gammas[0]
+        return best[1], best[2]
+
+    def project(self, idx):
+        """ PCA (numerik), MCA (kategorikal, prince) dan UMAP 2D dari gabungan keduanya """
+        arrays = {'cluster_labels': self.labels[idx]}
+        arrays['pca_coords'] = PCA(n_components=2, random_state=self.random_state).fit_transform(np.nan_to_num(self.numeric[idx]))
+
+        arrays['mca_coords'] = np.empty((0, 2))
+        if prince is not None:
+            import pandas as pd
+            categorical = pd.DataFrame({
+                col: self.categories[col_index][self.codes[idx, col_index]].astype(str)
+                for col_index, col in enumerate(MODEL_CATEGORICAL_COLUMNS)
+            })
+            mca = prince.MCA(n_components=2, random_state=self.random_state)
+            arrays['mca_coords'] = np.asarray(mca.fit(categorical).transform(categorical), dtype=np.float64)
+        else:
+            self.log("prince tidak terpasang: koordinat MCA dilewati.")
+
+        arrays['visual_coords_2d'] = np.empty((0, 2))
+        if umap is not None and len(arrays['mca_coords']):
+            combined = StandardScaler().fit_transform(np.hstack([arrays['pca_coords'], arrays['mca_coords']]))
+            reducer = umap.UMAP(n_components=2, random_state=self.random_state, n_neighbors=15, min_dist=0.1)
+            arrays['visual_coords_2d'] = reducer.fit_transform(combined)
+        else:
+            # ClusterArtifact.coords jatuh ke pca_coords jika visual_coords_2d kosong
+            self.log("umap-learn/MCA tidak tersedia: visual_coords_2d memakai PCA.")
+        return arrays
+
+    def summarize(self):
+        """ Rata-rata numerik & modus kategorikal per cluster dari data asli (semua tiket) """
+        cluster_ids = self.assigner.cluster_ids
+        sizes = np.bincount(self.labels, minlength=len(cluster_ids))
+        summary = {}
+        means = {}
+        for col in SUMMARY_NUMERICAL_COLUMNS:
+            values = numeric_column(self.columns, col, len(self.labels))
+            valid = ~np.isnan(values)
+            totals = np.bincount(self.labels[valid], weights=values[valid], minlength=len(cluster_ids))
+            counts = np.bincount(self.labels[valid], minlength=len(cluster_ids))
+            means[col] = np.divide(totals, counts, out=np.full(len(cluster_ids), np.nan), where=counts > 0)
+        modes = {}
+        for col in SUMMARY_CATEGORICAL_COLUMNS:
+            # Modus; seri diputus ke nilai terkecil seperti Series.mode().iloc[0]
+            values = np.asarray(self.columns[col], dtype=object)
+            uniques, first, inverse = np.unique(values.astype(str), return_index=True, return_inverse=True)
+            counts = np.bincount(self.labels * len(uniques) + inverse, minlength=len(cluster_ids) * len(uniques))
+            counts = counts.reshape(len(cluster_ids), len(uniques))
+            modes[col] = [values[first[code]] if sizes[i] else 'Unknown' for i, code in enumerate(counts.argmax(axis=1))]
+        for i, cluster_id in enumerate(cluster_ids.tolist()):
+            summary[str(cluster_id)] = {
+                'mean_numerical': {col: _json_value(round(float(means[col][i]), 4)) for col in SUMMARY_NUMERICAL_COLUMNS},
+                'mode_categorical': {col: _json_value(modes[col][i]) for col in SUMMARY_CATEGORICAL_COLUMNS},
+                'size': int(sizes[i]),
+            }
+        return summary
+
+    def cluster_data(self):
+        """ Isi cluster_results.json (tanpa array; array ada di sidecar .npz) """
+        return {
+            'num_clusters': self.assigner.num_clusters,
+            'best_gamma': float(self.assigner.gamma),
+            'final_silhouette_score': self.silhouette,
+            'summary_per_cluster': self.summary,
+            'numerical_columns_summary': SUMMARY_NUMERICAL_COLUMNS,
+            'categorical_columns_summary': SUMMARY_CATEGORICAL_COLUMNS,
+            'prototypes': self.prototypes,
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'tickets': len(self.numbers),
+                'coords_sample': len(self.coords_idx),
+                'timings': self.timer.fields(),
+            },
+        }
+
+    def write(self, json_path=CLUSTER_RESULTS_PATH):
+        """
+        Tulis ClusterSummary + Ticket.cluster_id dalam satu transaksi; file
+        artefak (JSON + sidecar .npz) ditulis ke file sementara lebih dulu dan
+        baru di-rename setelah transaksi commit, sehingga pembaca tidak pernah
+        melihat artefak setengah jadi atau yang tidak cocok dengan database.
+        """
+        with self.timer.stage('write'):
+            os.makedirs(os.path.dirname(json_path), exist_ok=True)
+            npz_path = sidecar_path(json_path)
+            tmp_json, tmp_npz = json_path + '.tmp', npz_path + '.tmp.npz'
+            with open(tmp_json, 'w') as f:
+                json.dump(self.cluster_data(), f, indent=4)
+            # npz ditulis setelah JSON agar mtime-nya >= JSON (lihat load_cluster_artifact)
+            np.savez_compressed(tmp_npz, **self.arrays)
+
+            def publish():
+                os.replace(tmp_json, json_path)
+                os.replace(tmp_npz, npz_path)
+                cluster_artifact_loader.clear()
+
+            try:
+                with transaction.atomic():
+                    ClusterSummary.objects.all().delete()
+                    ClusterSummary.objects.bulk_create([
+                        ClusterSummary(
+                            cluster_id=int(cluster_id), size=item['size'],
+                            centroid_numerical=item['mean_numerical'], mode_categorical=item['mode_categorical'],
+                            description=f"Item dominan: {item['mode_categorical'].get('Item')}",
+                        )
+                        for cluster_id, item in self.summary.items()
+                    ])
+                    by_cluster = defaultdict(list)
+                    for number, label in zip(self.numbers.tolist(), self.labels.tolist()):
+                        by_cluster[label].append(number)
+                    for cluster_id, numbers in by_cluster.items():
+                        for start in range(0, len(numbers), UPDATE_BATCH_SIZE):
+                            Ticket.objects.filter(number__in=numbers[start:start + UPDATE_BATCH_SIZE]).update(
+                                cluster_id=cluster_id
+                            )
+                    transaction.on_commit(publish)
+            except Exception:
+                for path in (tmp_json, tmp_npz):
+                    if os.path.exists(path):
+                        os.remove(path)
+                raise
+        return json_path
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework.response import Response
+
+from ..models import DataVersion
+
+DATA_VERSION_NAME = 'tickets'
+
+# Nilai query param yang artinya "tanpa filter", dibuang saat normalisasi key
+EMPTY_PARAM_VALUES = {'', 'all'}
+
+_counters = {'hits': 0, 'misses': 0}
+_counters_lock = threading.Lock()
+
+
+def cache_enabled():
+    return getattr(settings, 'SLA_CACHE_ENABLED', True)
+
+
+def get_data_version(name=DATA_VERSION_NAME):
+    version = DataVersion.objects.filter(name=name).values_list('version', flat=True).first()
+    return version or 0
+
+
+def bump_data_version(name=DATA_VERSION_NAME):
+    """ Naikkan versi data: semua response yang sudah di-cache menjadi tidak valid """
+    with transaction.atomic():
+        DataVersion.objects.get_or_create(name=name)
+        DataVersion.objects.filter(name=name).update(version=F('version') + 1)
+    return get_data_version(name)
+
+
+def make_cache_key(endpoint, query_params, version):
+    """ Key = endpoint + query param yang dinormalisasi (urut, tanpa nilai kosong/'all') + versi data """
+    normalized = sorted(
+        (key, value)
+        for key in query_params
+        if key != 'format'
+        for value in query_params.getlist(key)
+        if value.strip().lower() not in EMPTY_PARAM_VALUES
+    )
+    digest = hashlib.md5(repr(normalized).encode('utf-8')).hexdigest()
+    return f"sla:{endpoint}:v{version}:{digest}"
+
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def cached_endpoint(endpoint, source_version=None):
+    """
+    Decorator untuk function view DRF (dipasang di bawah @api_view).
+    Response 200 disimpan selama SLA_CACHE_TTL detik; TTL & eviction LRU
+    diatur oleh backend di settings.CACHES.
+    source_version: fungsi tanpa argumen -> versi sumber data di luar
+    database (mis. mtime file artefak), ikut menjadi bagian key.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not cache_enabled():
+                return view_func(request, *args, **kwargs)
+
+            version = get_data_version()
+            if source_version is not None:
+                version = f"{version}-{source_version()}"
+            key = make_cache_key(endpoint, request.query_params, version)
+            data = cache.get(key)
+            if data is not None:
+                _count('hits')
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _count('misses')
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, getattr(settings, 'SLA_CACHE_TTL', 300))
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    """ Counter hit/miss (per worker process) + info backend """
+    with _counters_lock:
+        hits, misses = _counters['hits'], _counters['misses']
+    total = hits + misses
+    return {
+        'enabled': cache_enabled(),
+        'backend': settings.CACHES['default']['BACKEND'],
+        'ttl': getattr(settings, 'SLA_CACHE_TTL', 300),
+        'data_version': get_data_version(),
+        'pid': os.getpid(),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else 0.0,
+    }
+
+
+def reset_cache_stats():
+    with _counters_lock:
+        _counters['hits'] = 0
+        _counters['misses'] = 0
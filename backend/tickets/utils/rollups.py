@@ -0,0 +1,163 @@
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from ..models import DataVersion, Ticket, TicketRollup
+from .response_cache import bump_data_version, get_data_version
+
+ROLLUP_DIMENSIONS = ['month', 'priority', 'category', 'item', 'is_sla_violated']
+
+# Penanda kesegaran rollup (baris DataVersion): TICKET_ROWS_VERSION naik setiap kali
+# baris Ticket berubah (tickets_changed), ROLLUPS_VERSION = nilainya saat TicketRollup
+# terakhir kali lengkap. Keduanya sama -> rollup boleh dipakai endpoint statistik.
+TICKET_ROWS_VERSION = 'ticket_rows'
+ROLLUPS_VERSION = 'ticket_rollups'
+
+
+def month_of(value):
+    """ Tanggal 1 dari bulan sebuah datetime (mengikuti TIME_ZONE, sama seperti TruncMonth) """
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        value = value.date()
+    return value.replace(day=1)
+
+
+def months_of_tickets(numbers):
+    """ Bulan-bulan open_date dari tiket yang sudah ada di database (untuk upsert) """
+    return {
+        month_of(dt)
+        for dt in Ticket.objects.filter(number__in=numbers).dates('open_date', 'month')
+    }
+
+
+def _month_range_filter(months):
+    tz = timezone.get_current_timezone()
+    condition = Q()
+    for month in months:
+        next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+        condition |= Q(
+            open_date__gte=timezone.make_aware(datetime(month.year, month.month, 1), tz),
+            open_date__lt=timezone.make_aware(datetime(next_month.year, next_month.month, 1), tz),
+        )
+    return condition
+
+
+def refresh_rollups(months=None):
+    """
+    Hitung ulang TicketRollup dari tabel Ticket.
+    months=None -> rebuild penuh; selain itu hanya bulan-bulan tersebut
+    (incremental, dipakai setelah import). Mengembalikan jumlah baris rollup.
+    """
+    tickets = Ticket.objects.all()
+    rollups = TicketRollup.objects.all()
+    if months is not None:
+        months = sorted({month_of(m) for m in months})
+        if not months:
+            return 0
+        tickets = tickets.filter(_month_range_filter(months))
+        rollups = rollups.filter(month__in=months)
+
+    grouped = (
+        tickets.annotate(month=TruncMonth('open_date', output_field=DateField()))
+        .order_by()
+        .values(*ROLLUP_DIMENSIONS)
+        .annotate(
+            ticket_count=Count('number'),
+            resolution_duration_sum=Sum('resolution_duration'),
+            compliance_rate_sum=Sum('application_sla_compliance_rate'),
+        )
+    )
+    objs = [
+        TicketRollup(
+            **{key: row[key] for key in ROLLUP_DIMENSIONS},
+            ticket_count=row['ticket_count'],
+            resolution_duration_sum=row['resolution_duration_sum'] or 0,
+            resolution_duration_avg=(row['resolution_duration_sum'] or 0) / row['ticket_count'],
+            compliance_rate_sum=row['compliance_rate_sum'] or 0,
+            compliance_rate_avg=(row['compliance_rate_sum'] or 0) / row['ticket_count'],
+        )
+        for row in grouped.iterator()
+    ]
+
+    with transaction.atomic():
+        rollups.delete()
+        TicketRollup.objects.bulk_create(objs, batch_size=1000)
+        if months is None:
+            _mark_rollups_fresh(get_data_version(TICKET_ROWS_VERSION))
+    return len(objs)
+
+
+def _mark_rollups_fresh(rows_version):
+    DataVersion.objects.update_or_create(name=ROLLUPS_VERSION, defaults={'version': rows_version})
+
+
+def rollups_fresh():
+    """ True jika TicketRollup dibangun ulang penuh setelah perubahan baris Ticket terakhir dan terus diperbarui """
+    versions = dict(
+        DataVersion.objects.filter(name__in=[TICKET_ROWS_VERSION, ROLLUPS_VERSION]).values_list('name', 'version')
+    )
+    return ROLLUPS_VERSION in versions and versions[ROLLUPS_VERSION] == versions.get(TICKET_ROWS_VERSION, 0)
+
+
+def tickets_changed(months=None, rebuild_if_stale=False):
+    """
+    Dipanggil setiap kali baris Ticket ditulis/dihapus (import, seeder, save
+    admin/ORM lewat signal): rollup bulan-bulan tsb dihitung ulang (None ->
+    semua), penanda kesegaran maju jika rollup sebelumnya segar, lalu versi
+    data response cache dinaikkan. rebuild_if_stale=True (proses batch)
+    membangun ulang penuh rollup yang belum segar. Mengembalikan jumlah
+    baris rollup yang ditulis.
+    """
+    with transaction.atomic():
+        fresh = rollups_fresh()
+        if rebuild_if_stale and not fresh:
+            months = None
+        count = refresh_rollups(months)
+        rows_version = bump_data_version(TICKET_ROWS_VERSION)
+        if fresh or months is None:
+            _mark_rollups_fresh(rows_version)
+        bump_data_version()
+    return count
+
+
+def _saved_ticket_months(instance):
+    months = {month_of(instance.open_date)}
+    if getattr(instance, '_rollup_old_month', None) is not None:
+        months.add(instance._rollup_old_month)
+    return months
+
+
+def remember_ticket_month(sender, instance, raw=False, **kwargs):
+    """ Receiver pre_save Ticket: bulan open_date lama juga perlu dihitung ulang jika berubah """
+    if raw:
+        return
+    old = Ticket.objects.filter(pk=instance.pk).values_list('open_date', flat=True).first()
+    instance._rollup_old_month = month_of(old) if old is not None else None
+
+
+def ticket_saved(sender, instance, raw=False, **kwargs):
+    """
+    Receiver post_save Ticket (admin, save() ORM): rollup diperbarui setelah commit.
+    Tidak ada receiver delete (lihat TicketsConfig.ready): .delete() ORM TIDAK
+    memperbarui TicketRollup; penghapusan ditangani TicketAdmin.delete_model /
+    delete_queryset dan clear_synthetic_tickets, kode lain harus memanggil
+    tickets_changed(bulan) sendiri.
+    """
+    if raw:
+        return
+    months = _saved_ticket_months(instance)
+    transaction.on_commit(lambda: tickets_changed(months))
+
+
+def rollups_enabled():
+    """
+    Rollup dipakai jika diaktifkan (SLA_USE_ROLLUPS) dan masih segar
+    (rollups_fresh); jika belum pernah dibangun penuh atau ada penulisan
+    Ticket yang tidak memperbaruinya, endpoint statistik membaca tabel Ticket langsung.
+    """
+    return getattr(settings, 'SLA_USE_ROLLUPS', True) and rollups_fresh()
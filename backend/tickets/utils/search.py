@@ -0,0 +1,259 @@
+import logging
+
+from django.db import connections, transaction
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Lower
+from django.db.models.lookups import GreaterThanOrEqual, LessThan
+
+# Nama objek database yang dibuat migration 0008_ticket_search / 0011_ticket_search_key
+SQLITE_SEARCH_TABLE = 'tickets_ticket_search'
+SQLITE_FTS_TABLE = 'tickets_ticket_search_fts'
+POSTGRES_TRGM_INDEXES = {
+    'ticket_number_upper_trgm_idx': 'number',
+    'ticket_item_upper_trgm_idx': 'item',
+}
+
+# Objek versi lama (FTS5 di atas rowid implisit tickets_ticket), dihapus oleh migration 0011
+LEGACY_SQLITE_FTS_TABLE = 'tickets_ticket_fts'
+LEGACY_SQLITE_TRIGGERS = [f'{LEGACY_SQLITE_FTS_TABLE}_ai', f'{LEGACY_SQLITE_FTS_TABLE}_ad', f'{LEGACY_SQLITE_FTS_TABLE}_au']
+LEGACY_POSTGRES_TRGM_INDEX = 'ticket_item_trgm_idx'
+
+logger = logging.getLogger(__name__)
+
+# tickets_ticket tidak punya kunci integer yang stabil (PK-nya CharField number, rowid
+# implisit bisa berubah saat VACUUM), jadi FTS5 memakai tabel pemetaan dengan
+# INTEGER PRIMARY KEY sendiri: id -> (number, item). Trigger menjaga keduanya tetap
+# sinkron; baris lama dicari lewat index UNIQUE number.
+_FTS_DELETE_OLD = (
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, number, item) "
+    f"SELECT 'delete', id, number, item FROM {SQLITE_SEARCH_TABLE} WHERE number = old.number; "
+)
+_FTS_INSERT_NEW = (
+    f'INSERT INTO {SQLITE_FTS_TABLE}(rowid, number, item) '
+    f'SELECT id, number, item FROM {SQLITE_SEARCH_TABLE} WHERE number = new.number; '
+)
+SQLITE_TRIGGERS = {
+    f'{SQLITE_SEARCH_TABLE}_ai': (
+        f'CREATE TRIGGER IF NOT EXISTS {SQLITE_SEARCH_TABLE}_ai AFTER INSERT ON tickets_ticket BEGIN '
+        f'INSERT INTO {SQLITE_SEARCH_TABLE}(number, item) VALUES (new.number, new.item); '
+        f'{_FTS_INSERT_NEW}END'
+    ),
+    f'{SQLITE_SEARCH_TABLE}_ad': (
+        f'CREATE TRIGGER IF NOT EXISTS {SQLITE_SEARCH_TABLE}_ad AFTER DELETE ON tickets_ticket BEGIN '
+        f'{_FTS_DELETE_OLD}'
+        f'DELETE FROM {SQLITE_SEARCH_TABLE} WHERE number = old.number; END'
+    ),
+    f'{SQLITE_SEARCH_TABLE}_au': (
+        f'CREATE TRIGGER IF NOT EXISTS {SQLITE_SEARCH_TABLE}_au AFTER UPDATE OF number, item ON tickets_ticket BEGIN '
+        f'{_FTS_DELETE_OLD}'
+        f'UPDATE {SQLITE_SEARCH_TABLE} SET number = new.number, item = new.item WHERE number = old.number; '
+        f'{_FTS_INSERT_NEW}END'
+    ),
+}
+
+# Nilai di atas semua karakter, untuk range prefix kolom >= term AND kolom < term + MAX_CHAR
+MAX_CHAR = '\U0010ffff'
+
+# Skala rank: kecocokan number selalu di atas kecocokan item
+RANK_NUMBER_EXACT = 3.0
+RANK_NUMBER_PREFIX = 2.0
+RANK_ITEM_EXACT = 1.5
+RANK_MATCH = 1.0
+
+# Trigram butuh minimal 3 karakter; term lebih pendek dicocokkan tanpa index trigram
+MIN_TRIGRAM_LENGTH = 3
+
+
+def sqlite_fts_available(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SQLITE_FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def number_prefix_filter(term):
+    """
+    Prefix number lewat range primary key: number >= TERM AND number < TERM + MAX_CHAR
+    (term dinormalisasi ke huruf besar, bentuk number tersimpan: INC..., SYN-...).
+    startswith hanya menyaring baris di dalam range, agar collation PostgreSQL
+    yang mengabaikan tanda baca tidak meloloskan bukan-prefix.
+    """
+    number_term = term.upper()
+    return Q(number__gte=number_term, number__lt=number_term + MAX_CHAR, number__startswith=number_term)
+
+
+def item_prefix_filter(term):
+    """ Prefix item case-insensitive lewat range index LOWER(item) (ticket_item_lower_idx) """
+    item_term = term.lower()
+    return Q(
+        GreaterThanOrEqual(Lower('item'), item_term),
+        LessThan(Lower('item'), item_term + MAX_CHAR),
+        item__istartswith=term,
+    )
+
+
+def search_filter(term, using='default'):
+    """
+    Q untuk tiket yang cocok dengan term: substring number atau substring
+    item (keduanya case-insensitive).
+    - SQLite: subquery FTS5 trigram atas kolom number dan item;
+    - PostgreSQL: ILIKE yang dilayani index GiST gist_trgm_ops (UPPER(kolom));
+    - term < 3 karakter (trigram tidak berlaku): hanya prefix, lewat range
+      primary key number dan range index LOWER(item).
+    Tanpa LIMIT: filter lain, count dan pagination bekerja atas semua kecocokan.
+    """
+    connection = connections[using]
+    if len(term) < MIN_TRIGRAM_LENGTH:
+        return number_prefix_filter(term) | item_prefix_filter(term)
+    if connection.vendor == 'sqlite' and sqlite_fts_available(connection):
+        phrase = '"' + term.replace('"', '""') + '"'
+        return Q(number__in=RawSQL(
+            f'SELECT s.number FROM {SQLITE_SEARCH_TABLE} s WHERE s.id IN '
+            f'(SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s)',
+            [phrase],
+        ))
+    return Q(number__icontains=term) | Q(item__icontains=term)
+
+
+def search_rank(term):
+    """
+    Ekspresi rank per baris (lebih besar = lebih relevan): number persis,
+    prefix number, item persis, lalu kecocokan lain. Dihitung hanya untuk
+    baris yang lolos filter.
+
+    Trade-off: urutan -search_rank berarti seluruh kecocokan di-rank dan
+    diurutkan (top-N sort per halaman), jadi biayanya sebanding dengan
+    jumlah kecocokan, bukan ukuran tabel; term yang sangat umum (mis. 'INC')
+    tetap mahal. Sengaja tidak dibatasi: count, pagination dan export harus
+    mencakup semua kecocokan.
+    """
+    return Case(
+        When(number__iexact=term, then=Value(RANK_NUMBER_EXACT)),
+        When(number__istartswith=term, then=Value(RANK_NUMBER_PREFIX)),
+        When(item__iexact=term, then=Value(RANK_ITEM_EXACT)),
+        default=Value(RANK_MATCH),
+        output_field=FloatField(),
+    )
+
+
+def apply_search(queryset, term):
+    """
+    Filter queryset Ticket ke hasil pencarian dan tambahkan anotasi
+    search_rank. Filter dan urutan lain dari pemanggil digabung dalam
+    query yang sama, jadi hasilnya tidak pernah terpotong.
+    """
+    term = term.strip()
+    if not term:
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+    return queryset.filter(search_filter(term, using=queryset.db)).annotate(search_rank=search_rank(term))
+
+
+def _sqlite_populate(cursor):
+    """ Isi ulang tabel pemetaan dari tickets_ticket lalu bangun ulang FTS5 darinya """
+    cursor.execute(f'DELETE FROM {SQLITE_SEARCH_TABLE}')
+    cursor.execute(f'INSERT INTO {SQLITE_SEARCH_TABLE}(number, item) SELECT number, item FROM tickets_ticket')
+    cursor.execute(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')")
+
+
+def install_search_index(connection):
+    """
+    Buat index pencarian number/item sesuai database (idempotent):
+    - SQLite: tabel pemetaan berkunci INTEGER PRIMARY KEY + tabel FTS5
+      (tokenizer trigram, external content tabel pemetaan) + trigger
+      insert/update/delete agar selalu sinkron (termasuk upsert import);
+    - PostgreSQL: extension pg_trgm + index GiST gist_trgm_ops pada
+      UPPER(number) dan UPPER(item), bentuk yang dipakai lookup icontains Django.
+    Dipanggil dari migration dan setelah setiap migrate (post_migrate), karena
+    SQLite membuat ulang tabel saat ALTER sehingga trigger ikut hilang.
+    """
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'tickets_ticket'"
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            try:
+                cursor.execute(
+                    f'CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5('
+                    f"number, item, content='{SQLITE_SEARCH_TABLE}', content_rowid='id', tokenize='trigram')"
+                )
+            except Exception as e:
+                # SQLite < 3.34 tanpa tokenizer trigram: pencarian jatuh ke LIKE
+                logger.warning("FTS5 trigram tidak tersedia, pencarian memakai LIKE: %s", e)
+                return False
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {SQLITE_SEARCH_TABLE} ('
+                f'id INTEGER PRIMARY KEY, number TEXT NOT NULL UNIQUE, item TEXT NOT NULL)'
+            )
+            for sql in SQLITE_TRIGGERS.values():
+                cursor.execute(sql)
+            if not set(SQLITE_TRIGGERS) <= existing:
+                _sqlite_populate(cursor)
+        return True
+
+    if connection.vendor == 'postgresql':
+        try:
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+                for name, column in POSTGRES_TRGM_INDEXES.items():
+                    cursor.execute(
+                        f'CREATE INDEX IF NOT EXISTS {name} '
+                        f'ON tickets_ticket USING gist (UPPER({column}::text) gist_trgm_ops)'
+                    )
+        except Exception as e:
+            # Tanpa hak CREATE EXTENSION pencarian tetap jalan (ILIKE tanpa index)
+            logger.warning("pg_trgm tidak bisa dipasang: %s", e)
+            return False
+        return True
+    return False
+
+
+def uninstall_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}')
+            cursor.execute(f'DROP TABLE IF EXISTS {SQLITE_SEARCH_TABLE}')
+        elif connection.vendor == 'postgresql':
+            for name in POSTGRES_TRGM_INDEXES:
+                cursor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def uninstall_legacy_search_index(connection):
+    """ Hapus index pencarian versi lama (FTS5 berkunci rowid implisit / trigram pada item saja) """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for name in LEGACY_SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'DROP TABLE IF EXISTS {LEGACY_SQLITE_FTS_TABLE}')
+        elif connection.vendor == 'postgresql':
+            cursor.execute(f'DROP INDEX IF EXISTS {LEGACY_POSTGRES_TRGM_INDEX}')
+
+
+def ensure_search_index(sender, using='default', plan=None, **kwargs):
+    """ Handler post_migrate: pasang ulang index/trigger jika hilang """
+    if plan is not None and not any(migration.app_label == 'tickets' for migration, _ in plan):
+        return
+    connection = connections[using]
+    if 'tickets_ticket' in connection.introspection.table_names():
+        install_search_index(connection)
+
+
+def rebuild_search_index(using='default'):
+    """
+    Bangun ulang index pencarian dari tabel Ticket. Biasanya tidak perlu:
+    trigger (SQLite) dan index GiST (PostgreSQL) selalu sinkron, termasuk
+    saat import_tickets. Mengembalikan nama backend yang dibangun ulang.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite' and sqlite_fts_available(connection):
+            with transaction.atomic(using=using):
+                _sqlite_populate(cursor)
+            return 'fts5'
+        if connection.vendor == 'postgresql':
+            for name in POSTGRES_TRGM_INDEXES:
+                cursor.execute(f'REINDEX INDEX {name}')
+            return 'pg_trgm'
+    return None
@@ -0,0 +1,72 @@
+import json
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+
+# Atribut bawaan LogRecord; sisanya (dari extra=...) ditulis sebagai field JSON
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Format log sebagai satu baris JSON: waktu, level, logger, event (pesan)
+    plus semua field yang dikirim lewat extra={...}.
+    """
+
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class StageTimer:
+    """
+    Catat durasi per tahap (ms) untuk dikirim sebagai field log:
+        timer = StageTimer()
+        with timer.stage('preprocess'): ...
+        logger.debug('predict', extra=timer.fields(rows=1))
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[f'{name}_ms'] = round((time.perf_counter() - start) * 1000, 3)
+
+    def fields(self, **extra):
+        return {**self.timings, 'total_ms': round((time.perf_counter() - self._start) * 1000, 3), **extra}
+
+
+class NullTimer:
+    """ Pengganti StageTimer saat level DEBUG mati: tanpa pengukuran sama sekali """
+
+    timings = {}
+
+    def stage(self, name):
+        return nullcontext()
+
+    def fields(self, **extra):
+        return extra
+
+
+NULL_TIMER = NullTimer()
+
+
+def stage_timer(logger):
+    """ StageTimer jika logger aktif di level DEBUG, selain itu NULL_TIMER """
+    return StageTimer() if logger.isEnabledFor(logging.DEBUG) else NULL_TIMER
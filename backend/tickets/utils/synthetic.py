@@ -0,0 +1,262 @@
+import csv
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import PredictionLog, Ticket
+from .cluster_artifacts import sidecar_path
+from .rollups import month_of, tickets_changed
+
+# Prefix number tiket sintetis, agar bisa dihapus lagi tanpa menyentuh data asli
+SYNTHETIC_PREFIX = 'SYN-'
+# PredictionLog sintetis ditandai dengan IP dokumentasi (TEST-NET-2, tidak pernah dipakai klien asli)
+SYNTHETIC_LOG_IP = '198.51.100.7'
+
+PRIORITY_WEIGHTS = [('4 - Low', 35), ('3 - Medium', 40), ('2 - High', 20), ('1 - Critical', 5)]
+CATEGORIES = [value for value, _ in Ticket._meta.get_field('category').choices]
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def generate_tickets(n, seed=42, start=None, days=730, prefix=SYNTHETIC_PREFIX, items=300):
+    """
+    Generator kwargs Ticket sintetis dengan distribusi yang mirip data asli:
+    prioritas berbobot, category dari choices model, open_date tersebar
+    `days` hari sejak `start`, ~20-30% tiket melanggar SLA.
+    """
+    rng = random.Random(seed)
+    tz = timezone.get_current_timezone()
+    start = start or datetime(2024, 1, 1)
+    priorities, weights = zip(*PRIORITY_WEIGHTS)
+
+    for i in range(n):
+        open_dt = start + timedelta(minutes=rng.randint(0, days * 24 * 60))
+        due_dt = open_dt + timedelta(hours=rng.randint(1, 24 * 14))
+        duration_hours = rng.expovariate(1 / 72)
+        closed_dt = open_dt + timedelta(hours=duration_hours) if rng.random() < 0.95 else None
+        violated = closed_dt is not None and closed_dt > due_dt
+        yield dict(
+            number=f"{prefix}{i:09d}",
+            priority=rng.choices(priorities, weights)[0],
+            category=rng.choice(CATEGORIES),
+            open_date=timezone.make_aware(open_dt, tz),
+            closed_date=timezone.make_aware(closed_dt, tz) if closed_dt else None,
+            due_date=timezone.make_aware(due_dt, tz),
+            time_left_incl_on_hold=round((due_dt - open_dt).total_seconds() / 3600 - duration_hours, 2),
+            item=f"application {rng.randint(1, items)}",
+            is_sla_violated=violated,
+            is_open_date_off=int(open_dt.weekday() >= 5),
+            is_due_date_off=int(due_dt.weekday() >= 5),
+            days_to_due=(due_dt - open_dt).days,
+            open_month=open_dt.month,
+            application_creation_day_of_week=DAY_NAMES[open_dt.weekday()],
+            application_creation_hour=open_dt.hour,
+            application_sla_deadline_day_of_week=DAY_NAMES[due_dt.weekday()],
+            application_sla_deadline_hour=due_dt.hour,
+            resolution_duration=round(duration_hours / 24, 4),
+            total_tickets_resolved_wc=float(rng.randint(1, 50)),
+            sla_threshold=3.0,
+            average_resolution_time_ac=round(rng.uniform(0.5, 5), 3),
+            sla_to_average_resolution_ratio_rc=round(rng.uniform(0.1, 3), 3),
+            application_sla_compliance_rate=round(rng.uniform(0.3, 1), 3),
+        )
+
+
+def seed_tickets(n, seed=42, batch_size=5000, prefix=SYNTHETIC_PREFIX, **kwargs):
+    """ Tulis n tiket sintetis ke database (bulk_create per batch, rollup ikut diperbarui). Mengembalikan jumlahnya """
+    batch = []
+    created = 0
+    months = set()
+    with transaction.atomic():
+        for ticket in generate_tickets(n, seed=seed, prefix=prefix, **kwargs):
+            batch.append(Ticket(**ticket))
+            months.add(month_of(ticket['open_date']))
+            if len(batch) >= batch_size:
+                Ticket.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            Ticket.objects.bulk_create(batch)
+            created += len(batch)
+        if months:
+            tickets_changed(months)
+    return created
+
+
+def clear_synthetic_tickets(prefix=SYNTHETIC_PREFIX):
+    """ Hapus tiket sintetis (berdasarkan prefix number); rollup bulan tsb ikut diperbarui """
+    tickets = Ticket.objects.filter(number__startswith=prefix)
+    with transaction.atomic():
+        months = set(tickets.dates('open_date', 'month'))
+        deleted, _ = tickets.delete()
+        if deleted:
+            tickets_changed(months)
+    return deleted
+
+
+# Header CSV import_tickets (processed_tickets.csv) -> field Ticket; None = kolom turunan
+CSV_COLUMNS = {
+    'Number': 'number',
+    'Priority': None,
+    'Category': 'category',
+    'Open Date': None,
+    'Closed Date': None,
+    'Due Date': None,
+    'Time Left Incl. On Hold': 'time_left_incl_on_hold',
+    'Item': 'item',
+    'Is SLA Violated': None,
+    'Is Open Date Off': None,
+    'Is Due Date Off': None,
+    'Days to Due': 'days_to_due',
+    'Open Month': 'open_month',
+    'Application Creation Day of Week': 'application_creation_day_of_week',
+    'Application Creation Hour': 'application_creation_hour',
+    'Application SLA Deadline Day of Week': 'application_sla_deadline_day_of_week',
+    'Application SLA Deadline Hour': 'application_sla_deadline_hour',
+    'Resolution Duration': 'resolution_duration',
+    'Total Tickets Resolved (Wc)': 'total_tickets_resolved_wc',
+    'SLA Threshold': 'sla_threshold',
+    'Average Resolution Time (Ac)': 'average_resolution_time_ac',
+    'SLA to Average Resolution Ratio (Rc)': 'sla_to_average_resolution_ratio_rc',
+    'Application SLA Compliance Rate': 'application_sla_compliance_rate',
+}
+# Kebalikan PRIORITY_MAPPING import_tickets
+CSV_PRIORITIES = {'4 - Low': 'Low', '3 - Medium': 'Medium', '2 - High': '2 - High', '1 - Critical': 'Critical'}
+CSV_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def write_ticket_csv(path, n, seed=42, prefix=SYNTHETIC_PREFIX, **kwargs):
+    """ Tulis n tiket sintetis sebagai CSV dengan format yang dibaca import_tickets """
+    tz = timezone.get_current_timezone()
+
+    def local(value):
+        return timezone.localtime(value, tz).strftime(CSV_DATE_FORMAT) if value else ''
+
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_COLUMNS)
+        for ticket in generate_tickets(n, seed=seed, prefix=prefix, **kwargs):
+            derived = {
+                'Priority': CSV_PRIORITIES[ticket['priority']],
+                'Open Date': local(ticket['open_date']),
+                'Closed Date': local(ticket['closed_date']),
+                'Due Date': local(ticket['due_date']),
+                'Is SLA Violated': int(ticket['is_sla_violated']),
+                'Is Open Date Off': 'Hari Libur' if ticket['is_open_date_off'] else 'Hari Kerja',
+                'Is Due Date Off': 'Hari Libur' if ticket['is_due_date_off'] else 'Hari Kerja',
+            }
+            writer.writerow([
+                derived[column] if field is None else ticket[field] for column, field in CSV_COLUMNS.items()
+            ])
+    return path
+
+
+def generate_prediction_logs(n, seed=42, start=None, days=730, items=300):
+    """ Generator PredictionLog sintetis (input form + hasil prediksi berbentuk response predict_sla) """
+    rng = random.Random(seed)
+    start = start or datetime(2024, 1, 1)
+    priorities, weights = zip(*PRIORITY_WEIGHTS)
+    for _ in range(n):
+        open_dt = start + timedelta(minutes=rng.randint(0, days * 24 * 60))
+        due_dt = open_dt + timedelta(hours=rng.randint(1, 24 * 14))
+        confidence = round(rng.betavariate(2, 3) * 100, 4)
+        violated = confidence >= 50
+        yield PredictionLog(
+            input_data={
+                'priority': rng.choices(priorities, weights)[0].lower(),
+                'category': rng.choice(CATEGORIES),
+                'item': f"application {rng.randint(1, items)}",
+                'open_date': open_dt.isoformat(timespec='minutes'),
+                'due_date': due_dt.isoformat(timespec='minutes'),
+            },
+            prediction_result={
+                'status': 'sukses',
+                'sla_violated': violated,
+                'confidence': confidence,
+                'violation_text': 'Ya' if violated else 'Tidak',
+                'days_to_due': (due_dt - open_dt).days,
+                'open_hour': open_dt.hour,
+            },
+            ip_address=SYNTHETIC_LOG_IP,
+        )
+
+
+def seed_prediction_logs(n, seed=42, batch_size=5000, **kwargs):
+    """ Tulis n PredictionLog sintetis (bulk_create per batch). Mengembalikan jumlahnya """
+    created = 0
+    batch = []
+    with transaction.atomic():
+        for log in generate_prediction_logs(n, seed=seed, **kwargs):
+            batch.append(log)
+            if len(batch) >= batch_size:
+                PredictionLog.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            PredictionLog.objects.bulk_create(batch)
+            created += len(batch)
+    return created
+
+
+def clear_synthetic_prediction_logs():
+    deleted, _ = PredictionLog.objects.filter(ip_address=SYNTHETIC_LOG_IP).delete()
+    return deleted
+
+
+def write_cluster_artifact(json_path, n_points, k=4, seed=42, items=300):
+    """
+    Artefak clustering sintetis berformat notebook: cluster_results.json
+    (summary per cluster, tanpa array) + sidecar .npz berisi n_points
+    koordinat visual/PCA/MCA (blob Gaussian per cluster) dan label.
+    """
+    rng = np.random.default_rng(seed)
+    labels = rng.choice(k, size=n_points, p=rng.dirichlet(np.full(k, 5.0)))
+    arrays = {'cluster_labels': labels.astype(np.int64)}
+    for key in ('visual_coords_2d', 'pca_coords', 'mca_coords'):
+        centers = rng.normal(scale=5.0, size=(k, 2))
+        arrays[key] = centers[labels] + rng.normal(size=(n_points, 2))
+
+    sizes = np.bincount(labels, minlength=k)
+    summary = {}
+    for cluster_id in range(k):
+        summary[str(cluster_id)] = {
+            'mean_numerical': {
+                'Days to Due': round(float(rng.uniform(1, 10)), 4),
+                'Average Resolution Time (Ac)': round(float(rng.uniform(0.5, 5)), 4),
+                'Application SLA Compliance Rate': round(float(rng.uniform(0.3, 1)), 4),
+                'Resolution Duration': round(float(rng.uniform(0.5, 6)), 4),
+                'SLA Threshold': 3.0,
+                'Is SLA Violated': round(float(rng.uniform(0.1, 0.5)), 4),
+            },
+            'mode_categorical': {
+                'Priority': str(rng.choice([priority for priority, _ in PRIORITY_WEIGHTS])),
+                'Item': f"application {rng.integers(1, items + 1)}",
+                'Application Creation Day of Week': str(rng.choice(DAY_NAMES)),
+                'Application Creation Hour': int(rng.integers(0, 24)),
+                'Is Open Date Off': int(rng.integers(0, 2)),
+                'Is Due Date Off': int(rng.integers(0, 2)),
+                'Open Month': int(rng.integers(1, 13)),
+                'Application SLA Deadline Hour': int(rng.integers(0, 24)),
+                'Application SLA Deadline Day of Week': str(rng.choice(DAY_NAMES)),
+            },
+            'size': int(sizes[cluster_id]),
+        }
+    data = {
+        'num_clusters': k,
+        'best_gamma': 0.5,
+        'final_silhouette_score': round(float(rng.uniform(0.1, 0.4)), 4),
+        'summary_per_cluster': summary,
+        'numerical_columns_summary': list(summary['0']['mean_numerical']),
+        'categorical_columns_summary': list(summary['0']['mode_categorical']),
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(json_path)), exist_ok=True)
+    with open(json_path, 'w') as f:
+        json.dump(data, f, indent=4)
+    # npz ditulis setelah JSON agar mtime-nya >= JSON (lihat load_cluster_artifact)
+    np.savez_compressed(sidecar_path(json_path), **arrays)
+    return json_path
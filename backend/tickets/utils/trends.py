@@ -0,0 +1,222 @@
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+from django.db import connections
+from django.db.models import Aggregate, Avg, Count, DateField, F, FloatField, Q
+from django.db.models.functions import (ExtractHour, ExtractIsoWeekDay, TruncDay, TruncMonth, TruncQuarter,
+                                        TruncWeek)
+from django.utils import timezone
+
+# Ukuran bucket tren -> fungsi Trunc (dievaluasi di database, di timezone yang diminta)
+TREND_BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'quarter': TruncQuarter,
+}
+
+# Kolom tanggal yang boleh dipakai: nama parameter -> (field timestamp, field jam tersimpan)
+TREND_DATE_FIELDS = {
+    'open': ('open_date', 'application_creation_hour'),
+    'due': ('due_date', 'application_sla_deadline_hour'),
+}
+
+# Hanya label output; hari selalu diekstrak dari timestamp (ISO: Senin=1 ... Minggu=7)
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+DEFAULT_PERCENTILES = (50, 90)
+MAX_PERCENTILES = 5
+
+# Database yang punya percentile_cont (PostgreSQL) atau fungsi agregat terdaftar (SQLite)
+PERCENTILE_VENDORS = ('postgresql', 'sqlite')
+
+
+class PercentileCont(Aggregate):
+    """
+    Persentil kontinu (interpolasi linear) dalam GROUP BY yang sama:
+    PERCENTILE_CONT(f) WITHIN GROUP (ORDER BY x) di PostgreSQL; di SQLite
+    fungsi agregat SLA_PERCENTILE yang didaftarkan register_sqlite_functions.
+    """
+    function = 'PERCENTILE_CONT'
+    name = 'PercentileCont'
+    output_field = FloatField()
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+    def __init__(self, expression, fraction, **extra):
+        fraction = float(fraction)
+        if not 0 <= fraction <= 1:
+            raise ValueError("fraction harus di antara 0 dan 1")
+        super().__init__(expression, fraction=repr(fraction), **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, function='SLA_PERCENTILE',
+            template='%(function)s(%(expressions)s, %(fraction)s)', **extra_context
+        )
+
+
+class _SQLitePercentile:
+    """ Agregat SQLite: kumpulkan nilai grup, lalu persentil linear (= percentile_cont) """
+
+    def __init__(self):
+        self.values = []
+        self.fraction = 0.5
+
+    def step(self, value, fraction):
+        if value is not None:
+            self.values.append(value)
+        self.fraction = fraction
+
+    def finalize(self):
+        if not self.values:
+            return None
+        return float(np.percentile(self.values, self.fraction * 100))
+
+
+def register_sqlite_functions(sender, connection, **kwargs):
+    """ Receiver connection_created: daftarkan SLA_PERCENTILE di setiap koneksi SQLite baru """
+    if connection.vendor == 'sqlite':
+        connection.connection.create_aggregate('SLA_PERCENTILE', 2, _SQLitePercentile)
+
+
+def percentiles_supported(using='default'):
+    return connections[using].vendor in PERCENTILE_VENDORS
+
+
+def parse_timezone(value):
+    """ Nama timezone IANA (mis. 'Asia/Jakarta'); kosong -> TIME_ZONE. ValueError jika tidak dikenal """
+    if not value:
+        return timezone.get_current_timezone()
+    try:
+        return ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Timezone tidak dikenal: {value}")
+
+
+def parse_percentiles(value):
+    """ '50,90,99' -> (50.0, 90.0, 99.0); kosong -> DEFAULT_PERCENTILES """
+    if value is None or value == '':
+        return DEFAULT_PERCENTILES
+    try:
+        percentiles = tuple(sorted({float(part) for part in value.split(',') if part.strip()}))
+    except ValueError:
+        raise ValueError("percentiles harus berupa daftar angka dipisah koma, mis. 50,90")
+    if len(percentiles) > MAX_PERCENTILES or any(not 0 <= p <= 100 for p in percentiles):
+        raise ValueError(f"Maksimal {MAX_PERCENTILES} percentiles, masing-masing 0-100")
+    return percentiles
+
+
+def _percentile_key(p):
+    return f"p{p:g}".replace('.', '_')
+
+
+def filter_date_range(queryset, date_field, start=None, end=None, tz=None):
+    """ start/end (YYYY-MM-DD, inklusif) sebagai tanggal lokal di tz, dipakai pada field timestamp """
+    field = TREND_DATE_FIELDS[date_field][0]
+    tz = tz or timezone.get_current_timezone()
+    try:
+        if start:
+            queryset = queryset.filter(**{f"{field}__gte": datetime.combine(date.fromisoformat(start), time.min, tz)})
+        if end:
+            end_day = date.fromisoformat(end) + timedelta(days=1)
+            queryset = queryset.filter(**{f"{field}__lt": datetime.combine(end_day, time.min, tz)})
+    except ValueError:
+        raise ValueError("start/end harus berformat YYYY-MM-DD")
+    return queryset
+
+
+def trend_aggregates(percentiles=DEFAULT_PERCENTILES):
+    """ Agregat per bucket: jumlah, pelanggaran, rata-rata dan persentil resolution_duration """
+    aggregates = {
+        'total': Count('number'),
+        'violated': Count('number', filter=Q(is_sla_violated=True)),
+        'avg_duration': Avg('resolution_duration'),
+    }
+    if percentiles_supported():
+        for p in percentiles:
+            aggregates[_percentile_key(p)] = PercentileCont('resolution_duration', p / 100)
+    return aggregates
+
+
+def build_trend_stats(row, percentiles=DEFAULT_PERCENTILES):
+    total = row['total'] or 0
+    violated = row['violated'] or 0
+    return {
+        'total_tickets': total,
+        'violated_tickets': violated,
+        'violation_rate': round(violated / total * 100, 2) if total else 0,
+        'avg_resolution_duration': round(row['avg_duration'], 2) if row['avg_duration'] is not None else None,
+        'resolution_duration_percentiles': {
+            _percentile_key(p): round(row[_percentile_key(p)], 2) if row.get(_percentile_key(p)) is not None else None
+            for p in percentiles if _percentile_key(p) in row
+        },
+    }
+
+
+def bucket_label(bucket, start):
+    if bucket == 'week':
+        year, week, _ = start.isocalendar()
+        return f"{year}-W{week:02d}"
+    if bucket == 'month':
+        return start.strftime('%Y-%m')
+    if bucket == 'quarter':
+        return f"{start.year}-Q{(start.month - 1) // 3 + 1}"
+    return start.isoformat()
+
+
+def trend_series(queryset, bucket='month', tz=None, date_field='open', percentiles=DEFAULT_PERCENTILES):
+    """
+    Tren per bucket waktu (day/week/month/quarter) dalam satu query GROUP BY:
+    bucket dihitung oleh database dari field timestamp di timezone tz.
+    """
+    field = TREND_DATE_FIELDS[date_field][0]
+    trunc = TREND_BUCKETS[bucket](field, output_field=DateField(), tzinfo=tz or timezone.get_current_timezone())
+    rows = (
+        queryset.annotate(bucket_start=trunc)
+        .order_by()
+        .values('bucket_start')
+        .annotate(**trend_aggregates(percentiles))
+        .order_by('bucket_start')
+    )
+    return [
+        {
+            'bucket': bucket_label(bucket, row['bucket_start']),
+            'start': row['bucket_start'].isoformat(),
+            **build_trend_stats(row, percentiles),
+        }
+        for row in rows if row['bucket_start'] is not None
+    ]
+
+
+def heatmap_cells(queryset, tz=None, date_field='open', percentiles=DEFAULT_PERCENTILES):
+    """
+    Heatmap jam x hari (Senin=1 ... Minggu=7) dalam satu query GROUP BY.
+    Hari selalu diekstrak dari timestamp oleh database (ExtractIsoWeekDay,
+    tidak bergantung pada nama hari tersimpan yang bisa berbeda bahasa/format);
+    tanpa tz jam diambil dari kolom jam tersimpan (fitur model) dan hari di
+    TIME_ZONE, dengan tz keduanya di timezone tsb.
+    """
+    field, hour_field = TREND_DATE_FIELDS[date_field]
+    if tz is None:
+        hour, weekday = F(hour_field), ExtractIsoWeekDay(field)
+    else:
+        hour, weekday = ExtractHour(field, tzinfo=tz), ExtractIsoWeekDay(field, tzinfo=tz)
+    rows = (
+        queryset.annotate(cell_hour=hour, cell_weekday=weekday)
+        .order_by()
+        .values('cell_hour', 'cell_weekday')
+        .annotate(**trend_aggregates(percentiles))
+    )
+
+    cells = []
+    for row in rows:
+        weekday = row['cell_weekday']
+        cells.append({
+            'weekday': weekday,
+            'weekday_name': WEEKDAY_NAMES[weekday - 1] if weekday else None,
+            'hour': row['cell_hour'],
+            **build_trend_stats(row, percentiles),
+        })
+    cells.sort(key=lambda cell: (cell['weekday'] or 8, cell['hour'] if cell['hour'] is not None else 24))
+    return cells
@@ -1,44 +1,61 @@
+import base64
 import json
+import logging
 import os
-from datetime import timedelta
+import time
+from datetime import datetime, timedelta
 
 import joblib
 import numpy as np
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.mail import send_mail
-from django.db.models import Avg, Count, Q
+from django.db import connections
+from django.db.models import Count, F, Q, Sum
 from django.db.models.functions import TruncMonth
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 from django.utils.crypto import get_random_string
 from rest_framework import status, viewsets
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-
-from .models import Ticket, UserProfile
-from .serializers import TicketSerializer
-from .utils.model_utils import SLAPredictor
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .models import PredictionLog, Ticket, TicketRollup, UserProfile
+from .serializers import LeanTicketSerializer, TicketSerializer
+from .utils.cluster_artifacts import (DEFAULT_SCATTER_LIMIT, MAX_SCATTER_LIMIT,
+                                      SCATTER_SAMPLERS, cluster_artifact_loader,
+                                      cluster_colors, empty_cluster_artifact)
+from .utils.cluster_assign import get_cluster_assigner
+from .utils.export import (EXPORT_COMPRESSIONS, EXPORT_OUTPUTS, export_stream,
+                           parquet_available)
+from .utils.model_utils import get_predictor
+from .utils.prediction_cache import prediction_cache_stats
+from .utils.prediction_log import log_predictions, prediction_log_stats
+from .utils.response_cache import cache_stats, cached_endpoint
+from .utils.rollups import rollups_enabled
+from .utils.search import apply_search
+from .utils.trends import (TREND_BUCKETS, TREND_DATE_FIELDS, filter_date_range, heatmap_cells,
+                           parse_percentiles, parse_timezone, percentiles_supported, trend_series)
 
 AuthUser = get_user_model()
-predictor = SLAPredictor()
+logger = logging.getLogger(__name__)
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
 ENCODERS_PATH = os.path.join(APP_DIR, "utils", "label_encoders.pkl")
 FEATURE_IMPORTANCE_PATH = os.path.join(APP_DIR, "utils", "feature_importances.json")
 
 
-cluster_colors = ['rgba(59, 130, 246, 0.8)', 'rgba(72, 187, 120, 0.8)', 'rgba(239, 68, 68, 0.8)'] 
-
-
-
-def get_filtered_queryset(request):
+def get_filtered_queryset(request, queryset=None):
     """
     Fungsi helper terpusat untuk menerapkan filter umum
     dari query parameter ke Ticket queryset.
+    Bisa juga dipakai untuk TicketRollup (nama field filter sama).
     """
-    queryset = Ticket.objects.all()
+    if queryset is None:
+        queryset = Ticket.objects.all()
 
     
     priority_filter = request.query_params.get("priority", None)
@@ -80,36 +97,19 @@ def safe_get_mean(summary, cluster_id, col_name, default=0.0):
     except (ValueError, TypeError):
         return default
 
-def create_scatter_dataset(coords, labels, num_clusters, limit=2000):
+
+def assign_prediction_clusters(records, results):
     """
-    Fungsi helper untuk memproses (sampling + formatting) koordinat 2D (PCA/MCA/UMAP)
-    menjadi datasets yang siap untuk Chart.js.
+    Cluster terdekat untuk setiap hasil prediksi ({'cluster_id', 'distance'}),
+    None jika belum ada cluster. Gagal assign tidak menggagalkan prediksi.
     """
-    if not coords or not labels or len(coords) != len(labels):
-        return None
-    
-    total_points = len(coords)
-    
-    if total_points > limit:
-        np.random.seed(42) 
-        indices = np.random.choice(total_points, limit, replace=False)
-    else:
-        
-        indices = np.arange(total_points) 
-        
-    datasets = []
-    for cluster_id in range(num_clusters):
-        points = [
-            {"x": float(coords[i][0]), "y": float(coords[i][1])}
-            for i in indices if int(labels[i]) == cluster_id
-        ]
-        datasets.append({
-            "label": f"Cluster {cluster_id}",
-            "data": points,
-            "backgroundColor": cluster_colors[cluster_id % len(cluster_colors)],
-            "pointRadius": 3,
-        })
-    return {"datasets": datasets}
+    try:
+        assigner = get_cluster_assigner()
+        if assigner is not None:
+            return assigner.assign_predictions(records, results)
+    except Exception as e:
+        logger.warning("Assign cluster gagal: %s", e)
+    return [None] * len(results)
 
 @api_view(["POST"])
 def send_otp(request):
@@ -184,53 +184,64 @@ def get_clusters(request):
     """
     API utama untuk data clustering K-Prototypes.
     Memproses UMAP/t-SNE (Hybrid), PCA (Numerik), dan MCA (Kategorikal) Scatter.
+    Opsional ?sampling=uniform|stratified|grid dan ?limit= (jumlah titik scatter).
+    scatter_meta.elapsed_ms (waktu request ini) dan scatter_meta.cached
+    ditambahkan setelah cache, jadi tidak pernah ikut tersimpan/basi.
     """
-    json_path = os.path.join(settings.BASE_DIR, "tickets", "static", "clustering", "cluster_results.json")
-
-    sample_data = {
-        "num_clusters": 0, "summary_per_cluster": {}, "visual_coords_2d": [], 
-        "pca_coords": [], "mca_coords": [], "cluster_labels": [], 
-        "numerical_columns_summary": [], "categorical_columns_summary": [],
-        "final_silhouette_score": None, "best_gamma": None,
+    start = time.perf_counter()
+    response = _cluster_charts(request)
+    if response.status_code != 200:
+        return response
+    cached = response.get("X-Cache") == "HIT"
+    charts = dict(response.data)
+    charts["scatter_meta"] = {
+        **charts["scatter_meta"],
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+        "cached": cached,
     }
+    result = Response(charts)
+    if response.has_header("X-Cache"):
+        result["X-Cache"] = response["X-Cache"]
+    return result
+
+
+@cached_endpoint("clusters", source_version=cluster_artifact_loader.version)
+def _cluster_charts(request):
+    """ Isi response get_clusters (di-cache per query params + versi artefak) """
+    sampling = request.query_params.get("sampling", "uniform")
+    if sampling not in SCATTER_SAMPLERS:
+        return Response(
+            {"error": f"sampling harus salah satu dari: {', '.join(SCATTER_SAMPLERS)}"}, status=400
+        )
+    try:
+        limit = int(request.query_params.get("limit", DEFAULT_SCATTER_LIMIT))
+    except ValueError:
+        return Response({"error": "limit harus berupa angka"}, status=400)
+    if not 1 <= limit <= MAX_SCATTER_LIMIT:
+        return Response({"error": f"limit harus antara 1 dan {MAX_SCATTER_LIMIT}"}, status=400)
 
     try:
-        data = sample_data
-        if os.path.exists(json_path):
-            with open(json_path, "r") as f:
-                data_raw = json.load(f)
-            
-            def convert_nan(obj):
-                if isinstance(obj, dict):
-                    return {k: convert_nan(v) for k, v in obj.items()}
-                return np.nan if obj == 'NaN' else obj 
-            
-            data = convert_nan(data_raw)
-            print("Cluster JSON loaded and converted successfully.")
-        else:
-            print("Using sample data (cluster_results.json not found).")
+        artifact = cluster_artifact_loader.get()
     except Exception as e:
-        print(f"Load error: {e}")
-        data = sample_data
+        logger.warning("Gagal memuat cluster_results.json: %s", e)
+        artifact = empty_cluster_artifact()
+    data = artifact.data
 
     charts = {}
     num_clusters = data.get("num_clusters", 0)
-    cluster_labels = data.get("cluster_labels", [])
     summary = data.get("summary_per_cluster", {})
     numerical_cols = data.get("numerical_columns_summary", []) or []
     categorical_cols = data.get("categorical_columns_summary", []) or []
 
-    visual_coords_2d = data.get("visual_coords_2d", []) or data.get("pca_coords", [])
-    pca_coords = data.get("pca_coords", []) 
-    mca_coords = data.get("mca_coords", []) 
-
     charts["model_performance"] = {
         "silhouette_score": round(data.get("final_silhouette_score", 0) if isinstance(data.get("final_silhouette_score"), (float, int)) else 0, 4),
         "best_gamma": round(data.get("best_gamma", 0) if isinstance(data.get("best_gamma"), (float, int)) else 0, 4),
     }
-    charts["visual_scatter"] = create_scatter_dataset(visual_coords_2d, cluster_labels, num_clusters)
-    charts["pca_scatter"] = create_scatter_dataset(pca_coords, cluster_labels, num_clusters)
-    charts["mca_scatter"] = create_scatter_dataset(mca_coords, cluster_labels, num_clusters)
+    charts["visual_scatter"] = artifact.scatter("visual_coords_2d", limit, sampling)
+    charts["pca_scatter"] = artifact.scatter("pca_coords", limit, sampling)
+    charts["mca_scatter"] = artifact.scatter("mca_coords", limit, sampling)
+    # elapsed_ms/cached diisi get_clusters per request: bagian ini di-cache
+    charts["scatter_meta"] = {"sampling": sampling, "limit": limit}
         
     bar_chart_num_datasets = []
     if summary and numerical_cols and num_clusters > 0:
@@ -299,59 +310,191 @@ def get_clusters(request):
     
     return Response(charts)
 
+def get_stats_source(request):
+    """
+    Pilih sumber data statistik: (queryset terfilter, rollup?).
+    TicketRollup dipakai jika sudah tersedia, selain itu tabel Ticket.
+    """
+    if rollups_enabled():
+        return get_filtered_queryset(request, TicketRollup.objects.all()), True
+    return get_filtered_queryset(request), False
+
+
 @api_view(["GET"])
+@cached_endpoint("violation_by_category")
 def get_violation_by_category(request):  
-    queryset = get_filtered_queryset(request)
+    queryset, rollup = get_stats_source(request)
     category_stats = (
-        queryset.values("category")
-        .annotate(total_tickets=Count("number"), violated_tickets=Count("number", filter=Q(is_sla_violated=True)))
+        queryset.order_by().values("category")
+        .annotate(
+            total_tickets=Sum("ticket_count") if rollup else Count("number"),
+            violated_tickets=(
+                Sum("ticket_count", filter=Q(is_sla_violated=True)) if rollup
+                else Count("number", filter=Q(is_sla_violated=True))
+            ),
+        )
         .order_by("-total_tickets")
     )
     results = []
     for stat in category_stats:
         total = stat["total_tickets"]
-        violated = stat["violated_tickets"]
+        violated = stat["violated_tickets"] or 0
         violation_rate = (violated / total * 100) if total > 0 else 0
         results.append({"category": stat["category"], "violation_rate": round(violation_rate, 2), "total_tickets": total})
     return Response(results[:10])
 
 @api_view(["GET"])
+@cached_endpoint("monthly_trend")
 def get_monthly_trend(request):
-    queryset = get_filtered_queryset(request)
-    monthly_data = (
-        queryset.annotate(month=TruncMonth("open_date"))
-        .values("month")
-        .annotate(total_tickets=Count("number"), violated_tickets=Count("number", filter=Q(is_sla_violated=True)))
-        .order_by("month")
-    )
+    queryset, rollup = get_stats_source(request)
+    if rollup:
+        monthly_data = (
+            queryset.order_by().values("month")
+            .annotate(total_tickets=Sum("ticket_count"), violated_tickets=Sum("ticket_count", filter=Q(is_sla_violated=True)))
+            .order_by("month")
+        )
+    else:
+        monthly_data = (
+            queryset.annotate(month=TruncMonth("open_date"))
+            .values("month")
+            .annotate(total_tickets=Count("number"), violated_tickets=Count("number", filter=Q(is_sla_violated=True)))
+            .order_by("month")
+        )
     results = [
-        {"month": data["month"].strftime("%Y-%m"), "total_tickets": data["total_tickets"], "violated_tickets": data["violated_tickets"]}
+        {"month": data["month"].strftime("%Y-%m"), "total_tickets": data["total_tickets"], "violated_tickets": data["violated_tickets"] or 0}
         for data in monthly_data
     ]
     return Response(results)
 
+def parse_trend_request(request):
+    """
+    Parameter bersama endpoint tren & heatmap: (queryset terfilter, tz,
+    date_field, percentiles). Filter umum get_filtered_queryset + rentang
+    ?start=&end= (YYYY-MM-DD, inklusif, di timezone ?tz=). ValueError jika tidak valid.
+    """
+    params = request.query_params
+    tz = parse_timezone(params.get("tz"))
+    date_field = params.get("date_field", "open")
+    if date_field not in TREND_DATE_FIELDS:
+        raise ValueError(f"date_field harus salah satu dari: {', '.join(TREND_DATE_FIELDS)}")
+    percentiles = parse_percentiles(params.get("percentiles"))
+    queryset = filter_date_range(get_filtered_queryset(request), date_field, params.get("start"), params.get("end"), tz)
+    return queryset, tz, date_field, percentiles
+
+
+@api_view(["GET"])
+@cached_endpoint("trend")
+def get_trend(request):
+    """
+    Tren jumlah tiket, violation rate, rata-rata & persentil resolution_duration
+    per ?bucket=day|week|month|quarter (default month) di timezone ?tz=
+    (default TIME_ZONE). Satu query GROUP BY di database.
+    """
+    bucket = request.query_params.get("bucket", "month")
+    if bucket not in TREND_BUCKETS:
+        return Response({"error": f"bucket harus salah satu dari: {', '.join(TREND_BUCKETS)}"}, status=400)
+    try:
+        queryset, tz, date_field, percentiles = parse_trend_request(request)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    return Response({
+        "bucket": bucket,
+        "tz": str(tz),
+        "date_field": date_field,
+        "percentiles": list(percentiles) if percentiles_supported() else [],
+        "series": trend_series(queryset, bucket, tz, date_field, percentiles),
+    })
+
+
+@api_view(["GET"])
+@cached_endpoint("heatmap")
+def get_heatmap(request):
+    """
+    Heatmap jam x hari (Senin=1 ... Minggu=7) dengan statistik yang sama
+    seperti get_trend. Hari diekstrak dari timestamp; tanpa ?tz= jam diambil
+    dari kolom jam tersimpan di Ticket, dengan ?tz= dari timestamp di timezone tsb.
+    """
+    try:
+        queryset, tz, date_field, percentiles = parse_trend_request(request)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    stored_columns = not request.query_params.get("tz")
+    return Response({
+        "tz": None if stored_columns else str(tz),
+        "date_field": date_field,
+        "source": "columns" if stored_columns else "timestamp",
+        "percentiles": list(percentiles) if percentiles_supported() else [],
+        "cells": heatmap_cells(queryset, None if stored_columns else tz, date_field, percentiles),
+    })
+
+
 @api_view(["POST"])
 def predict_sla(request):   
     input_data = request.data
     try:
-        result = predictor.predict(input_data)
+        result = get_predictor().predict(input_data)
         if result.get("status") == "error":
             return Response({"error": result.get("message", "Prediksi gagal")}, status=400)
-
-        from .models import PredictionLog
+        result["cluster"] = assign_prediction_clusters([input_data], [result])[0]
 
         user = request.user if request.user.is_authenticated else None
         ip_address = request.META.get("REMOTE_ADDR")
 
-        PredictionLog.objects.create(user=user, input_data=input_data, prediction_result=result, ip_address=ip_address)
+        # Write-behind: disimpan thread flusher, request tidak menunggu INSERT
+        log_predictions([PredictionLog(user=user, input_data=input_data, prediction_result=result, ip_address=ip_address)])
         return Response(result)
     except Exception as e:
-        print(f"Predict error detail: {type(e).__name__}: {e}")
+        logger.exception("Predict error: %s", e)
+        return Response({"error": f"Internal Server Error: {str(e)}"}, status=500)
+
+
+@api_view(["POST"])
+def predict_sla_batch(request):
+    """
+    Prediksi banyak tiket dalam satu request.
+    Body: {"tickets": [{...}, ...]} (atau langsung list tiket).
+    Hasil berurutan sesuai input, baris yang gagal punya status 'error' sendiri.
+    """
+    payload = request.data
+    tickets = payload.get("tickets") if isinstance(payload, dict) else payload
+    if not isinstance(tickets, list) or not tickets:
+        return Response({"error": "Field 'tickets' harus berupa list tiket yang tidak kosong"}, status=400)
+
+    max_size = getattr(settings, "SLA_PREDICT_BATCH_MAX_SIZE", 5000)
+    if len(tickets) > max_size:
+        return Response({"error": f"Maksimal {max_size} tiket per request"}, status=400)
+
+    try:
+        results = get_predictor().predict_batch(tickets)
+        for result, cluster in zip(results, assign_prediction_clusters(tickets, results)):
+            if result.get("status") != "error":
+                result["cluster"] = cluster
+
+        user = request.user if request.user.is_authenticated else None
+        ip_address = request.META.get("REMOTE_ADDR")
+        log_predictions(
+            PredictionLog(user=user, input_data=ticket, prediction_result=result, ip_address=ip_address)
+            for ticket, result in zip(tickets, results)
+            if result.get("status") != "error"
+        )
+
+        error_count = sum(1 for result in results if result.get("status") == "error")
+        return Response({
+            "count": len(results),
+            "success_count": len(results) - error_count,
+            "error_count": error_count,
+            "results": [{"index": i, **result} for i, result in enumerate(results)],
+        })
+    except Exception as e:
+        logger.exception("Batch predict error: %s", e, extra={"rows": len(tickets)})
         return Response({"error": f"Internal Server Error: {str(e)}"}, status=500)
 
 
 @api_view(["GET"])
 @permission_classes([AllowAny]) 
+@cached_endpoint("unique_values")
 def get_unique_values(request):
     """
     Mengambil daftar unik Category dan Item langsung dari Database.
@@ -378,7 +521,7 @@ def get_unique_values(request):
         })
 
     except Exception as e:
-        print(f"Error fetching unique values: {e}")
+        logger.warning("Error fetching unique values: %s", e)
         return Response({"error": str(e)}, status=500)
 
 
@@ -389,6 +532,140 @@ class TicketPagination(PageNumberPagination):
     max_page_size = 100
 
 
+def estimate_count(queryset):
+    """
+    Perkiraan jumlah baris dari planner PostgreSQL (EXPLAIN, tanpa scan).
+    Database lain tidak punya estimasi murah, jadi COUNT biasa.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class TicketCursorPagination(BasePagination):
+    """
+    Keyset pagination pada (open_date, number) mengikuti ?sort=.
+    Halaman berikut difilter dengan WHERE (open_date, number) < / > posisi
+    terakhir, bukan OFFSET, sehingga halaman ke-10.000 sama murahnya dengan
+    halaman pertama. Cursor next/previous berupa string opaque.
+    ?count=none|estimate|exact (default none) mengatur field count.
+
+    Urutan selalu (open_date, number) sesuai ?sort=, juga saat ?search=:
+    keyset butuh urutan yang bisa dijadikan posisi, jadi urutan relevansi
+    (search_rank) dari get_queryset diganti. Hasil pencarian yang diurutkan
+    menurut relevansi memakai page number pagination. Response menyertakan
+    field ordering agar klien tahu urutan yang dipakai.
+    """
+    page_size = 7
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    count_modes = ("none", "estimate", "exact")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.descending = request.query_params.get("sort", "-open_date") != "open_date"
+        cursor = self.decode_cursor(request)
+
+        count_mode = request.query_params.get("count", "none")
+        self.count_mode = count_mode if count_mode in self.count_modes else "none"
+        self.count = None
+        if self.count_mode == "exact":
+            self.count = queryset.count()
+        elif self.count_mode == "estimate":
+            self.count = estimate_count(queryset)
+
+        # Mundur (cursor previous) = scan ke arah sebaliknya lalu hasil dibalik
+        backwards = bool(cursor and cursor["backwards"])
+        scan_descending = self.descending != backwards
+        if cursor:
+            open_date, number = cursor["open_date"], cursor["number"]
+            # Batas open_date <= / >= yang redundan agar planner bisa range scan di index
+            if scan_descending:
+                position = Q(open_date__lt=open_date) | Q(open_date=open_date, number__lt=number)
+                queryset = queryset.filter(position, open_date__lte=open_date)
+            else:
+                position = Q(open_date__gt=open_date) | Q(open_date=open_date, number__gt=number)
+                queryset = queryset.filter(position, open_date__gte=open_date)
+        ordering = ("-open_date", "-number") if scan_descending else ("open_date", "number")
+
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")).decode("utf-8"))
+            return {
+                "open_date": datetime.fromisoformat(raw["d"]),
+                "number": str(raw["n"]),
+                "backwards": bool(raw.get("b")),
+            }
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound("Cursor tidak valid.")
+
+    @staticmethod
+    def position(row):
+        """ (open_date, number) dari instance Ticket atau dict .values() """
+        if isinstance(row, dict):
+            return row["open_date"], row["number"]
+        return row.open_date, row.number
+
+    def encode_cursor(self, row, backwards):
+        open_date, number = self.position(row)
+        raw = {"d": open_date.isoformat(), "n": number}
+        if backwards:
+            raw["b"] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(raw, separators=(",", ":")).encode("utf-8")).decode("ascii")
+        url = self.request.build_absolute_uri()
+        return replace_query_param(remove_query_param(url, "page"), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], backwards=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], backwards=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": self.count,
+            "count_mode": self.count_mode,
+            "ordering": "-open_date" if self.descending else "open_date",
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+
 class TicketViewSet(viewsets.ReadOnlyModelViewSet):
     
     queryset = Ticket.objects.all().order_by("-open_date")
@@ -396,14 +673,98 @@ class TicketViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = TicketPagination
     lookup_field = "number"
 
+    @property
+    def paginator(self):
+        """
+        ?pagination=cursor (atau ada ?cursor=) -> keyset pagination (urut
+        open_date/number, tanpa urutan relevansi ?search=), selain itu page
+        number seperti biasa (dipakai Dashboard).
+        """
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params if self.request is not None else {}
+            if params.get("pagination") == "cursor" or "cursor" in params:
+                self._paginator = TicketCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def list(self, request, *args, **kwargs):
+        """
+        List tiket lewat LeanTicketSerializer: hanya kolom yang dibutuhkan
+        diambil (.values()) dan diformat tanpa object field DRF.
+        Opsional ?fields=number,priority,open_date,... (default semua field).
+        """
+        serializer = self.get_lean_serializer()
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # number & open_date selalu diambil untuk cursor pagination
+        rows = queryset.values(*dict.fromkeys(serializer.db_fields + ["number", "open_date"]))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.to_representation(page))
+        return Response(serializer.to_representation(rows))
+
+    def get_lean_serializer(self):
+        """ LeanTicketSerializer sesuai ?fields= (dipisah koma, default semua field) """
+        fields_param = self.request.query_params.get("fields")
+        fields = [field.strip() for field in fields_param.split(",") if field.strip()] if fields_param else None
+        return LeanTicketSerializer(fields)
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request):
+        """
+        /api/tickets/export/?output=csv|ndjson|parquet&compression=none|gzip
+        Filter, search, sort dan ?fields= sama dengan list, tanpa pagination
+        (semua tiket yang cocok dengan ?search= ikut diekspor, tanpa batas).
+        Baris di-stream per chunk dari cursor server-side (.iterator()),
+        jadi memori tetap konstan berapapun jumlah tiketnya.
+        (Nama parameter ?output, karena ?format dipakai DRF untuk renderer.)
+        """
+        output = request.query_params.get("output", "csv")
+        if output not in EXPORT_OUTPUTS:
+            return Response(
+                {"error": f"output harus salah satu dari: {', '.join(EXPORT_OUTPUTS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if output == "parquet" and not parquet_available():
+            return Response(
+                {"error": "Export parquet membutuhkan pyarrow, yang tidak terpasang di server."},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        compression = request.query_params.get("compression", "none")
+        if compression not in EXPORT_COMPRESSIONS:
+            return Response(
+                {"error": f"compression harus salah satu dari: {', '.join(EXPORT_COMPRESSIONS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer = self.get_lean_serializer()
+        chunk_size = getattr(settings, "SLA_EXPORT_CHUNK_SIZE", 2000)
+        rows = self.filter_queryset(self.get_queryset()).values(*serializer.db_fields).iterator(chunk_size=chunk_size)
+
+        content_type, extension = EXPORT_OUTPUTS[output]
+        filename = f"tickets_{timezone.localtime():%Y%m%d_%H%M%S}.{extension}"
+        if compression == "gzip":
+            content_type, filename = "application/gzip", filename + ".gz"
+        response = StreamingHttpResponse(
+            export_stream(rows, serializer, output, compression, chunk_size),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        # Proxy (nginx) jangan menampung seluruh response sebelum dikirim
+        response["X-Accel-Buffering"] = "no"
+        return response
+
     def get_queryset(self):
         base_queryset = super().get_queryset()
         queryset = base_queryset
 
         
+        # Substring number/item (FTS5 / pg_trgm; term < 3 karakter: prefix), hasil diberi search_rank
         search_query = self.request.query_params.get("search", None)
         if search_query:
-            queryset = queryset.filter(Q(number__icontains=search_query))
+            queryset = apply_search(queryset, search_query)
 
         
         priority_filter = self.request.query_params.get("priority", None)
@@ -425,41 +786,126 @@ class TicketViewSet(viewsets.ReadOnlyModelViewSet):
 
         
         sort_order = self.request.query_params.get("sort", "-open_date")
-        if sort_order in ["open_date", "-open_date"]:
-            queryset = queryset.order_by(sort_order)
+        if sort_order not in ["open_date", "-open_date"]:
+            sort_order = "-open_date"
+        if search_query:
+            queryset = queryset.order_by("-search_rank", sort_order)
         else:
-            queryset = queryset.order_by("-open_date")
+            queryset = queryset.order_by(sort_order)
 
-        print(f"Queryset count after filters: {queryset.count()}")
         return queryset
 
-@api_view(["GET"])
-def get_stats(request):
-    
-    queryset = get_filtered_queryset(request)
+# Dimensi yang didukung oleh parameter ?group_by= pada get_stats:
+# (ekspresi untuk tabel Ticket, ekspresi untuk TicketRollup)
+STATS_GROUP_BY = {
+    "category": (F("category"), F("category")),
+    "item": (F("item"), F("item")),
+    "month": (TruncMonth("open_date"), F("month")),
+}
+
+PRIORITY_STATS_KEYS = [
+    ("4 - Low", "low_priority_count"),
+    ("3 - Medium", "medium_priority_count"),
+    ("2 - High", "high_priority_count"),
+    ("1 - Critical", "critical_priority_count"),
+]
+
+
+def stats_aggregates(rollup=False):
+    """
+    Semua KPI dashboard sebagai conditional aggregation, sehingga cukup
+    satu query (satu kali scan) baik tanpa maupun dengan GROUP BY.
+    Rata-rata disimpan sebagai sum agar bisa digabung antar grup.
+    rollup=True -> agregasi atas TicketRollup (jumlahkan ticket_count).
+    """
+    def count(condition=None):
+        if rollup:
+            return Sum("ticket_count", filter=condition)
+        return Count("number", filter=condition)
+
+    aggregates = {
+        "total": count(),
+        "violations": count(Q(is_sla_violated=True)),
+        "duration_sum": Sum("resolution_duration_sum" if rollup else "resolution_duration"),
+        "compliance_sum": Sum("compliance_rate_sum" if rollup else "application_sla_compliance_rate"),
+    }
+    for priority, key in PRIORITY_STATS_KEYS:
+        aggregates[key] = count(Q(priority=priority))
+    return aggregates
 
-    total = queryset.aggregate(total=Count("number"))["total"]
-    violations = queryset.filter(is_sla_violated=True).aggregate(count=Count("number"))["count"]
+
+def build_stats_block(row):
+    """ Susun response KPI (bentuk sama dengan get_stats) dari hasil stats_aggregates """
+    total = row["total"] or 0
+    violations = row["violations"] or 0
     compliance = total - violations
     rate = (compliance / total * 100) if total > 0 else 0
-
-    low_priority = queryset.filter(priority="4 - Low").aggregate(count=Count("number"))["count"]
-    medium_priority = queryset.filter(priority="3 - Medium").aggregate(count=Count("number"))["count"]
-    high_priority = queryset.filter(priority="2 - High").aggregate(count=Count("number"))["count"]
-    critical_priority = queryset.filter(priority="1 - Critical").aggregate(count=Count("number"))["count"]
-    avg_duration = queryset.aggregate(avg=Avg("resolution_duration"))["avg"] or 0
-    avg_compliance = queryset.aggregate(avg=Avg("application_sla_compliance_rate"))["avg"] or 0
+    avg_duration = (row["duration_sum"] or 0) / total if total > 0 else 0
+    avg_compliance = (row["compliance_sum"] or 0) / total if total > 0 else 0
 
     data = {
         "total_tickets": total,
         "violation_count": violations,
         "compliance_count": compliance,
         "compliance_rate": round(rate, 1),
-        "low_priority_count": low_priority,
-        "medium_priority_count": medium_priority,
-        "high_priority_count": high_priority,
-        "critical_priority_count": critical_priority,
-        "avg_resolution_duration": round(avg_duration, 2),
-        "avg_compliance_rate": round(avg_compliance * 100, 1),
     }
-    return Response(data)
\ No newline at end of file
+    for _, key in PRIORITY_STATS_KEYS:
+        data[key] = row[key] or 0
+    data["avg_resolution_duration"] = round(avg_duration, 2)
+    data["avg_compliance_rate"] = round(avg_compliance * 100, 1)
+    return data
+
+
+@api_view(["GET"])
+@cached_endpoint("stats")
+def get_stats(request):
+    """
+    KPI dashboard dalam satu query agregasi (dari TicketRollup jika tersedia).
+    Opsional ?group_by=category|item|month: KPI yang sama per grup dari
+    scan yang sama, total keseluruhan dijumlahkan dari hasil grup.
+    """
+    queryset, rollup = get_stats_source(request)
+    group_by = request.query_params.get("group_by")
+
+    if not group_by:
+        return Response(build_stats_block(queryset.aggregate(**stats_aggregates(rollup))))
+
+    if group_by not in STATS_GROUP_BY:
+        return Response(
+            {"error": f"group_by harus salah satu dari: {', '.join(STATS_GROUP_BY)}"}, status=400
+        )
+
+    rows = list(
+        queryset.annotate(group=STATS_GROUP_BY[group_by][1 if rollup else 0])
+        .order_by()
+        .values("group")
+        .annotate(**stats_aggregates(rollup))
+    )
+    if group_by == "month":
+        rows.sort(key=lambda row: row["group"])
+    else:
+        rows.sort(key=lambda row: (-row["total"], row["group"]))
+
+    overall = {key: sum(row[key] or 0 for row in rows) for key in stats_aggregates()}
+    data = build_stats_block(overall)
+    data["group_by"] = group_by
+    data["groups"] = [
+        {
+            "group": row["group"].strftime("%Y-%m") if group_by == "month" else row["group"],
+            **build_stats_block(row),
+        }
+        for row in rows
+    ]
+    return Response(data)
+
+
+@api_view(["GET"])
+def get_cache_stats(request):
+    """ Counter hit/miss response cache dan cache prediksi (per worker process) """
+    return Response({**cache_stats(), "prediction_cache": prediction_cache_stats()})
+
+
+@api_view(["GET"])
+def get_prediction_log_stats(request):
+    """ Counter buffer PredictionLog: queued/flushed/dropped (per worker process) """
+    return Response(prediction_log_stats())